@@ -0,0 +1,53 @@
+"""Maintenance commands, run locally with application default credentials.
+
+    python admin.py [--sqlite PATH] rebuild-price-stats [--trip TRIP_ID]
+    python admin.py [--sqlite PATH] save-trip TRIP_ID CONFIG.json
+    python admin.py [--sqlite PATH] sync-trips
+"""
+import argparse
+import json
+
+from google.cloud import firestore
+
+from firestore_price_tracker import PriceTracker
+from sqlite_price_tracker import SQLitePriceTracker
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Fare Scout maintenance commands")
+    parser.add_argument("--sqlite", metavar="PATH", help="Use this SQLite database instead of Firestore")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser(
+        "rebuild-price-stats", help="Regenerate price_stats aggregates from price_history"
+    )
+    rebuild.add_argument("--trip", help="Only rebuild this trip's aggregates")
+    save = commands.add_parser("save-trip", help="Validate a trip config file and save it")
+    save.add_argument("trip_id")
+    save.add_argument("config", help="JSON file with the trip document")
+    commands.add_parser(
+        "sync-trips", help="Re-validate active trips and recompute next_scan_due after manual edits"
+    )
+    args = parser.parse_args(argv)
+
+    tracker = SQLitePriceTracker(args.sqlite) if args.sqlite else PriceTracker(firestore.Client())
+    if args.command == "rebuild-price-stats":
+        count = tracker.rebuild_price_stats(args.trip)
+        print(f"Rebuilt {count} price_stats aggregates")
+    elif args.command == "save-trip":
+        with open(args.config, encoding="utf-8") as f:
+            tracker.save_trip(args.trip_id, json.load(f))
+        print(f"Saved {args.trip_id}")
+    elif args.command == "sync-trips":
+        for trip_id, trip in tracker.get_active_trips():
+            try:
+                tracker.save_trip(trip_id, trip)
+            except ValueError as e:
+                # Never due until fixed
+                tracker.update_trip(trip_id, {"next_scan_due": None})
+                print(f"Invalid trip {trip_id}: {e}")
+                continue
+            print(f"Synced {trip_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,37 @@
+import heapq
 import re
-from amadeus import Client
+import sys
+
+from lazy_imports import lazy_import
+from offers import Offer, OfferList, parse_leg, summarize_prices
+from quota import QuotaLedger
+from rate_limiter import TokenBucket
+from resilience import ResilientCaller
+from search_cache import SearchCache, make_cache_key
+from tracing import NULL_TRACER, Tracer
+
+# The async transport pulls in httpx; the default SDK transport never needs it
+amadeus_transport = lazy_import("amadeus_transport")
+
+
+_intern = sys.intern
+
+# Amadeus accepts at most 250 offers per flight-offers search
+MAX_RESULTS_CAP = 250
+
+
+def __getattr__(name: str):
+    # The Amadeus SDK is only imported when a blocking client is first built
+    if name == "Client":
+        from amadeus import Client
+        globals()["Client"] = Client
+        return Client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def new_sdk_client(api_key: str, api_secret: str):
+    """Blocking Amadeus SDK client; it keeps its access token between searches."""
+    return sys.modules[__name__].Client(client_id=api_key, client_secret=api_secret)
 
 
 def _validate_iata(code: str, field_name: str) -> None:
@@ -8,29 +40,109 @@ def _validate_iata(code: str, field_name: str) -> None:
         raise ValueError(f"Invalid {field_name}: {code!r} (expected 3-letter IATA code)")
 
 
+def passes_filters(carriers: list[str], stops: int, airlines: list[str], max_stops: int) -> bool:
+    """Check operating carriers and stop count against a trip's filters."""
+    # ALL operating carriers must be in allowed list
+    if airlines and not all(c in airlines for c in carriers):
+        return False
+    return stops <= max_stops
+
+
+def filter_offers(offers: list[dict], airlines: list[str], max_stops: int) -> list[dict]:
+    """Apply airline/stop filters to parsed offers, returning copies safe to annotate."""
+    filtered = []
+    for offer in offers:
+        carriers = offer.get("airlines") or [offer.get("airline", "")]
+        if passes_filters(carriers, offer.get("stops", 0), airlines, max_stops):
+            filtered.append(offer.copy())
+    return filtered
+
+
 class AmadeusClient:
-    def __init__(self, api_key: str, api_secret: str):
-        self.client = Client(client_id=api_key, client_secret=api_secret)
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        rate_limiter: TokenBucket | None = None,
+        cache: SearchCache | None = None,
+        quota_ledger: QuotaLedger | None = None,
+        transport: "amadeus_transport.AsyncAmadeusTransport | None" = None,
+        resilience: ResilientCaller | None = None,
+        sdk_client=None,
+        tracer: Tracer | None = None
+    ):
+        # A native transport replaces the SDK's blocking client entirely
+        self.transport = transport
+        self.client = None if transport else sdk_client or new_sdk_client(api_key, api_secret)
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.quota_ledger = quota_ledger
+        self.resilience = resilience
+        self.tracer = tracer or NULL_TRACER
+        # Calls this run may make before searches stop widening (None = no limit)
+        self.widen_budget: int | None = None
+
+    def _call(self, endpoint: str, span: dict, **params):
+        """Call a shopping endpoint, retrying transient failures when a resilience layer is set.
+        Records the number of requests sent, including retries and hedges, on span."""
+        sends = []
+
+        def send():
+            sends.append(endpoint)
+            return self._send(endpoint, **params)
+
+        try:
+            return self.resilience.call(endpoint, send) if self.resilience else send()
+        finally:
+            span["attempts"] = len(sends)
+
+    def _send(self, endpoint: str, **params):
+        """Make one request, waiting on the shared rate limiter first."""
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        if self.quota_ledger:
+            self.quota_ledger.record(endpoint)
+        self.tracer.count("api_calls")
+        if self.transport:
+            return self.transport.get(endpoint, **params)
+        return getattr(self.client.shopping, endpoint).get(**params)
+
+    def _fetch(self, endpoint: str, **params) -> list[dict]:
+        """Fetch raw response data, served from the cache when a fresh copy exists."""
+        with self.tracer.span(f"amadeus.{endpoint}", cached=self.cache is not None) as span:
+            def fetch():
+                span["cached"] = False
+                return self._call(endpoint, span, **params).data
+
+            if self.cache is None:
+                return fetch()
+            return self.cache.get_or_fetch(make_cache_key(endpoint, params), fetch)
 
     def get_cheapest_dates(
         self,
         origin: str,
         destination: str,
         departure_range: tuple[str, str],
-        return_range: tuple[str, str]
+        return_range: tuple[str, str],
+        duration_range: tuple[int, int] | None = None
     ) -> list[dict]:
-        """Get cheapest flight dates for route."""
+        """Get cheapest flight dates for route from the cached price calendar."""
         _validate_iata(origin, "origin")
         _validate_iata(destination, "destination")
-        response = self.client.shopping.flight_dates.get(
-            origin=origin,
-            destination=destination,
-            departureDate=departure_range[0],
-            oneWay=False
-        )
+        params = {
+            "origin": origin,
+            "destination": destination,
+            "departureDate": f"{departure_range[0]},{departure_range[1]}",
+            "oneWay": False,
+        }
+        if duration_range:
+            params["duration"] = f"{duration_range[0]},{duration_range[1]}"
+        data = self._fetch("flight_dates", **params)
 
         results = []
-        for item in response.data:
+        for item in data:
+            if not (return_range[0] <= item["returnDate"] <= return_range[1]):
+                continue
             results.append({
                 "departure_date": item["departureDate"],
                 "return_date": item["returnDate"],
@@ -44,97 +156,165 @@ class AmadeusClient:
         origin: str,
         destination: str,
         departure_date: str,
-        return_date: str,
-        cabin_class: str,
+        return_date: str | None,
+        cabin_class: str | None,
         airlines: list[str],
         max_stops: int,
-        currency: str = "EUR"
-    ) -> list[dict]:
-        """Get detailed flight offers for specific dates."""
+        currency: str = "EUR",
+        max_price: float | None = None,
+        max_results: int = 20,
+        min_results: int = 0,
+        top_k: int | None = None
+    ) -> OfferList:
+        """Get detailed flight offers for specific dates, cheapest first.
+
+        return_date=None searches one-way; cabin_class=None searches all cabins.
+        Airline, non-stop and price filters are sent to Amadeus; operating carriers are
+        still checked locally. If fewer than min_results offers survive the local filter,
+        the search is repeated with a larger max (up to MAX_RESULTS_CAP) while this
+        run's calls stay under widen_budget.
+        With top_k, only the top_k cheapest offers per fare cabin are fully parsed.
+        """
         _validate_iata(origin, "origin")
         _validate_iata(destination, "destination")
-        response = self.client.shopping.flight_offers_search.get(
-            originLocationCode=origin,
-            destinationLocationCode=destination,
-            departureDate=departure_date,
-            returnDate=return_date,
-            adults=1,
-            travelClass=cabin_class,
-            currencyCode=currency,
-            max=20
-        )
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "adults": 1,
+            "currencyCode": currency,
+        }
+        if return_date:
+            params["returnDate"] = return_date
+        if cabin_class:
+            params["travelClass"] = cabin_class
+        if airlines:
+            params["includedAirlineCodes"] = ",".join(sorted(airlines))
+        if max_stops == 0:
+            params["nonStop"] = "true"
+        if max_price:
+            params["maxPrice"] = int(max_price)
 
-        results = []
-        for offer in response.data:
-            outbound = self._parse_itinerary(offer["itineraries"][0])
+        limit = min(max_results, MAX_RESULTS_CAP)
+        while True:
+            data = self._fetch("flight_offers_search", **params, max=limit)
+            results = self._parse_offers(data, departure_date, return_date, airlines, max_stops, top_k)
+            # Stop when enough survived, Amadeus has nothing more, or we hit the cap
+            if results.stats["count"] >= min_results or len(data) < limit or limit >= MAX_RESULTS_CAP:
+                break
+            if not self._can_widen():
+                break
+            limit = min(limit * 2, MAX_RESULTS_CAP)
 
-            # Filter: ALL operating carriers must be in allowed list
-            if airlines and not all(c in airlines for c in outbound["airlines"]):
-                continue
-            if outbound["stops"] > max_stops:
+        return results
+
+    def _can_widen(self) -> bool:
+        """Whether this run's call budget has room for another, wider search."""
+        if self.widen_budget is None or self.quota_ledger is None:
+            return True
+        return self.quota_ledger.pending < self.widen_budget
+
+    def _parse_offers(
+        self,
+        data: list[dict],
+        departure_date: str,
+        return_date: str | None,
+        airlines: list[str],
+        max_stops: int,
+        top_k: int | None = None
+    ) -> OfferList:
+        """Parse raw offers passing the operating-carrier/stop filter, cheapest first.
+
+        A cheap first pass reads only price, cabin and outbound carriers; with top_k,
+        only the cheapest top_k per fare cabin are fully parsed.
+        """
+        by_cabin: dict[str, list[tuple]] = {}
+        for index, offer in enumerate(data):
+            segments = offer["itineraries"][0]["segments"]
+            carriers = [seg.get("operating", {}).get("carrierCode") or seg["carrierCode"] for seg in segments]
+            if not passes_filters(carriers, len(segments) - 1, airlines, max_stops):
                 continue
+            cabin = offer["travelerPricings"][0]["fareDetailsBySegment"][0]["cabin"]
+            # Index breaks price ties in response order
+            by_cabin.setdefault(cabin, []).append((float(offer["price"]["total"]), index, offer))
+
+        cabin_stats = {}
+        selected = []
+        for cabin, candidates in by_cabin.items():
+            cabin_stats[cabin] = summarize_prices(price for price, _, _ in candidates)
+            selected.extend(heapq.nsmallest(top_k, candidates) if top_k else candidates)
+        selected.sort(key=lambda candidate: candidate[:2])
+        self.tracer.count("offers_parsed", len(selected))
 
-            fare_segments = offer["travelerPricings"][0]["fareDetailsBySegment"]
-            fare_info = fare_segments[0]
-
-            result = {
-                "offer_id": offer["id"],
-                "price": float(offer["price"]["total"]),
-                "currency": offer["price"]["currency"],
-                "departure_date": departure_date,
-                "return_date": return_date,
-                "airlines": outbound["airlines"],
-                "stops": outbound["stops"],
-                "cabin_class": fare_info["cabin"],
-                "fare_family": fare_info.get("brandedFare", "Standard"),
-                "duration_minutes": outbound["duration_minutes"],
-                "layover_cities": outbound["layover_cities"],
-                "flight_numbers": outbound["flight_numbers"],
-                "departure_time": outbound["departure_time"],
-                "arrival_time": outbound["arrival_time"],
-                "booking_class": fare_info.get("class", ""),
-                "baggage": self._parse_baggage(fare_info),
-                "seats_remaining": int(offer.get("numberOfBookableSeats", 0)),
-            }
+        return OfferList(
+            (self._parse_offer(offer, price, departure_date, return_date) for price, _, offer in selected),
+            cabin_stats
+        )
 
+    def _parse_offer(self, offer: dict, price: float, departure_date: str, return_date: str | None) -> Offer:
+        """Fully parse one raw offer."""
+        fare_info = offer["travelerPricings"][0]["fareDetailsBySegment"][0]
+        itineraries = offer["itineraries"]
+        return Offer(
+            offer_id=offer["id"],
+            price=price,
+            currency=_intern(offer["price"]["currency"]),
+            departure_date=departure_date,
+            return_date=return_date,
+            cabin_class=_intern(fare_info["cabin"]),
+            fare_family=_intern(fare_info.get("brandedFare", "Standard")),
+            booking_class=_intern(fare_info.get("class", "")),
+            baggage=self._parse_baggage(fare_info),
+            seats_remaining=int(offer.get("numberOfBookableSeats", 0)),
+            outbound=parse_leg(itineraries[0]),
             # Return leg (round-trip)
-            if len(offer["itineraries"]) > 1:
-                ret = self._parse_itinerary(offer["itineraries"][1])
-                result["return_airlines"] = ret["airlines"]
-                result["return_stops"] = ret["stops"]
-                result["return_duration_minutes"] = ret["duration_minutes"]
-                result["return_layover_cities"] = ret["layover_cities"]
-                result["return_flight_numbers"] = ret["flight_numbers"]
-                result["return_departure_time"] = ret["departure_time"]
-                result["return_arrival_time"] = ret["arrival_time"]
-
-            results.append(result)
+            inbound=parse_leg(itineraries[1]) if len(itineraries) > 1 else None,
+        )
 
-        return sorted(results, key=lambda x: x["price"])
+    def get_flight_offers_by_cabin(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: str,
+        return_date: str,
+        cabin_classes: list[str],
+        airlines: list[str],
+        max_stops: int,
+        currency: str = "EUR",
+        min_offers_per_cabin: int = 1,
+        max_price: float | None = None,
+        max_results: int = 20,
+        min_results: int = 0,
+        top_k: int | None = None
+    ) -> dict[str, OfferList]:
+        """Search all cabins in one request and bucket offers by fare cabin.
 
-    def _parse_itinerary(self, itinerary: dict) -> dict:
-        """Parse a single itinerary into structured fields."""
-        segments = itinerary["segments"]
-        operating_carriers = list(dict.fromkeys(
-            self._get_operating_carrier(seg) for seg in segments
-        ))
-        return {
-            "airlines": operating_carriers,
-            "stops": len(segments) - 1,
-            "layover_cities": [seg["arrival"]["iataCode"] for seg in segments[:-1]],
-            "flight_numbers": [
-                f"{seg['carrierCode']} {seg.get('number', '')}"
-                for seg in segments
-            ],
-            "departure_time": segments[0]["departure"]["at"],
-            "arrival_time": segments[-1]["arrival"]["at"],
-            "duration_minutes": self._parse_duration(itinerary["duration"]),
+        Cabins with fewer than min_offers_per_cabin offers fall back to their own search.
+        """
+        search_options = {
+            "max_price": max_price, "max_results": max_results,
+            "min_results": min_results, "top_k": top_k,
         }
+        offers = self.get_flight_offers(
+            origin, destination, departure_date, return_date,
+            None, airlines, max_stops, currency, **search_options
+        )
+        results = {
+            cabin_class: OfferList(cabin_stats={cabin_class: offers.cabin_stats[cabin_class]})
+            if cabin_class in offers.cabin_stats else OfferList()
+            for cabin_class in cabin_classes
+        }
+        for offer in offers:
+            if offer["cabin_class"] in results:
+                results[offer["cabin_class"]].append(offer)
 
-    def _get_operating_carrier(self, seg: dict) -> str:
-        """Get operating carrier, falling back to marketing carrier."""
-        op = seg.get("operating", {}).get("carrierCode")
-        return op if op else seg["carrierCode"]
+        for cabin_class in cabin_classes:
+            if results[cabin_class].stats["count"] < min_offers_per_cabin:
+                results[cabin_class] = self.get_flight_offers(
+                    origin, destination, departure_date, return_date,
+                    cabin_class, airlines, max_stops, currency, **search_options
+                )
+        return results
 
     def _parse_baggage(self, fare_info: dict) -> str:
         """Parse baggage allowance: '2×23kg', '23kg', '2PC', or ''."""
@@ -149,14 +329,3 @@ class AmadeusClient:
         if qty:
             return f"{qty}PC"
         return ""
-
-    def _parse_duration(self, duration: str) -> int:
-        """Parse ISO 8601 duration to minutes. PT12H30M -> 750"""
-        hours = re.search(r'(\d+)H', duration)
-        minutes = re.search(r'(\d+)M', duration)
-        total = 0
-        if hours:
-            total += int(hours.group(1)) * 60
-        if minutes:
-            total += int(minutes.group(1))
-        return total
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import NamedTuple
+
+import httpx
+
+TEST_BASE_URL = "https://test.api.amadeus.com"
+PRODUCTION_BASE_URL = "https://api.amadeus.com"
+
+ENDPOINT_PATHS = {
+    "flight_offers_search": "/v2/shopping/flight-offers",
+    "flight_dates": "/v1/shopping/flight-dates",
+}
+
+# Refresh tokens this long before Amadeus says they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+
+class AmadeusHTTPError(Exception):
+    """Non-2xx response from the Amadeus API."""
+
+    def __init__(self, status_code: int, headers: dict[str, str]):
+        super().__init__(f"Amadeus API returned HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+class TransportResponse(NamedTuple):
+    data: list[dict]
+    status_code: int
+    headers: dict[str, str]
+
+
+class MemoryTokenStore:
+    """Process-wide token store; warm instances reuse tokens across invocations."""
+
+    def __init__(self):
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            return self._tokens.get(key)
+
+    def set(self, key: str, token: str, expires_at: float) -> None:
+        with self._lock:
+            self._tokens[key] = (token, expires_at)
+
+
+class FirestoreTokenStore:
+    """Token store shared by parallel instances through a Firestore collection."""
+
+    def __init__(self, firestore_client, collection: str = "amadeus_tokens"):
+        self.db = firestore_client
+        self.collection = collection
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        snapshot = self.db.collection(self.collection).document(key).get()
+        if not snapshot.exists:
+            return None
+        entry = snapshot.to_dict()
+        return entry["access_token"], entry["expires_at"]
+
+    def set(self, key: str, token: str, expires_at: float) -> None:
+        self.db.collection(self.collection).document(key).set({
+            "access_token": token,
+            "expires_at": expires_at,
+        })
+
+
+_process_tokens = MemoryTokenStore()
+
+
+class AsyncAmadeusTransport:
+    """Native async Amadeus transport with pooled keep-alive connections and token caching.
+
+    Requests run on a private event loop thread, so the sync get() can be called
+    concurrently from worker threads while sharing one connection pool.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str = TEST_BASE_URL,
+        max_connections: int = 10,
+        timeout: float = 30,
+        token_store: MemoryTokenStore | FirestoreTokenStore | None = None,
+        clock=time.time
+    ):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.token_store = token_store
+        self._clock = clock
+        # Key tokens by base URL + client ID, never by secret
+        self._token_key = hashlib.sha256(f"{self.base_url}|{api_key}".encode()).hexdigest()[:32]
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._http: httpx.AsyncClient = self._run(self._open())
+        self._token_lock = asyncio.Lock()
+
+    async def _open(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _cached_token(self) -> str | None:
+        now = self._clock()
+        for store in (_process_tokens, self.token_store):
+            if store is None:
+                continue
+            entry = store.get(self._token_key)
+            if entry and entry[1] - TOKEN_REFRESH_MARGIN_SECONDS > now:
+                if store is not _process_tokens:
+                    _process_tokens.set(self._token_key, *entry)
+                return entry[0]
+        return None
+
+    async def _access_token(self, refresh: bool = False) -> str:
+        if not refresh:
+            token = self._cached_token()
+            if token:
+                return token
+
+        async with self._token_lock:
+            # Another request may have refreshed while we waited
+            token = None if refresh else self._cached_token()
+            if token:
+                return token
+            response = await self._http.post(
+                "/v1/security/oauth2/token",
+                data={
+                    "grant_type": "client_credentials",
+                    "client_id": self.api_key,
+                    "client_secret": self.api_secret,
+                },
+            )
+            if response.status_code != 200:
+                raise AmadeusHTTPError(response.status_code, dict(response.headers))
+            body = response.json()
+            token = body["access_token"]
+            expires_at = self._clock() + int(body.get("expires_in", 0))
+            _process_tokens.set(self._token_key, token, expires_at)
+            if self.token_store is not None:
+                self.token_store.set(self._token_key, token, expires_at)
+            return token
+
+    async def get_async(self, endpoint: str, **params) -> TransportResponse:
+        """GET an Amadeus endpoint, refreshing the token once if it was rejected."""
+        query = {
+            key: str(value).lower() if isinstance(value, bool) else value
+            for key, value in params.items()
+        }
+        response = None
+        for refresh in (False, True):
+            token = await self._access_token(refresh=refresh)
+            response = await self._http.get(
+                ENDPOINT_PATHS[endpoint],
+                params=query,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            if response.status_code != 401:
+                break
+        if response.status_code >= 400:
+            raise AmadeusHTTPError(response.status_code, dict(response.headers))
+        return TransportResponse(response.json().get("data", []), response.status_code, dict(response.headers))
+
+    def get(self, endpoint: str, **params) -> TransportResponse:
+        """Blocking wrapper around get_async, safe to call from many threads."""
+        return self._run(self.get_async(endpoint, **params))
+
+    def close(self) -> None:
+        self._run(self._http.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,253 @@
+"""In-memory stand-ins for Firestore, the Amadeus API and Slack webhooks.
+
+They implement only what the tracker, quota ledger, Amadeus client and Slack delivery
+call, so a whole check_flights run can be timed without network access or quota.
+"""
+import itertools
+import operator
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+from google.cloud import firestore
+
+from amadeus_transport import TransportResponse
+from benchmarks.payloads import make_calendar, make_offers
+
+ALL_CABINS = ("ECONOMY", "PREMIUM_ECONOMY", "BUSINESS", "FIRST")
+OPERATORS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: dict | None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> dict | None:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, store: "FakeFirestore", collection: str, doc_id: str):
+        self._store = store
+        self._collection = collection
+        self.id = doc_id
+
+    @property
+    def _docs(self) -> dict:
+        return self._store.collections.setdefault(self._collection, {})
+
+    def get(self, transaction=None) -> FakeSnapshot:
+        with self._store.lock:
+            self._store.reads += 1
+            return FakeSnapshot(self, self._docs.get(self.id))
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        with self._store.lock:
+            self._store.writes += 1
+            current = dict(self._docs.get(self.id, {})) if merge else {}
+            for key, value in data.items():
+                if isinstance(value, firestore.Increment):
+                    value = current.get(key, 0) + value.value
+                current[key] = value
+            self._docs[self.id] = current
+
+    def update(self, fields: dict) -> None:
+        with self._store.lock:
+            if self.id not in self._docs:
+                raise KeyError(self.id)
+        self.set(fields, merge=True)
+
+    def delete(self) -> None:
+        with self._store.lock:
+            self._store.writes += 1
+            self._docs.pop(self.id, None)
+
+
+class FakeQuery:
+    def __init__(self, store: "FakeFirestore", collection: str, filters=(), order=None, limit=None):
+        self._store = store
+        self._collection = collection
+        self._filters = filters
+        self._order = order
+        self._limit = limit
+
+    def where(self, field: str, op: str, value) -> "FakeQuery":
+        return FakeQuery(self._store, self._collection, self._filters + ((field, OPERATORS[op], value),),
+                         self._order, self._limit)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return FakeQuery(self._store, self._collection, self._filters, (field, direction == "DESCENDING"), self._limit)
+
+    def limit(self, count: int) -> "FakeQuery":
+        return FakeQuery(self._store, self._collection, self._filters, self._order, count)
+
+    def stream(self):
+        with self._store.lock:
+            docs = list(self._store.collections.get(self._collection, {}).items())
+        # Like Firestore, documents missing a filtered field never match
+        matches = [
+            (doc_id, data) for doc_id, data in docs
+            if all(field in data and data[field] is not None and op(data[field], value)
+                   for field, op, value in self._filters)
+        ]
+        if self._order:
+            field, descending = self._order
+            # Ordering also drops documents without the field
+            matches = sorted((item for item in matches if field in item[1]),
+                             key=lambda item: item[1][field], reverse=descending)
+        matches = matches[:self._limit] if self._limit is not None else matches
+        with self._store.lock:
+            self._store.reads += len(matches)
+        for doc_id, data in matches:
+            yield FakeSnapshot(FakeDocument(self._store, self._collection, doc_id), data)
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id: str | None = None) -> FakeDocument:
+        return FakeDocument(self._store, self._collection, doc_id or self._store.new_id())
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeBatch:
+    def __init__(self):
+        self._ops = []
+
+    def set(self, ref: FakeDocument, data: dict, merge: bool = False) -> None:
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def delete(self, ref: FakeDocument) -> None:
+        self._ops.append(ref.delete)
+
+    def commit(self) -> None:
+        for op in self._ops:
+            op()
+
+
+class FakeTransaction(FakeBatch):
+    """Applies writes on commit. Implements the private hooks firestore.transactional
+    drives (google-cloud-firestore 2.x)."""
+
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self):
+        super().__init__()
+        self._id = None
+
+    def _clean_up(self) -> None:
+        self._ops = []
+        self._id = None
+
+    def _begin(self, retry_id=None) -> None:
+        self._id = b"fake-transaction"
+
+    def _commit(self) -> list:
+        self.commit()
+        self._clean_up()
+        return []
+
+    def _rollback(self) -> None:
+        self._clean_up()
+
+
+class FakeFirestore:
+    """Thread-safe in-memory Firestore client with read and write counters."""
+
+    def __init__(self):
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+        self._ids = itertools.count(1)
+
+    def new_id(self) -> str:
+        return f"doc{next(self._ids):08d}"
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch()
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction()
+
+
+class FakeAmadeusTransport:
+    """Stands in for AsyncAmadeusTransport, answering every search with synthetic data.
+
+    Each search returns up to offers_per_search offers (capped by the request's max),
+    in the requested cabin or spread over all cabins, after an optional fixed latency.
+    Responses are generated once per distinct request, so after warmup a benchmark
+    times the code under test rather than the generator.
+    """
+
+    def __init__(self, offers_per_search: int = 50, segments: int = 2, latency: float = 0.0):
+        self.offers_per_search = offers_per_search
+        self.segments = segments
+        self.latency = latency
+        self.api_key = "benchmark"
+        self.calls = 0
+        self._responses: dict[str, TransportResponse] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, **params) -> TransportResponse:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        key = repr((endpoint, sorted(params.items())))
+        with self._lock:
+            response = self._responses.get(key)
+        if response is None:
+            response = self._generate(endpoint, zlib.crc32(key.encode("utf-8")), params)
+            with self._lock:
+                self._responses[key] = response
+        return response
+
+    def _generate(self, endpoint: str, seed: int, params: dict) -> TransportResponse:
+        if endpoint == "flight_dates":
+            start, end = params["departureDate"].split(",")
+            min_days, max_days = (int(days) for days in params["duration"].split(","))
+            return TransportResponse(make_calendar((start, end), min_days, max_days, seed), 200, {})
+        travel_class = params.get("travelClass")
+        data = make_offers(
+            min(self.offers_per_search, params.get("max", self.offers_per_search)),
+            segments=self.segments,
+            origin=params["originLocationCode"],
+            destination=params["destinationLocationCode"],
+            departure_date=params["departureDate"],
+            return_date=params.get("returnDate"),
+            cabins=(travel_class,) if travel_class else ALL_CABINS,
+            seed=seed
+        )
+        return TransportResponse(data, 200, {})
+
+    def close(self) -> None:
+        pass
+
+
+class FakeSlackSession:
+    """Accepts every webhook post and counts them."""
+
+    def __init__(self):
+        self.posts = 0
+        self.chars = 0
+        self._lock = threading.Lock()
+
+    def post(self, url: str, json: dict, timeout: float):
+        with self._lock:
+            self.posts += 1
+            self.chars += len(json["text"])
+        return SimpleNamespace(status_code=200, headers={})
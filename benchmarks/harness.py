@@ -0,0 +1,100 @@
+"""Timing, peak memory and baseline comparison for the benchmark suite."""
+import json
+import math
+import platform
+import time
+import tracemalloc
+from pathlib import Path
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def measure(name: str, fn, iterations: int = 20, warmup: int = 2, units: int = 1, unit: str = "op", setup=None) -> dict:
+    """Time fn over iterations after warmup runs, then run it once more under tracemalloc.
+
+    fn does `units` units of work per call, for throughput. With setup, each call gets
+    a fresh setup() result, built outside the timed section.
+    """
+    def call():
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        return (time.perf_counter() - start) * 1000
+
+    for _ in range(warmup):
+        call()
+    samples = [call() for _ in range(iterations)]
+
+    args = (setup(),) if setup else ()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "units": units,
+        "unit": unit,
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p90_ms": round(percentile(samples, 90), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "throughput": round(units * 1000 / percentile(samples, 50), 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()}
+
+
+def load_baseline(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, results: list[dict], params: dict) -> None:
+    path.write_text(json.dumps({
+        "environment": environment(),
+        "params": params,
+        "results": {result["name"]: result for result in results},
+    }, indent=2) + "\n")
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """Regressions: a median latency or peak memory more than tolerance above the baseline."""
+    regressions = []
+    for result in results:
+        base = baseline["results"].get(result["name"])
+        if not base:
+            continue
+        for metric in ("p50_ms", "peak_kib"):
+            if base[metric] and result[metric] > base[metric] * (1 + tolerance):
+                change = result[metric] / base[metric] - 1
+                regressions.append(f"{result['name']} {metric}: {base[metric]} -> {result[metric]} (+{change:.0%})")
+    return regressions
+
+
+def format_table(results: list[dict], baseline: dict | None = None) -> str:
+    header = f"{'benchmark':24} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'throughput':>18} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    lines = [header]
+    for result in results:
+        line = (
+            f"{result['name']:24} {result['p50_ms']:10.3f} {result['p90_ms']:10.3f} {result['p99_ms']:10.3f}"
+            f" {result['throughput']:>12.1f} {result['unit'] + '/s':<5} {result['peak_kib']:10.1f}"
+        )
+        base = baseline["results"].get(result["name"]) if baseline else None
+        if base and base["p50_ms"]:
+            line += f" {result['p50_ms'] / base['p50_ms'] - 1:>+12.1%}"
+        lines.append(line)
+    return "\n".join(lines)
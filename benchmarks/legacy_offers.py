@@ -0,0 +1,54 @@
+"""The dict-based offer parser the slotted Offer model replaced, kept as a benchmark reference."""
+import re
+
+
+def legacy_parse_itinerary(itinerary: dict) -> dict:
+    segments = itinerary["segments"]
+    carriers = list(dict.fromkeys(
+        seg.get("operating", {}).get("carrierCode") or seg["carrierCode"] for seg in segments
+    ))
+    duration = itinerary["duration"]
+    hours = re.search(r'(\d+)H', duration)
+    minutes = re.search(r'(\d+)M', duration)
+    total = (int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0)
+    return {
+        "airlines": carriers,
+        "stops": len(segments) - 1,
+        "layover_cities": [seg["arrival"]["iataCode"] for seg in segments[:-1]],
+        "flight_numbers": [f"{seg['carrierCode']} {seg.get('number', '')}" for seg in segments],
+        "departure_time": segments[0]["departure"]["at"],
+        "arrival_time": segments[-1]["arrival"]["at"],
+        "duration_minutes": total,
+    }
+
+
+def legacy_parse_offers(client, data: list[dict], departure_date: str, return_date: str | None) -> list[dict]:
+    """Parse every offer into a plain dict, as AmadeusClient did before Offer."""
+    results = []
+    for offer in data:
+        outbound = legacy_parse_itinerary(offer["itineraries"][0])
+        fare_info = offer["travelerPricings"][0]["fareDetailsBySegment"][0]
+        result = {
+            "offer_id": offer["id"],
+            "price": float(offer["price"]["total"]),
+            "currency": offer["price"]["currency"],
+            "departure_date": departure_date,
+            "return_date": return_date,
+            "airlines": outbound["airlines"],
+            "stops": outbound["stops"],
+            "cabin_class": fare_info["cabin"],
+            "fare_family": fare_info.get("brandedFare", "Standard"),
+            "duration_minutes": outbound["duration_minutes"],
+            "layover_cities": outbound["layover_cities"],
+            "flight_numbers": outbound["flight_numbers"],
+            "departure_time": outbound["departure_time"],
+            "arrival_time": outbound["arrival_time"],
+            "booking_class": fare_info.get("class", ""),
+            "baggage": client._parse_baggage(fare_info),
+            "seats_remaining": int(offer.get("numberOfBookableSeats", 0)),
+        }
+        if len(offer["itineraries"]) > 1:
+            for field, value in legacy_parse_itinerary(offer["itineraries"][1]).items():
+                result[f"return_{field}"] = value
+        results.append(result)
+    return results
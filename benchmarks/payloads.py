@@ -0,0 +1,113 @@
+"""Synthetic Amadeus payloads and trip configs of configurable size.
+
+Every generator is seeded, so a given size always produces the same data.
+"""
+import random
+from datetime import date, timedelta
+
+CARRIERS = ["EK", "QR", "LH", "KL", "TK", "AI"]
+HUBS = ["DXB", "DOH", "FRA", "AMS", "IST", "DEL"]
+
+
+def make_itinerary(origin: str, destination: str, day: str, segments: int, carrier: str, rng: random.Random) -> dict:
+    """One itinerary of `segments` flights via distinct hubs, all on `day`."""
+    stops = [origin] + rng.sample([hub for hub in HUBS if hub not in (origin, destination)], segments - 1)
+    stops.append(destination)
+    legs = []
+    for n, (src, dst) in enumerate(zip(stops, stops[1:])):
+        legs.append({
+            "carrierCode": carrier,
+            "number": str(rng.randint(100, 999)),
+            "departure": {"iataCode": src, "at": f"{day}T{(6 + 4 * n) % 24:02d}:00:00"},
+            "arrival": {"iataCode": dst, "at": f"{day}T{(8 + 4 * n) % 24:02d}:30:00"},
+        })
+    return {"duration": f"PT{4 * segments + rng.randint(0, 9)}H{rng.randint(0, 59)}M", "segments": legs}
+
+
+def make_offers(
+    count: int,
+    segments: int = 2,
+    origin: str = "HYD",
+    destination: str = "ARN",
+    departure_date: str = "2026-06-01",
+    return_date: str | None = "2026-06-28",
+    cabins: tuple[str, ...] = ("ECONOMY",),
+    currency: str = "INR",
+    seed: int = 0
+) -> list[dict]:
+    """Flight-offers search data: `count` offers with `segments` flights per itinerary,
+    prices in random order, cabins assigned round robin. return_date=None is one-way."""
+    rng = random.Random(seed)
+    offers = []
+    for i in range(count):
+        carrier = CARRIERS[i % len(CARRIERS)]
+        itineraries = [make_itinerary(origin, destination, departure_date, segments, carrier, rng)]
+        if return_date:
+            itineraries.append(make_itinerary(destination, origin, return_date, segments, carrier, rng))
+        offers.append({
+            "id": str(i + 1),
+            "price": {"total": f"{rng.randint(30000, 120000)}.00", "currency": currency},
+            "numberOfBookableSeats": rng.randint(1, 9),
+            "itineraries": itineraries,
+            "travelerPricings": [{"fareDetailsBySegment": [{
+                "cabin": cabins[i % len(cabins)], "brandedFare": "BASIC", "class": "Y",
+                "includedCheckedBags": {"weight": 23, "weightUnit": "KG"},
+            }]}],
+        })
+    return offers
+
+
+def make_calendar(departure_range: tuple[str, str], min_days: int, max_days: int, seed: int = 0) -> list[dict]:
+    """Flight-dates (price calendar) data: one entry per departure date and trip length."""
+    rng = random.Random(seed)
+    start, end = (date.fromisoformat(day) for day in departure_range)
+    entries = []
+    for offset in range((end - start).days + 1):
+        departure = start + timedelta(days=offset)
+        for days in range(min_days, max_days + 1):
+            entries.append({
+                "departureDate": departure.isoformat(),
+                "returnDate": (departure + timedelta(days=days)).isoformat(),
+                "price": {"total": f"{rng.randint(30000, 120000)}.00"},
+            })
+    return entries
+
+
+def make_trip(
+    departure_days: int = 14,
+    return_days: int = 14,
+    min_trip_days: int = 25,
+    max_trip_days: int = 30,
+    origins: tuple[str, ...] = ("HYD",),
+    destinations: tuple[str, ...] = ("ARN",),
+    cabin_classes: tuple[str, ...] = ("ECONOMY", "PREMIUM_ECONOMY"),
+    start: str = "2026-06-01",
+    **overrides
+) -> dict:
+    """A valid trip config whose date ranges span departure_days and return_days."""
+    first = date.fromisoformat(start)
+    trip = {
+        "label": "Benchmark trip",
+        "type": "round_trip",
+        "origins": list(origins),
+        "destinations": list(destinations),
+        "airlines": [],
+        "cabin_classes": list(cabin_classes),
+        "max_stops": 2,
+        "departure_date_range": [start, (first + timedelta(days=departure_days - 1)).isoformat()],
+        "return_date_range": [
+            (first + timedelta(days=min_trip_days)).isoformat(),
+            (first + timedelta(days=min_trip_days + return_days - 1)).isoformat(),
+        ],
+        "min_trip_days": min_trip_days,
+        "max_trip_days": max_trip_days,
+        # Always open, so the trip is due whenever the benchmark runs
+        "scan_window": {"start": "2000-01-01", "end": "2999-12-31"},
+        "scan_frequency_days": 1,
+        "alert_on_rolling_avg_drop_pct": 10,
+        "always_notify": True,
+        "currency": "INR",
+        "active": True,
+    }
+    trip.update(overrides)
+    return trip
@@ -0,0 +1,204 @@
+"""Benchmark suite: offer parsing, date planning, Slack formatting and whole check_flights runs.
+
+Run from the repo root:
+
+    python benchmarks/run_benchmarks.py                  # compare against benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py --only parse_offers --offers 1000 --segments 3
+
+Exits with status 1 when a median latency or peak memory is more than --tolerance
+above the baseline. Baselines are only comparable on the same machine and sizes.
+"""
+import argparse
+import contextlib
+import io
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+from amadeus_client import AmadeusClient  # noqa: E402
+from benchmarks.fakes import FakeAmadeusTransport, FakeFirestore, FakeSlackSession  # noqa: E402
+from benchmarks.harness import compare, format_table, load_baseline, measure, save_baseline  # noqa: E402
+from benchmarks.legacy_offers import legacy_parse_offers  # noqa: E402
+from benchmarks.payloads import make_offers, make_trip  # noqa: E402
+from date_planner import all_date_pairs, generate_date_pairs  # noqa: E402
+from firestore_price_tracker import PriceTracker  # noqa: E402
+from offers import parse_leg  # noqa: E402
+from slack_notifier import SlackNotifier  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+# Cheap calls are repeated so each sample is well above timer resolution
+BATCH = 100
+# Trips in an end-to-end run fly to different places, so their searches are not shared
+DESTINATIONS = ["ARN", "CDG", "LHR", "JFK", "SIN", "NRT", "SYD", "YYZ"]
+
+
+def bench_parse_leg(args) -> dict:
+    itineraries = [
+        itinerary for offer in make_offers(args.offers, segments=args.segments)
+        for itinerary in offer["itineraries"]
+    ]
+
+    def run():
+        for itinerary in itineraries:
+            parse_leg(itinerary)
+
+    return measure("parse_leg", run, args.iterations, units=len(itineraries), unit="leg")
+
+
+def bench_parse_offers(args) -> dict:
+    data = make_offers(args.offers, segments=args.segments, cabins=("ECONOMY", "PREMIUM_ECONOMY"))
+    client = AmadeusClient("key", "secret", transport=FakeAmadeusTransport())
+
+    def run():
+        client._parse_offers(data, "2026-06-01", "2026-06-28", [], 2)
+
+    return measure("parse_offers", run, args.iterations, units=len(data), unit="offer")
+
+
+def bench_parse_offers_dict(args) -> dict:
+    """The same payload through the dict parser Offer replaced, for comparison with parse_offers."""
+    data = make_offers(args.offers, segments=args.segments, cabins=("ECONOMY", "PREMIUM_ECONOMY"))
+    client = AmadeusClient("key", "secret", transport=FakeAmadeusTransport())
+
+    def run():
+        legacy_parse_offers(client, data, "2026-06-01", "2026-06-28")
+
+    return measure("parse_offers_dict", run, args.iterations, units=len(data), unit="offer")
+
+
+def bench_generate_date_pairs(args) -> dict:
+    trip = make_trip(departure_days=args.days, return_days=args.days)
+    dates = (trip["departure_date_range"], trip["return_date_range"], trip["min_trip_days"], trip["max_trip_days"])
+
+    def run():
+        for _ in range(BATCH):
+            generate_date_pairs(*dates, max_pairs=5)
+
+    return measure("generate_date_pairs", run, args.iterations, units=BATCH, unit="call")
+
+
+def bench_all_date_pairs(args) -> dict:
+    trip = make_trip(departure_days=args.days, return_days=args.days)
+    dates = (trip["departure_date_range"], trip["return_date_range"], trip["min_trip_days"], trip["max_trip_days"])
+
+    def run():
+        for _ in range(BATCH):
+            all_date_pairs(*dates)
+
+    return measure("all_date_pairs", run, args.iterations, units=BATCH, unit="call")
+
+
+def bench_format_message(args) -> dict:
+    client = AmadeusClient("key", "secret", transport=FakeAmadeusTransport())
+    cabins = ("ECONOMY", "PREMIUM_ECONOMY")
+    offers = client._parse_offers(make_offers(args.offers, segments=args.segments, cabins=cabins),
+                                  "2026-06-01", "2026-06-28", [], 2)
+    results = {cabin: [offer for offer in offers if offer["cabin_class"] == cabin] for cabin in cabins}
+    notifier = SlackNotifier("https://hooks.slack.com/services/benchmark", delivery=mock.Mock())
+
+    def run():
+        for _ in range(BATCH):
+            notifier.format_message("Benchmark trip", "HYD", "ARN", results, "INR",
+                                    departure_range=("2026-06-01", "2026-06-14"),
+                                    return_range=("2026-06-26", "2026-07-09"))
+
+    return measure("format_message", run, args.iterations, units=BATCH, unit="msg")
+
+
+def bench_check_flights(args) -> dict:
+    """Whole runs against fresh in-memory Firestore data, with fake Amadeus and Slack."""
+    transport = FakeAmadeusTransport(offers_per_search=args.offers, segments=args.segments, latency=args.latency)
+    slack = FakeSlackSession()
+
+    def setup() -> FakeFirestore:
+        db = FakeFirestore()
+        tracker = PriceTracker(db)
+        for i in range(args.trips):
+            # Own webhook per trip, so Slack's per-webhook rate limit never waits
+            tracker.save_trip(f"trip-{i}", make_trip(
+                departure_days=args.days, return_days=args.days,
+                destinations=(DESTINATIONS[i % len(DESTINATIONS)],),
+                slack_webhook_url=f"https://hooks.slack.com/services/benchmark-{i}"
+            ))
+        return db
+
+    def run(db: FakeFirestore) -> None:
+        with contextlib.ExitStack() as stack:
+            for name, value in {
+                "get_firestore_client": lambda: db,
+                "get_secrets": lambda project_id, ids: ["key", "secret", "https://hooks.slack.com/services/benchmark"],
+                "get_amadeus_transport": lambda key, secret: transport,
+                "get_amadeus_sdk": lambda key, secret: None,
+                "get_search_cache": lambda: None,
+                "get_slack_session": lambda: slack,
+                "PRICE_STORE": "firestore",
+                "TRACE_SPANS": False,
+                # No throttling or quota: measure the code, not the limits
+                "AMADEUS_MAX_TPS": 1e9,
+                "AMADEUS_BURST": 1e9,
+                "AMADEUS_MONTHLY_QUOTA": 10**12,
+            }.items():
+                stack.enter_context(mock.patch.object(main, name, value))
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            main.check_flights(SimpleNamespace(args={}))
+
+    return measure("check_flights", run, args.iterations, warmup=1, units=args.trips, unit="trip", setup=setup)
+
+
+BENCHMARKS = {
+    "parse_leg": bench_parse_leg,
+    "parse_offers": bench_parse_offers,
+    "parse_offers_dict": bench_parse_offers_dict,
+    "generate_date_pairs": bench_generate_date_pairs,
+    "all_date_pairs": bench_all_date_pairs,
+    "format_message": bench_format_message,
+    "check_flights": bench_check_flights,
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run (default: all)")
+    parser.add_argument("--offers", type=int, default=200, help="offers per payload and per fake search")
+    parser.add_argument("--segments", type=int, default=2, help="flights per itinerary")
+    parser.add_argument("--days", type=int, default=14, help="days in each trip's departure and return ranges")
+    parser.add_argument("--trips", type=int, default=5, help="due trips per check_flights run")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds each fake Amadeus call takes")
+    parser.add_argument("--iterations", type=int, default=20, help="timed runs per benchmark")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a regression")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    params = {key: getattr(args, key) for key in ("offers", "segments", "days", "trips", "latency")}
+    results = [BENCHMARKS[name](args) for name in args.only or BENCHMARKS]
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results, params)
+        print(format_table(results))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    print(format_table(results, baseline))
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    if baseline["params"] != params:
+        print(f"Warning: baseline was recorded with {baseline['params']}")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
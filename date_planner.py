@@ -0,0 +1,120 @@
+import random
+import statistics
+from datetime import datetime, timedelta
+
+
+def all_date_pairs(dep_range: list, ret_range: list, min_days: int, max_days: int, step_days: int = 1) -> list:
+    """Every departure/return pair on the grid that fits the trip length."""
+    dep_start = datetime.fromisoformat(dep_range[0]).date()
+    dep_end = datetime.fromisoformat(dep_range[1]).date()
+    ret_start = datetime.fromisoformat(ret_range[0]).date()
+    ret_end = datetime.fromisoformat(ret_range[1]).date()
+
+    pairs = []
+    dep_date = dep_start
+    while dep_date <= dep_end:
+        ret_date = ret_start
+        while ret_date <= ret_end:
+            days = (ret_date - dep_date).days
+            if min_days <= days <= max_days:
+                pairs.append((dep_date.isoformat(), ret_date.isoformat()))
+            ret_date += timedelta(days=step_days)
+        dep_date += timedelta(days=step_days)
+    return pairs
+
+
+def generate_date_pairs(dep_range: list, ret_range: list, min_days: int, max_days: int, max_pairs: int = 5) -> list:
+    """Generate departure/return date pairs within constraints."""
+    pairs = all_date_pairs(dep_range, ret_range, min_days, max_days, step_days=2)  # Sample every 2 days
+
+    # Return evenly spaced sample
+    if len(pairs) <= max_pairs:
+        return pairs
+    step = len(pairs) // max_pairs
+    return [pairs[i * step] for i in range(max_pairs)]
+
+
+def leg_dates(dep_range: list, ret_range: list, min_days: int, max_days: int) -> tuple[list[str], list[str]]:
+    """Departure and return dates that appear in at least one valid pair, for one-way leg searches."""
+    pairs = all_date_pairs(dep_range, ret_range, min_days, max_days)
+    departures = sorted({dep for dep, _ in pairs})
+    returns = sorted({ret for _, ret in pairs})
+    return departures, returns
+
+
+def is_valid_pair(dep_date: str, ret_date: str, dep_range: list, ret_range: list, min_days: int, max_days: int) -> bool:
+    """Check a date pair falls inside both ranges and the trip length limits."""
+    if not (dep_range[0] <= dep_date <= dep_range[1]):
+        return False
+    if not (ret_range[0] <= ret_date <= ret_range[1]):
+        return False
+    days = (datetime.fromisoformat(ret_date) - datetime.fromisoformat(dep_date)).days
+    return min_days <= days <= max_days
+
+
+def select_calendar_pairs(
+    calendar: list[dict],
+    dep_range: list,
+    ret_range: list,
+    min_days: int,
+    max_days: int,
+    max_pairs: int = 5
+) -> list[tuple[str, str]]:
+    """Pick the cheapest price-calendar pairs that fit the trip, topped up from the sampled grid."""
+    pairs = []
+    for item in sorted(calendar, key=lambda x: x["price"]):
+        pair = (item["departure_date"], item["return_date"])
+        if pair in pairs:
+            continue
+        if is_valid_pair(*pair, dep_range, ret_range, min_days, max_days):
+            pairs.append(pair)
+        if len(pairs) == max_pairs:
+            return pairs
+
+    # Calendar didn't cover the budget; fill the rest evenly from the grid
+    for pair in generate_date_pairs(dep_range, ret_range, min_days, max_days, max_pairs=max_pairs):
+        if len(pairs) == max_pairs:
+            break
+        if pair not in pairs:
+            pairs.append(pair)
+    return pairs
+
+
+def score_pair_history(prices: list[float], floor: float, ceiling: float) -> float:
+    """Score a sampled pair: volatile or cheap pairs score higher. prices are newest first."""
+    volatility = statistics.pstdev(prices) / statistics.mean(prices) if len(prices) > 1 else 0.0
+    cheapness = 1.0 if ceiling == floor else (ceiling - prices[0]) / (ceiling - floor)
+    return volatility + cheapness
+
+
+def select_adaptive_pairs(
+    candidates: list[tuple[str, str]],
+    history: dict[tuple[str, str], list[float]],
+    max_pairs: int = 5,
+    explore_ratio: float = 0.2,
+    seed=None
+) -> list[tuple[str, str]]:
+    """Favor volatile or cheap pairs from history and explore unsampled ones.
+
+    history maps a pair to its recent per-scan prices, newest first. Deterministic for a given seed.
+    """
+    rng = random.Random(seed)
+    sampled = [pair for pair in candidates if history.get(pair)]
+    unsampled = [pair for pair in candidates if not history.get(pair)]
+
+    # Any positive ratio explores at least one pair; 0 spends every slot it can on history
+    wanted = max(1, round(max_pairs * explore_ratio)) if explore_ratio > 0 else 0
+    explore_slots = min(len(unsampled), max_pairs, wanted)
+    exploit_slots = min(len(sampled), max_pairs - explore_slots)
+    # Not enough history yet: spend the rest on exploration
+    explore_slots = min(len(unsampled), max_pairs - exploit_slots)
+
+    latest = [history[pair][0] for pair in sampled]
+    floor, ceiling = (min(latest), max(latest)) if latest else (0, 0)
+    ranked = sorted(
+        sampled,
+        key=lambda pair: (-score_pair_history(history[pair], floor, ceiling), pair)
+    )
+
+    chosen = ranked[:exploit_slots] + rng.sample(unsampled, explore_slots)
+    return sorted(chosen)
@@ -63,4 +63,36 @@ gcloud scheduler jobs create http flight-scanner-daily \
   --project=$PROJECT_ID
 
 echo "Scheduler job created: daily at 8am IST"
+
+# Deploy the weekly price history compaction job
+gcloud functions deploy price-history-compactor \
+  --gen2 \
+  --runtime=python312 \
+  --region=$REGION \
+  --trigger-http \
+  --no-allow-unauthenticated \
+  --entry-point=compact_history \
+  --memory=256MB \
+  --timeout=540s \
+  --project=$PROJECT_ID
+
+COMPACTOR_URL=$(gcloud functions describe price-history-compactor \
+  --region=$REGION \
+  --format='value(serviceConfig.uri)' \
+  --project=$PROJECT_ID)
+
+gcloud scheduler jobs delete price-history-compaction-weekly \
+  --location=$REGION \
+  --project=$PROJECT_ID \
+  --quiet 2>/dev/null || true
+
+gcloud scheduler jobs create http price-history-compaction-weekly \
+  --location=$REGION \
+  --schedule="0 3 * * 0" \
+  --time-zone="$TIMEZONE" \
+  --uri="$COMPACTOR_URL" \
+  --oidc-service-account-email="${PROJECT_ID}@appspot.gserviceaccount.com" \
+  --project=$PROJECT_ID
+
+echo "Compaction job created: Sundays at 3am"
 echo "Done!"
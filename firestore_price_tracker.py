@@ -1,39 +1,304 @@
 # price_tracker.py
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
+from lazy_imports import lazy_import
+from price_store import ROLLING_WINDOW, PriceStore, fold_scan, merge_write_reports, price_stats_id
+from price_summaries import ROLLUP, bucket_start, downsample, scan_summaries, summary_id
+from tracing import Tracer
 
-class PriceTracker:
-    def __init__(self, firestore_client):
+firestore = lazy_import("google.cloud.firestore")
+
+# Firestore allows at most 500 writes per batch
+FIRESTORE_BATCH_LIMIT = 500
+
+
+class PriceTracker(PriceStore):
+    """Price history in Firestore.
+
+    Every scan writes per-date-pair and whole-cabin summaries to scan_summaries (the
+    main history) and full offer rows to price_history, which compact_history() keeps
+    only for a recent window while downsampling old summaries into daily and weekly
+    tiers. Each (trip, route, cabin) also has a price_stats aggregate, updated in a
+    transaction after every write, so the rolling average is one document read;
+    rebuild_price_stats() regenerates them. Trip configs live in the trips collection.
+    """
+
+    def __init__(
+        self,
+        firestore_client,
+        background_writes: bool = False,
+        max_workers: int = 4,
+        tracer: Tracer | None = None
+    ):
+        super().__init__(background_writes=background_writes, max_workers=max_workers, tracer=tracer)
         self.db = firestore_client
 
-    def store_prices(self, trip_id: str, route: str, prices: list[dict]) -> None:
-        """Store price observations in Firestore."""
-        collection = self.db.collection("price_history")
-        scanned_at = datetime.now(timezone.utc)
+    def _write_scan(self, summaries: list[dict], rows: list[dict], stats_rows: list[dict]) -> dict:
+        summary_collection = self.db.collection("scan_summaries")
+        history = self.db.collection("price_history")
+        # Summaries first: they're the main history, and land in the first batch
+        writes = [
+            (summary_collection.document(summary_id(summary, "scan", summary["scanned_at"])), summary)
+            for summary in summaries
+        ]
+        if stats_rows:
+            offer_stats = self.db.collection("offer_stats")
+            writes.extend((offer_stats.document(), stats) for stats in stats_rows)
+        writes.extend((history.document(), row) for row in rows)
+        rollups = [summary for summary in summaries if summary["departure_date"] == ROLLUP]
+        return self._write_batches(writes, rollups)
+
+    def _write_batches(self, writes: list[tuple], rollups: list[dict]) -> dict:
+        """Commit writes in batches of up to FIRESTORE_BATCH_LIMIT, in parallel, then fold
+        the scan into its price_stats aggregates."""
+        chunks = [writes[i:i + FIRESTORE_BATCH_LIMIT] for i in range(0, len(writes), FIRESTORE_BATCH_LIMIT)]
+        if len(chunks) <= 1:
+            reports = [self._commit_batch(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                reports = list(pool.map(self._commit_batch, chunks))
+
+        report = merge_write_reports(reports)
+        # The rollup summaries are in the first batch; only count the scan if they were stored
+        if rollups and not reports[0]["failed"]:
+            try:
+                self._update_aggregates(rollups)
+            except Exception as e:
+                # Summaries are intact; rebuild_price_stats() repairs the aggregate
+                report["errors"].append(f"price_stats {type(e).__name__}")
+                print(f"Price stats update failed: {type(e).__name__}")
+        if report["failed"]:
+            print(f"Price write failed for {report['failed']} of {len(writes)} documents: {report['errors']}")
+        return report
 
-        for price in prices:
-            doc = {
-                "trip_id": trip_id,
-                "scanned_at": scanned_at,
-                "route": route,
-                **price
-            }
-            collection.add(doc)
+    def _commit_batch(self, writes: list[tuple]) -> dict:
+        """Commit one atomic batch of (ref, doc) sets, or deletes when doc is None."""
+        batch = self.db.batch()
+        for ref, doc in writes:
+            if doc is None:
+                batch.delete(ref)
+            else:
+                batch.set(ref, doc)
+        try:
+            batch.commit()
+        except Exception as e:
+            # Log error type only, not full details (security)
+            return {"written": 0, "failed": len(writes), "errors": [type(e).__name__]}
+        self.tracer.count("firestore_writes", len(writes))
+        return {"written": len(writes), "failed": 0, "errors": []}
+
+    def _update_aggregates(self, rollups: list[dict]) -> None:
+        """Fold a scan's whole-cabin summaries into their aggregates in one transaction."""
+        refs = {
+            price_stats_id(rollup["trip_id"], rollup["route"], rollup["cabin_class"]):
+                (self.db.collection("price_stats").document(
+                    price_stats_id(rollup["trip_id"], rollup["route"], rollup["cabin_class"])
+                ), rollup)
+            for rollup in rollups
+        }
+
+        @firestore.transactional
+        def update(transaction):
+            # Transactions need every read before the first write
+            snapshots = {stats_id: ref.get(transaction=transaction) for stats_id, (ref, _) in refs.items()}
+            for stats_id, (ref, rollup) in refs.items():
+                snapshot = snapshots[stats_id]
+                aggregate = fold_scan(
+                    snapshot.to_dict() if snapshot.exists else None,
+                    rollup["median_price"], rollup["count"], rollup["min_price"]
+                )
+                transaction.set(ref, {
+                    **aggregate,
+                    "trip_id": rollup["trip_id"],
+                    "route": rollup["route"],
+                    "cabin_class": rollup["cabin_class"],
+                    "updated_at": datetime.now(timezone.utc),
+                })
+
+        update(self.db.transaction())
+        self.tracer.count("firestore_reads", len(refs))
+        self.tracer.count("firestore_writes", len(refs))
 
     def get_rolling_average(self, trip_id: str, route: str, cabin_class: str) -> float | None:
-        """Calculate rolling average from last 7 scans."""
+        """Average of the median prices of the last 7 scans, from the price_stats aggregate."""
+        self._wait_for_writes(trip_id, route)
+        snapshot = self.db.collection("price_stats").document(price_stats_id(trip_id, route, cabin_class)).get()
+        self.tracer.count("firestore_reads")
+        recent = snapshot.to_dict().get("recent_scan_medians") if snapshot.exists else None
+        if recent is None:
+            # No aggregate yet: read the whole-cabin summaries of recent scans
+            query = (
+                self.db.collection("scan_summaries")
+                .where("trip_id", "==", trip_id)
+                .where("route", "==", route)
+                .where("cabin_class", "==", cabin_class)
+                .where("departure_date", "==", ROLLUP)
+                .order_by("scanned_at", direction="DESCENDING")
+                .limit(ROLLING_WINDOW)
+            )
+            try:
+                recent = [doc.to_dict()["median_price"] for doc in query.stream()]
+            except Exception as e:
+                # Most likely the composite index is missing; no average means no drop alerts
+                print(f"Rolling average query failed: {type(e).__name__}")
+                return None
+            self.tracer.count("firestore_reads", len(recent))
+
+        if not recent:
+            return None
+
+        return sum(recent) / len(recent)
+
+    def get_pair_history(self, trip_id: str, route: str, cabin_class: str, limit: int = 500) -> dict[tuple[str, str], list[float]]:
+        """Per date pair, the cheapest price seen in each recent scan (or tier bucket), newest first."""
+        self._wait_for_writes(trip_id, route)
         query = (
-            self.db.collection("price_history")
+            self.db.collection("scan_summaries")
             .where("trip_id", "==", trip_id)
             .where("route", "==", route)
             .where("cabin_class", "==", cabin_class)
             .order_by("scanned_at", direction="DESCENDING")
-            .limit(7)
+            .limit(limit)
         )
 
-        prices = [doc.to_dict()["price"] for doc in query.stream()]
+        history: dict[tuple[str, str], list[float]] = {}
+        reads = 0
+        for doc in query.stream():
+            reads += 1
+            row = doc.to_dict()
+            if row["departure_date"] == ROLLUP:
+                continue
+            # Rows arrive newest first, so append order is already newest first
+            history.setdefault((row["departure_date"], row["return_date"]), []).append(row["min_price"])
+        self.tracer.count("firestore_reads", reads)
+        return history
 
-        if not prices:
-            return None
+    def rebuild_price_stats(self, trip_id: str | None = None) -> int:
+        """Regenerate scan summaries from the offer rows still in price_history, then the
+        price_stats aggregates from the summaries. Returns aggregates written."""
+        history = self.db.collection("price_history")
+        if trip_id:
+            history = history.where("trip_id", "==", trip_id)
+        scans: dict[tuple, list[dict]] = {}
+        for doc in history.stream():
+            row = doc.to_dict()
+            scans.setdefault((row["trip_id"], row["route"], row["scanned_at"]), []).append(row)
+        summary_collection = self.db.collection("scan_summaries")
+        self._commit_all([
+            (summary_collection.document(summary_id(summary, "scan", scanned_at)), summary)
+            for (scan_trip_id, route, scanned_at), rows in scans.items()
+            for summary in scan_summaries(scan_trip_id, route, scanned_at, rows)
+        ])
+
+        query = summary_collection.where("departure_date", "==", ROLLUP)
+        if trip_id:
+            query = query.where("trip_id", "==", trip_id)
+        rollups: dict[str, list[dict]] = {}
+        for doc in query.stream():
+            row = doc.to_dict()
+            rollups.setdefault(price_stats_id(row["trip_id"], row["route"], row["cabin_class"]), []).append(row)
+
+        collection = self.db.collection("price_stats")
+        writes = []
+        for stats_id, rows in rollups.items():
+            rows.sort(key=lambda row: row["scanned_at"])
+            aggregate = None
+            for row in rows:
+                aggregate = fold_scan(aggregate, row["median_price"], row["count"], row["min_price"])
+            first = rows[0]
+            writes.append((collection.document(stats_id), {
+                **aggregate,
+                "trip_id": first["trip_id"],
+                "route": first["route"],
+                "cabin_class": first["cabin_class"],
+                "updated_at": datetime.now(timezone.utc),
+            }))
+        self._commit_all(writes)
+        return len(writes)
+
+    def _commit_all(self, writes: list[tuple]) -> None:
+        for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+            report = self._commit_batch(writes[start:start + FIRESTORE_BATCH_LIMIT])
+            if report["failed"]:
+                raise RuntimeError(f"Batch commit failed: {report['errors']}")
+
+    def compact_history(
+        self,
+        raw_days: int = 30,
+        daily_after_days: int = 30,
+        weekly_after_days: int = 180,
+        now: datetime | None = None
+    ) -> dict:
+        """Delete offer rows and offer_stats older than raw_days and downsample old scan
+        summaries into daily, then weekly, tiers. Returns counts of what was written and deleted."""
+        now = now or datetime.now(timezone.utc)
+        report = {
+            "raw_deleted": 0, "offer_stats_deleted": 0,
+            "daily_written": 0, "weekly_written": 0, "summaries_deleted": 0,
+        }
+
+        # offer_stats only cover scans' unstored offers, so they go with the offer rows
+        for collection, key in (("price_history", "raw_deleted"), ("offer_stats", "offer_stats_deleted")):
+            old_rows = self.db.collection(collection).where("scanned_at", "<", now - timedelta(days=raw_days))
+            deletes = [(doc.reference, None) for doc in old_rows.stream()]
+            self._commit_all(deletes)
+            report[key] = len(deletes)
+
+        # Scan summaries stay at least as long as the offer rows they could be rebuilt from
+        cutoffs = {
+            "daily": bucket_start(now - timedelta(days=max(daily_after_days, raw_days)), "daily"),
+            "weekly": bucket_start(now - timedelta(days=weekly_after_days), "weekly"),
+        }
+        for source_tier, tier in (("scan", "daily"), ("daily", "weekly")):
+            query = (
+                self.db.collection("scan_summaries")
+                .where("tier", "==", source_tier)
+                .where("scanned_at", "<", cutoffs[tier])
+            )
+            rows = [(doc.id, doc.to_dict()) for doc in query.stream()]
+            written, deleted = self._write_tier(downsample(rows, tier), tier)
+            report[f"{tier}_written"] = written
+            report["summaries_deleted"] += deleted
+
+        print(f"History compaction: {report}")
+        return report
+
+    def _write_tier(self, groups: list[tuple[dict, list[str]]], tier: str) -> tuple[int, int]:
+        """Write each bucket summary and delete its sources in the same atomic batch."""
+        collection = self.db.collection("scan_summaries")
+        batches: list[list[tuple]] = [[]]
+        for summary, source_ids in groups:
+            ops = [(collection.document(summary_id(summary, tier, summary["scanned_at"])), summary)]
+            ops.extend((collection.document(source_id), None) for source_id in source_ids)
+            if batches[-1] and len(batches[-1]) + len(ops) > FIRESTORE_BATCH_LIMIT:
+                batches.append([])
+            batches[-1].extend(ops)
+        for ops in batches:
+            # A bucket with more sources than one batch holds is split, losing atomicity only there
+            self._commit_all(ops)
+        return len(groups), sum(len(source_ids) for _, source_ids in groups)
+
+    def get_active_trips(self) -> list[tuple[str, dict]]:
+        trips = self.db.collection("trips").where("active", "==", True).stream()
+        return [(doc.id, doc.to_dict()) for doc in trips]
+
+    def get_due_trips(self, now: datetime) -> list[tuple[str, dict]]:
+        # Composite index on (active, next_scan_due); trips with no next_scan_due never match
+        trips = (
+            self.db.collection("trips")
+            .where("active", "==", True)
+            .where("next_scan_due", "<=", now)
+            .stream()
+        )
+        due = [(doc.id, doc.to_dict()) for doc in trips]
+        self.tracer.count("firestore_reads", len(due))
+        return due
+
+    def _put_trip(self, trip_id: str, trip: dict) -> None:
+        self.db.collection("trips").document(trip_id).set(trip)
+        self.tracer.count("firestore_writes")
 
-        return sum(prices) / len(prices)
+    def update_trip(self, trip_id: str, fields: dict) -> None:
+        self.db.collection("trips").document(trip_id).update(fields)
+        self.tracer.count("firestore_writes")
@@ -0,0 +1,77 @@
+import heapq
+from datetime import date
+
+# Outbound leg fields copied onto the composed offer as return_* fields
+RETURN_LEG_FIELDS = [
+    "airlines", "stops", "duration_minutes", "layover_cities",
+    "flight_numbers", "departure_time", "arrival_time",
+]
+
+
+def combine_legs(outbound: dict, inbound: dict) -> dict:
+    """Build a round-trip offer dict from two one-way offers."""
+    combined = dict(outbound)
+    combined.update({
+        "offer_id": f"{outbound['offer_id']}+{inbound['offer_id']}",
+        "price": round(outbound["price"] + inbound["price"], 2),
+        "return_date": inbound["departure_date"],
+        "seats_remaining": min(outbound.get("seats_remaining", 0), inbound.get("seats_remaining", 0)),
+        "composed": True,
+    })
+    for field in RETURN_LEG_FIELDS:
+        combined[f"return_{field}"] = inbound[field]
+    return combined
+
+
+def compose_round_trips(
+    outbound_by_date: dict[str, list[dict]],
+    inbound_by_date: dict[str, list[dict]],
+    min_days: int,
+    max_days: int,
+    top_k: int = 20
+) -> list[dict]:
+    """Cheapest top_k outbound+inbound combinations within the trip length limits.
+
+    Each date's legs are sorted by price, so date pairs are visited cheapest-minimum
+    first and every loop stops as soon as it can't beat the current k-th best total.
+    """
+    if top_k <= 0:
+        return []
+    outbound = {d: sorted(legs, key=lambda x: x["price"]) for d, legs in outbound_by_date.items() if legs}
+    inbound = {d: sorted(legs, key=lambda x: x["price"]) for d, legs in inbound_by_date.items() if legs}
+
+    date_pairs = []
+    for dep_date, out_legs in outbound.items():
+        for ret_date, in_legs in inbound.items():
+            days = (date.fromisoformat(ret_date) - date.fromisoformat(dep_date)).days
+            if min_days <= days <= max_days:
+                date_pairs.append((out_legs[0]["price"] + in_legs[0]["price"], dep_date, ret_date))
+    date_pairs.sort()
+
+    # Max-heap of the best totals so far: (-price, tiebreak, out_leg, in_leg)
+    best: list[tuple] = []
+    counter = 0
+
+    def kth_price() -> float:
+        return -best[0][0] if len(best) == top_k else float("inf")
+
+    for min_total, dep_date, ret_date in date_pairs:
+        if min_total >= kth_price():
+            break
+        in_legs = inbound[ret_date]
+        for out_leg in outbound[dep_date]:
+            if out_leg["price"] + in_legs[0]["price"] >= kth_price():
+                break
+            for in_leg in in_legs:
+                total = out_leg["price"] + in_leg["price"]
+                if total >= kth_price():
+                    break
+                counter += 1
+                entry = (-total, -counter, out_leg, in_leg)
+                if len(best) < top_k:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heapreplace(best, entry)
+
+    ordered = sorted(best, key=lambda entry: (-entry[0], -entry[1]))
+    return [combine_legs(out_leg, in_leg) for _, _, out_leg, in_leg in ordered]
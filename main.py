@@ -1,85 +1,222 @@
 # main.py
-import functions_framework
-from google.cloud import firestore, secretmanager
-from datetime import datetime, timezone, timedelta
+import time
+_IMPORT_STARTED = time.perf_counter()
 
-from amadeus_client import AmadeusClient
+import os
+import threading
+import functions_framework
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from amadeus_client import AmadeusClient, new_sdk_client
+from date_planner import (
+    all_date_pairs, generate_date_pairs, leg_dates, select_adaptive_pairs, select_calendar_pairs
+)
 from firestore_price_tracker import PriceTracker
-from slack_notifier import SlackNotifier
+from lazy_imports import lazy_import
+from offers import OfferList, summarize_prices
+from price_store import PriceStore
+from quota import QuotaLedger, SQLiteQuotaLedger, allocate_budget
+from rate_limiter import TokenBucket
+from resilience import Deadline, ResilientCaller
+from route_planner import prioritize_routes, route_name, update_route_stats
+from search_cache import SearchCache, build_search_cache
+from search_planner import SearchPlanner
+from slack_delivery import SlackDelivery, new_session
+from slack_notifier import SlackNotifier, results_fingerprint
+from sqlite_price_tracker import SQLitePriceTracker
+from tracing import NULL_TRACER, RunProfiler, Tracer
+from trip_config import next_scan_due, normalize_trip
+
+# google.cloud loads on first use, so invocations with nothing due skip most of it
+firestore = lazy_import("google.cloud.firestore")
+secretmanager = lazy_import("google.cloud.secretmanager")
+# Only loaded (with httpx) when AMADEUS_TRANSPORT=async
+amadeus_transport = lazy_import("amadeus_transport")
+IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000)
+
+# Max Amadeus searches in flight at once across the run
+MAX_CONCURRENT_SEARCHES = int(os.environ.get("MAX_CONCURRENT_SEARCHES", "5"))
+# Deep searches (date pairs) per trip unless the trip sets max_pairs
+DEFAULT_MAX_PAIRS = 5
+# Max trips processed at once
+MAX_CONCURRENT_TRIPS = int(os.environ.get("MAX_CONCURRENT_TRIPS", "4"))
+# Amadeus transactions per second shared by all trips (test env allows 10 TPS)
+AMADEUS_MAX_TPS = float(os.environ.get("AMADEUS_MAX_TPS", "10"))
+AMADEUS_BURST = float(os.environ.get("AMADEUS_BURST", "1"))
+# Monthly Amadeus call allowance (free test environment: 2,000)
+AMADEUS_MONTHLY_QUOTA = int(os.environ.get("AMADEUS_MONTHLY_QUOTA", "2000"))
+# Search all cabins of a date pair in one request, falling back per cabin
+MULTI_CABIN_SEARCH = os.environ.get("MULTI_CABIN_SEARCH", "false").lower() == "true"
+MULTI_CABIN_MIN_OFFERS = int(os.environ.get("MULTI_CABIN_MIN_OFFERS", "3"))
+# Amadeus transport: sdk (blocking SDK client) or async (pooled native client)
+AMADEUS_TRANSPORT = os.environ.get("AMADEUS_TRANSPORT", "sdk")
+AMADEUS_BASE_URL = os.environ.get("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
+AMADEUS_MAX_CONNECTIONS = int(os.environ.get("AMADEUS_MAX_CONNECTIONS", "10"))
+# Share OAuth tokens between instances through Firestore
+AMADEUS_SHARED_TOKEN = os.environ.get("AMADEUS_SHARED_TOKEN", "true").lower() == "true"
+# Round trips kept per cabin when composing one-way legs
+ONE_WAY_TOP_K = int(os.environ.get("ONE_WAY_TOP_K", "20"))
+# Offers requested per search, and the filtered count below which the search is widened
+# (0 = never widen; each widening is an extra quota-counted call)
+MAX_OFFERS_PER_SEARCH = int(os.environ.get("MAX_OFFERS_PER_SEARCH", "20"))
+MIN_FILTERED_OFFERS = int(os.environ.get("MIN_FILTERED_OFFERS", "0"))
+# Fully parse only the cheapest N offers per search and cabin (0 = parse all)
+PARSE_TOP_K = int(os.environ.get("PARSE_TOP_K", "0"))
+# Response cache for Amadeus searches: memory, disk, firestore or none
+SEARCH_CACHE_BACKEND = os.environ.get("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_TTL_SECONDS = float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "256"))
+# Price history and trip config storage: firestore, or sqlite for local and self-hosted runs
+PRICE_STORE = os.environ.get("PRICE_STORE", "firestore")
+SQLITE_DB_PATH = os.environ.get("SQLITE_DB_PATH", "fare-scout.db")
+# Full offer rows are kept this long; older scan summaries are downsampled to daily, then weekly
+PRICE_HISTORY_RAW_DAYS = int(os.environ.get("PRICE_HISTORY_RAW_DAYS", "30"))
+SUMMARY_DAILY_AFTER_DAYS = int(os.environ.get("SUMMARY_DAILY_AFTER_DAYS", "30"))
+SUMMARY_WEEKLY_AFTER_DAYS = int(os.environ.get("SUMMARY_WEEKLY_AFTER_DAYS", "180"))
+# Commit price history batches on background threads while scoring continues
+BACKGROUND_PRICE_WRITES = os.environ.get("BACKGROUND_PRICE_WRITES", "true").lower() == "true"
+# Stop starting or retrying Amadeus calls this long into a run (function timeout is 300s)
+RUN_DEADLINE_SECONDS = float(os.environ.get("RUN_DEADLINE_SECONDS", "240"))
+# Stop starting or retrying Slack posts this long into a run; later than the Amadeus
+# deadline so results found just before it still go out
+SLACK_DEADLINE_SECONDS = float(os.environ.get("SLACK_DEADLINE_SECONDS", "280"))
+# Attempts per Amadeus call for 429/5xx/network errors, with jittered exponential backoff
+AMADEUS_MAX_ATTEMPTS = int(os.environ.get("AMADEUS_MAX_ATTEMPTS", "4"))
+# Consecutive failures that stop calls to an endpoint, and how long before one is retried
+AMADEUS_BREAKER_THRESHOLD = int(os.environ.get("AMADEUS_BREAKER_THRESHOLD", "5"))
+AMADEUS_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("AMADEUS_BREAKER_COOLDOWN_SECONDS", "30"))
+# Send a second copy of a call slower than this (0 = never hedge)
+AMADEUS_HEDGE_AFTER_SECONDS = float(os.environ.get("AMADEUS_HEDGE_AFTER_SECONDS", "0"))
+# Warm instances reuse fetched secrets this long before fetching them again
+SECRET_CACHE_TTL_SECONDS = float(os.environ.get("SECRET_CACHE_TTL_SECONDS", "600"))
+# Log every span as a JSON line; the per-run summary is always logged
+TRACE_SPANS = os.environ.get("TRACE_SPANS", "true").lower() == "true"
+# Functions listed in the report of a ?profile=1 run
+PROFILE_TOP_FUNCTIONS = int(os.environ.get("PROFILE_TOP_FUNCTIONS", "40"))
+
+# Kept at module level so warm instances reuse cached responses, connections and tokens
+_search_cache: SearchCache | None = None
+_amadeus_transport: "amadeus_transport.AsyncAmadeusTransport | None" = None
+_slack_session: requests.Session | None = None
+_firestore_client = None
+_secret_client = None
+_amadeus_sdk: tuple[str, object] | None = None
+# (project_id, secret_id) -> (expires_at, value)
+_secret_cache: dict[tuple[str, str], tuple[float, str]] = {}
+_secret_lock = threading.Lock()
+_invocations = 0
+
+
+def get_firestore_client():
+    """Return the process-wide Firestore client, building it on first use."""
+    global _firestore_client
+    if _firestore_client is None:
+        _firestore_client = firestore.Client()
+    return _firestore_client
+
+
+def get_secret_client():
+    """Return the process-wide Secret Manager client, building it on first use."""
+    global _secret_client
+    if _secret_client is None:
+        _secret_client = secretmanager.SecretManagerServiceClient()
+    return _secret_client
 
 
 def get_secret(project_id: str, secret_id: str) -> str:
     """Fetch secret from Secret Manager."""
-    client = secretmanager.SecretManagerServiceClient()
     name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
+    response = get_secret_client().access_secret_version(request={"name": name})
     return response.payload.data.decode("UTF-8")
 
 
-REQUIRED_TRIP_FIELDS = [
-    "origins", "destinations", "airlines", "cabin_classes",
-    "departure_date_range", "return_date_range", "min_trip_days",
-    "max_trip_days", "scan_window", "scan_frequency_days",
-    "alert_on_rolling_avg_drop_pct", "currency"
-]
+def get_secrets(project_id: str, secret_ids: list[str]) -> list[str]:
+    """Fetch secrets in parallel, reusing values fetched within SECRET_CACHE_TTL_SECONDS."""
+    now = time.monotonic()
+    with _secret_lock:
+        stale = [
+            secret_id for secret_id in secret_ids
+            if _secret_cache.get((project_id, secret_id), (0.0, ""))[0] <= now
+        ]
+    if stale:
+        # Build the shared client once rather than racing to build it in every worker
+        get_secret_client()
+        with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+            values = list(executor.map(lambda secret_id: get_secret(project_id, secret_id), stale))
+        with _secret_lock:
+            for secret_id, value in zip(stale, values):
+                _secret_cache[(project_id, secret_id)] = (now + SECRET_CACHE_TTL_SECONDS, value)
+    with _secret_lock:
+        return [_secret_cache[(project_id, secret_id)][1] for secret_id in secret_ids]
+
+
+def get_search_cache() -> SearchCache | None:
+    """Return the process-wide search cache, building it on first use."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = build_search_cache(
+            SEARCH_CACHE_BACKEND,
+            ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+            max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            firestore_client=get_firestore_client() if SEARCH_CACHE_BACKEND == "firestore" else None
+        )
+    return _search_cache
 
 
-def validate_trip(trip: dict, trip_id: str) -> bool:
-    """Validate trip has required fields. Returns False if invalid."""
-    for field in REQUIRED_TRIP_FIELDS:
-        if field not in trip:
-            print(f"Skipping {trip_id}: missing required field '{field}'")
-            return False
-    return True
+def build_price_store(background_writes: bool = False, tracer: Tracer | None = None) -> PriceStore:
+    """Price store for the PRICE_STORE backend: firestore or sqlite."""
+    if PRICE_STORE == "firestore":
+        return PriceTracker(get_firestore_client(), background_writes=background_writes, tracer=tracer)
+    if PRICE_STORE == "sqlite":
+        return SQLitePriceTracker(SQLITE_DB_PATH, background_writes=background_writes, tracer=tracer)
+    raise ValueError(f"Invalid price store: {PRICE_STORE!r} (expected firestore or sqlite)")
 
 
-def should_scan(trip: dict) -> bool:
-    """Check if trip should be scanned today."""
-    today = datetime.now(timezone.utc).date()
+def build_quota_ledger() -> QuotaLedger:
+    """Quota ledger kept next to the price store: in SQLITE_DB_PATH with PRICE_STORE=sqlite."""
+    if PRICE_STORE == "sqlite":
+        return SQLiteQuotaLedger(SQLITE_DB_PATH, monthly_limit=AMADEUS_MONTHLY_QUOTA)
+    return QuotaLedger(get_firestore_client(), monthly_limit=AMADEUS_MONTHLY_QUOTA)
 
-    # Check scan window
-    window_start = datetime.fromisoformat(trip["scan_window"]["start"]).date()
-    window_end = datetime.fromisoformat(trip["scan_window"]["end"]).date()
-    if not (window_start <= today <= window_end):
-        return False
 
-    # Check scan frequency
-    last_scanned = trip.get("last_scanned")
-    if last_scanned:
-        if hasattr(last_scanned, 'date'):
-            last_date = last_scanned.date()
-        else:
-            last_date = datetime.fromisoformat(str(last_scanned)).date()
-        days_since = (today - last_date).days
-        if days_since < trip["scan_frequency_days"]:
-            return False
-
-    return True
-
-
-def generate_date_pairs(dep_range: list, ret_range: list, min_days: int, max_days: int, max_pairs: int = 5) -> list:
-    """Generate departure/return date pairs within constraints."""
-    dep_start = datetime.fromisoformat(dep_range[0]).date()
-    dep_end = datetime.fromisoformat(dep_range[1]).date()
-    ret_start = datetime.fromisoformat(ret_range[0]).date()
-    ret_end = datetime.fromisoformat(ret_range[1]).date()
-
-    pairs = []
-    dep_date = dep_start
-    while dep_date <= dep_end:
-        ret_date = ret_start
-        while ret_date <= ret_end:
-            days = (ret_date - dep_date).days
-            if min_days <= days <= max_days:
-                pairs.append((dep_date.isoformat(), ret_date.isoformat()))
-            ret_date += timedelta(days=2)  # Sample every 2 days
-        dep_date += timedelta(days=2)  # Sample every 2 days
-
-    # Return evenly spaced sample
-    if len(pairs) <= max_pairs:
-        return pairs
-    step = len(pairs) // max_pairs
-    return [pairs[i * step] for i in range(max_pairs)]
+def get_amadeus_transport(api_key: str, api_secret: str) -> "amadeus_transport.AsyncAmadeusTransport | None":
+    """Return the process-wide async transport when enabled, building it on first use."""
+    global _amadeus_transport
+    if AMADEUS_TRANSPORT != "async":
+        return None
+    if _amadeus_transport is None or _amadeus_transport.api_key != api_key:
+        # Rotated credentials: drop the old pool
+        if _amadeus_transport is not None:
+            _amadeus_transport.close()
+        _amadeus_transport = amadeus_transport.AsyncAmadeusTransport(
+            api_key,
+            api_secret,
+            base_url=AMADEUS_BASE_URL,
+            max_connections=AMADEUS_MAX_CONNECTIONS,
+            token_store=amadeus_transport.FirestoreTokenStore(get_firestore_client()) if AMADEUS_SHARED_TOKEN else None
+        )
+    return _amadeus_transport
+
+
+def get_amadeus_sdk(api_key: str, api_secret: str):
+    """Return the process-wide Amadeus SDK client, which keeps its access token
+    between invocations; None when the async transport replaces it."""
+    global _amadeus_sdk
+    if AMADEUS_TRANSPORT == "async":
+        return None
+    if _amadeus_sdk is None or _amadeus_sdk[0] != api_key:
+        _amadeus_sdk = (api_key, new_sdk_client(api_key, api_secret))
+    return _amadeus_sdk[1]
+
+
+def get_slack_session() -> requests.Session:
+    """Return the process-wide keep-alive session for Slack webhooks."""
+    global _slack_session
+    if _slack_session is None:
+        _slack_session = new_session()
+    return _slack_session
 
 
 def calculate_drop_pct(price: float, rolling_avg: float | None, threshold_pct: int) -> int | None:
@@ -90,112 +227,413 @@ def calculate_drop_pct(price: float, rolling_avg: float | None, threshold_pct: i
     return int(drop) if drop >= threshold_pct else None
 
 
-@functions_framework.http
-def check_flights(request):
-    """Main Cloud Function entry point."""
-    import os
-    project_id = os.environ.get("GCP_PROJECT") or os.environ.get("GOOGLE_CLOUD_PROJECT")
+def plan_date_pairs(
+    amadeus: AmadeusClient,
+    tracker: PriceStore,
+    trip_id: str,
+    trip: dict,
+    origin: str,
+    destination: str
+) -> list[tuple[str, str]]:
+    """Choose the date pairs to deep-search on one route, within the trip's max_pairs budget."""
+    max_pairs = trip.get("max_pairs", DEFAULT_MAX_PAIRS)
+    args = (
+        trip["departure_date_range"],
+        trip["return_date_range"],
+        trip["min_trip_days"],
+        trip["max_trip_days"],
+    )
+
+    if trip.get("date_strategy") == "calendar":
+        # Cheap price-calendar pre-screen, then deep search only the best pairs
+        try:
+            calendar = amadeus.get_cheapest_dates(
+                origin=origin,
+                destination=destination,
+                departure_range=tuple(trip["departure_date_range"]),
+                return_range=tuple(trip["return_date_range"]),
+                duration_range=(trip["min_trip_days"], trip["max_trip_days"])
+            )
+            return select_calendar_pairs(calendar, *args, max_pairs=max_pairs)
+        except Exception as e:
+            print(f"Calendar pre-screen failed, sampling instead: {type(e).__name__}")
+
+    if trip.get("date_strategy") == "adaptive":
+        # Build coverage of the full grid over successive scans, guided by history
+        route = route_name(origin, destination)
+        try:
+            history = tracker.get_pair_history(trip_id, route, trip["cabin_classes"][0])
+        except Exception as e:
+            print(f"Pair history unavailable, sampling instead: {type(e).__name__}")
+        else:
+            today = datetime.now(timezone.utc).date().isoformat()
+            return select_adaptive_pairs(
+                all_date_pairs(*args),
+                history,
+                max_pairs=max_pairs,
+                explore_ratio=trip.get("explore_ratio", 0.2),
+                seed=f"{trip_id}:{route}:{today}"
+            )
+
+    return generate_date_pairs(*args, max_pairs=max_pairs)
+
+
+def score_route(
+    trip_id: str,
+    trip: dict,
+    route: str,
+    cabin_offers: dict[str, list[dict]],
+    tracker: PriceStore,
+    tracer: Tracer = NULL_TRACER
+) -> dict[str, list[dict]]:
+    """Store a route's offers and annotate drops vs the rolling average, cheapest first."""
+    all_results = {}
+
+    # Start every cabin's writes before reading averages so background writes overlap
+    cabin_stats = {}
+    for cabin_class, offers in cabin_offers.items():
+        stats = offers.stats if isinstance(offers, OfferList) else summarize_prices(o["price"] for o in offers)
+        # Store prices, plus stats covering offers a top-k parse skipped
+        truncated = isinstance(offers, OfferList) and offers.truncated
+        if offers or truncated:
+            with tracer.span("store_prices", trip_id=trip_id, route=route, offers=len(offers)):
+                tracker.store_prices(
+                    trip_id, route, offers, offer_stats={cabin_class: stats} if truncated else None
+                )
+        cabin_stats[cabin_class] = stats
 
-    # Get secrets
-    amadeus_key = get_secret(project_id, "amadeus-api-key")
-    amadeus_secret = get_secret(project_id, "amadeus-api-secret")
-    default_slack_webhook = get_secret(project_id, "slack-webhook-url")
+    for cabin_class, offers in cabin_offers.items():
+        # Calculate drops
+        with tracer.span("get_rolling_average", trip_id=trip_id, route=route, cabin_class=cabin_class):
+            rolling_avg = tracker.get_rolling_average(trip_id, route, cabin_class)
+        for offer in offers:
+            offer["drop_pct"] = calculate_drop_pct(
+                offer["price"],
+                rolling_avg,
+                trip["alert_on_rolling_avg_drop_pct"]
+            )
 
-    # Initialize clients
-    db = firestore.Client()
-    amadeus = AmadeusClient(amadeus_key, amadeus_secret)
-    tracker = PriceTracker(db)
+        all_results[cabin_class] = sorted(offers, key=lambda x: x["price"])
+        print(f"  {trip_id} {route} {cabin_class}: {cabin_stats[cabin_class]['count']} offers found, {len(offers)} parsed")
+
+    return all_results
+
+
+def process_trip(
+    trip_id: str,
+    trip: dict,
+    routes: list[tuple[str, str]],
+    planner: SearchPlanner,
+    tracker: PriceStore,
+    default_slack_webhook: str,
+    delivery: SlackDelivery,
+    tracer: Tracer = NULL_TRACER
+) -> None:
+    """Store, score and notify one trip's search results, then mark it scanned.
+
+    A trip with searches stopped by the run deadline or a circuit breaker is not marked
+    scanned, so it stays due and its route stats are left alone.
+    """
+    registered, stopped = planner.search_counts(trip_id)
+    if registered and stopped == registered:
+        print(f"{trip_id} not scanned: all {registered} searches stopped before they ran")
+        return
+
+    # Use trip-specific webhook if set, otherwise default
+    webhook_url = trip.get("slack_webhook_url") or default_slack_webhook
+    notifier = SlackNotifier(webhook_url, delivery=delivery)
+
+    route_results = {}
+    for origin, destination in routes:
+        route = route_name(origin, destination)
+        cabin_offers = planner.results_for(trip_id, origin, destination)
+        route_results[route] = score_route(trip_id, trip, route, cabin_offers, tracker, tracer)
+
+    # Send notification
+    total_offers = sum(len(o) for results in route_results.values() for o in results.values())
+    print(f"{trip_id} total offers: {total_offers}, always_notify: {trip.get('always_notify')}")
+
+    wants_notification = trip["always_notify"] or any(
+        offer.get("drop_pct")
+        for results in route_results.values()
+        for cabin_offers in results.values()
+        for offer in cabin_offers
+    )
+    fingerprint = results_fingerprint(route_results)
+    unchanged = fingerprint == trip.get("last_notification_fingerprint") and not trip.get("notify_unchanged")
+    if wants_notification and unchanged:
+        print(f"{trip_id} no notification: same offers as the last notification")
+    elif wants_notification:
+        # One section per route with offers; the first route stands in when none have any
+        sections = [
+            (origin, destination) for origin, destination in routes
+            if any(route_results[route_name(origin, destination)].values())
+        ] or routes[:1]
+        with tracer.span("format_message", trip_id=trip_id, routes=len(sections)):
+            messages = [
+                notifier.format_message(
+                    trip["label"], origin, destination,
+                    route_results[route_name(origin, destination)], trip["currency"],
+                    departure_range=tuple(trip["departure_date_range"]),
+                    return_range=tuple(trip["return_date_range"])
+                )
+                for origin, destination in sections
+            ]
+        message = messages[0] if len(messages) == 1 else "\n".join(messages)
+
+        def delivered(future):
+            print(f"{trip_id} Slack notification sent: {future.result()}")
+            if not future.result():
+                return
+            try:
+                tracker.update_trip(trip_id, {"last_notification_fingerprint": fingerprint})
+            except Exception as e:
+                # Worst case the same offers are posted again next scan
+                print(f"{trip_id} fingerprint not saved: {type(e).__name__}")
+
+        # Delivered in the background while the next trip is processed
+        notifier.enqueue(message, digest=trip.get("notification_mode") == "digest").add_done_callback(delivered)
+    else:
+        print(f"{trip_id} no notification: no drops and always_notify=False")
+
+    if stopped:
+        print(f"{trip_id} not marked scanned: {stopped}/{registered} searches stopped before they ran")
+        return
+
+    # Update last_scanned only once the trip completed
+    scanned_at = datetime.now(timezone.utc)
+    tracker.update_trip(trip_id, {
+        "last_scanned": scanned_at,
+        "next_scan_due": next_scan_due(dict(trip, last_scanned=scanned_at), scanned_at),
+        "route_stats": update_route_stats(trip, route_results),
+    })
+
+
+def register_route(
+    planner: SearchPlanner,
+    trip_id: str,
+    trip: dict,
+    origin: str,
+    destination: str,
+    date_pairs: list[tuple[str, str]] | None,
+    probe: bool
+) -> None:
+    """Register a route's searches, or only its first search when probing."""
+    if date_pairs is None:
+        # Search each leg per date and build round trips locally
+        departures, returns = leg_dates(
+            trip["departure_date_range"], trip["return_date_range"],
+            trip["min_trip_days"], trip["max_trip_days"]
+        )
+        if probe:
+            departures, returns = departures[:1], []
+        planner.add_one_way_trip(trip_id, trip, origin, destination, departures, returns)
+    else:
+        planner.add_trip(trip_id, trip, origin, destination, date_pairs[:1] if probe else date_pairs)
+
+
+def run_trips(
+    due_trips: list[tuple[str, dict]],
+    amadeus: AmadeusClient,
+    tracker: PriceStore,
+    default_slack_webhook: str,
+    delivery: SlackDelivery,
+    tracer: Tracer = NULL_TRACER
+) -> None:
+    """Plan and run all searches for the due trips, then process each trip in parallel."""
+    # Identical searches across trips run once
+    planner = SearchPlanner(
+        amadeus,
+        max_workers=MAX_CONCURRENT_SEARCHES,
+        multi_cabin=MULTI_CABIN_SEARCH,
+        min_offers_per_cabin=MULTI_CABIN_MIN_OFFERS,
+        one_way_top_k=ONE_WAY_TOP_K,
+        max_results=MAX_OFFERS_PER_SEARCH,
+        min_results=MIN_FILTERED_OFFERS,
+        parse_top_k=PARSE_TOP_K
+    )
+    trip_routes = {trip_id: prioritize_routes(trip) for trip_id, trip in due_trips}
+    route_plans = [
+        (trip_id, trip, origin, destination)
+        for trip_id, trip in due_trips
+        for origin, destination in trip_routes[trip_id]
+    ]
+
+    def plan(item: tuple[str, dict, str, str]) -> list[tuple[str, str]] | None:
+        trip_id, trip, origin, destination = item
+        if trip.get("date_strategy") == "one_way":
+            return None
+        return plan_date_pairs(amadeus, tracker, trip_id, trip, origin, destination)
+
+    with tracer.span("plan_dates", routes=len(route_plans)), \
+            ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_TRIPS, len(route_plans)))) as pool:
+        route_dates = list(pool.map(plan, route_plans))
+
+    # Multi-route trips probe each route with one search first
+    multi_route = {trip_id for trip_id, routes in trip_routes.items() if len(routes) > 1}
+    for (trip_id, trip, origin, destination), date_pairs in zip(route_plans, route_dates):
+        register_route(planner, trip_id, trip, origin, destination, date_pairs, trip_id in multi_route)
+    with tracer.span("searches", probe=bool(multi_route)):
+        planner.execute()
+
+    # Then widen only the routes whose probe found offers
+    if multi_route:
+        for (trip_id, trip, origin, destination), date_pairs in zip(route_plans, route_dates):
+            if trip_id not in multi_route:
+                continue
+            if not planner.has_offers(trip_id, origin, destination):
+                print(f"  {trip_id} {route_name(origin, destination)}: no offers on probe, skipping route")
+                continue
+            register_route(planner, trip_id, trip, origin, destination, date_pairs, probe=False)
+        with tracer.span("searches", probe=False):
+            planner.execute()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_TRIPS, len(due_trips)))) as pool:
+        futures = [
+            pool.submit(
+                process_trip, trip_id, trip, trip_routes[trip_id],
+                planner, tracker, default_slack_webhook, delivery, tracer
+            )
+            for trip_id, trip in due_trips
+        ]
+        for future, (trip_id, _) in zip(futures, due_trips):
+            try:
+                future.result()
+            except Exception as e:
+                # One failed trip must not abort the run
+                print(f"Error processing {trip_id}: {type(e).__name__}")
 
-    # Get active trips
-    trips = db.collection("trips").where("active", "==", True).stream()
 
-    for trip_doc in trips:
-        trip = trip_doc.to_dict()
-        trip_id = trip_doc.id
+@functions_framework.http
+def check_flights(request):
+    """Main Cloud Function entry point. With ?profile=1 the run is profiled and the
+    top functions are logged."""
+    tracer = Tracer(log_spans=TRACE_SPANS)
+    try:
+        if request.args.get("profile") != "1":
+            return scan_trips(tracer)
+        with RunProfiler() as profiler:
+            result = scan_trips(tracer)
+        print(profiler.report(PROFILE_TOP_FUNCTIONS))
+        return result
+    finally:
+        tracer.emit_summary()
+
+
+def scan_trips(tracer: Tracer) -> str:
+    """Scan every due trip, recording spans and counters on tracer."""
+    global _invocations
+    _invocations += 1
+    startup = {"cold": _invocations == 1, "import_ms": IMPORT_MS}
+    deadline = Deadline(RUN_DEADLINE_SECONDS)
+    project_id = os.environ.get("GCP_PROJECT") or os.environ.get("GOOGLE_CLOUD_PROJECT")
+    with tracer.span("price_store"):
+        tracker = build_price_store(background_writes=BACKGROUND_PRICE_WRITES, tracer=tracer)
+
+    # Only trips whose next_scan_due has passed
+    now = datetime.now(timezone.utc)
+    due_trips = []
+    with tracer.span("trip_query") as span:
+        candidates = tracker.get_due_trips(now)
+        span["trips"] = len(candidates)
+    for trip_id, trip in candidates:
         print(f"Processing trip: {trip_id} ({trip.get('label', 'no label')})")
-
-        if not validate_trip(trip, trip_id):
+        try:
+            # Saved configs were validated, but trips edited by hand may not be
+            trip = normalize_trip(trip)
+            due = next_scan_due(trip, now)
+        except (KeyError, TypeError, ValueError) as e:
+            # Edited by hand into an invalid config; never due until fixed and re-saved
+            print(f"Skipping {trip_id}: invalid config ({type(e).__name__})")
+            tracker.update_trip(trip_id, {"next_scan_due": None})
             continue
-
-        if not should_scan(trip):
-            print(f"Skipping {trip_id}: should_scan=False")
+        if due is None or due > now:
+            # Scan window closed or config edited since next_scan_due was set
+            print(f"Skipping {trip_id}: not due")
+            tracker.update_trip(trip_id, {"next_scan_due": due})
             continue
+        due_trips.append((trip_id, trip))
 
-        # Use trip-specific webhook if set, otherwise default
-        webhook_url = trip.get("slack_webhook_url") or default_slack_webhook
-        notifier = SlackNotifier(webhook_url)
-
-        origin = trip["origins"][0]
-        destination = trip["destinations"][0]
-        route = f"{origin}-{destination}"
-
-        # Generate date pairs to search
-        date_pairs = generate_date_pairs(
-            trip["departure_date_range"],
-            trip["return_date_range"],
-            trip["min_trip_days"],
-            trip["max_trip_days"],
-            max_pairs=5
-        )
-
-        all_results = {}
-
-        for cabin_class in trip["cabin_classes"]:
-            offers = []
-            for dep_date, ret_date in date_pairs:
-                try:
-                    flight_offers = amadeus.get_flight_offers(
-                        origin=origin,
-                        destination=destination,
-                        departure_date=dep_date,
-                        return_date=ret_date,
-                        cabin_class=cabin_class,
-                        airlines=trip["airlines"],
-                        max_stops=trip["max_stops"],
-                        currency=trip["currency"]
-                    )
-                    offers.extend(flight_offers)
-                except Exception as e:
-                    # Log error type only, not full details (security)
-                    print(f"Error fetching {dep_date}-{ret_date}: {type(e).__name__}")
-                    continue
-
-            # Store prices
-            if offers:
-                tracker.store_prices(trip_id, route, offers)
-
-            # Calculate drops
-            rolling_avg = tracker.get_rolling_average(trip_id, route, cabin_class)
-            for offer in offers:
-                offer["drop_pct"] = calculate_drop_pct(
-                    offer["price"],
-                    rolling_avg,
-                    trip["alert_on_rolling_avg_drop_pct"]
-                )
+    if not due_trips:
+        print(f"Startup: {dict(startup, **tracer.durations())}")
+        return "OK"
 
-            all_results[cabin_class] = sorted(offers, key=lambda x: x["price"])
-            print(f"  {cabin_class}: {len(offers)} offers found")
+    with tracer.span("secrets"):
+        amadeus_key, amadeus_secret, default_slack_webhook = get_secrets(
+            project_id, ["amadeus-api-key", "amadeus-api-secret", "slack-webhook-url"]
+        )
 
-        # Send notification
-        total_offers = sum(len(o) for o in all_results.values())
-        print(f"Total offers: {total_offers}, always_notify: {trip.get('always_notify')}")
+    # Initialize clients; one limiter is shared by every trip's searches
+    with tracer.span("clients"):
+        rate_limiter = TokenBucket(rate=AMADEUS_MAX_TPS, capacity=AMADEUS_BURST)
+        search_cache = get_search_cache()
+        quota_ledger = build_quota_ledger()
+        resilience = ResilientCaller(
+            max_attempts=AMADEUS_MAX_ATTEMPTS,
+            deadline=deadline,
+            failure_threshold=AMADEUS_BREAKER_THRESHOLD,
+            cooldown=AMADEUS_BREAKER_COOLDOWN_SECONDS,
+            hedge_after=AMADEUS_HEDGE_AFTER_SECONDS or None
+        )
+        amadeus = AmadeusClient(
+            amadeus_key, amadeus_secret,
+            rate_limiter=rate_limiter, cache=search_cache, quota_ledger=quota_ledger,
+            transport=get_amadeus_transport(amadeus_key, amadeus_secret),
+            resilience=resilience,
+            sdk_client=get_amadeus_sdk(amadeus_key, amadeus_secret),
+            tracer=tracer
+        )
+        # Webhook posts have their own, later deadline
+        delivery = SlackDelivery(
+            session=get_slack_session(),
+            resilience=ResilientCaller(
+                base_delay=1, max_delay=30,
+                deadline=Deadline(max(SLACK_DEADLINE_SECONDS, RUN_DEADLINE_SECONDS))
+            ),
+            tracer=tracer
+        )
+    print(f"Startup: {dict(startup, **tracer.durations())}")
+
+    # Spend this run's share of the monthly quota, highest priority trips first
+    run_budget = quota_ledger.run_budget()
+    print(f"API quota: {quota_ledger.used_this_month()}/{AMADEUS_MONTHLY_QUOTA} used, run budget {run_budget}")
+    allocation = allocate_budget(due_trips, run_budget, DEFAULT_MAX_PAIRS)
+    # Widened searches only spend what the planned searches leave of the budget
+    amadeus.widen_budget = run_budget
+    budgeted_trips = []
+    for trip_id, trip in due_trips:
+        if not allocation[trip_id]:
+            print(f"Skipping {trip_id}: API quota budget exhausted")
+            continue
+        budgeted_trips.append((trip_id, dict(trip, max_pairs=allocation[trip_id])))
+    due_trips = budgeted_trips
+
+    if not due_trips:
+        return "OK"
+
+    try:
+        run_trips(due_trips, amadeus, tracker, default_slack_webhook, delivery, tracer)
+    finally:
+        with tracer.span("flush"):
+            print(f"Price writes: {tracker.flush()}")
+            print(f"Slack delivery: {delivery.flush()}")
+            delivery.close()
+            quota_ledger.flush()
+            resilience.close()
+
+    print(f"Amadeus resilience: {resilience.stats}")
+    if search_cache:
+        print(f"Search cache: {search_cache.stats}")
 
-        if trip["always_notify"] or any(
-            offer.get("drop_pct") for cabin_offers in all_results.values() for offer in cabin_offers
-        ):
-            message = notifier.format_message(
-                trip["label"], origin, destination, all_results, trip["currency"],
-                departure_range=tuple(trip["departure_date_range"]),
-                return_range=tuple(trip["return_date_range"])
-            )
-            success = notifier.send(message)
-            print(f"Slack notification sent: {success}")
-        else:
-            print("No notification: no drops and always_notify=False")
+    return "OK"
 
-        # Update last_scanned
-        db.collection("trips").document(trip_id).update({
-            "last_scanned": datetime.now(timezone.utc)
-        })
 
+@functions_framework.http
+def compact_history(request):
+    """Scheduled entry point: trim old offer rows and downsample old scan summaries."""
+    build_price_store().compact_history(
+        raw_days=PRICE_HISTORY_RAW_DAYS,
+        daily_after_days=SUMMARY_DAILY_AFTER_DAYS,
+        weekly_after_days=SUMMARY_WEEKLY_AFTER_DAYS
+    )
     return "OK"
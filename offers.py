@@ -0,0 +1,183 @@
+import sys
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, replace
+from operator import attrgetter
+
+_intern = sys.intern
+
+# Per-leg fields, exposed on offers as-is for the outbound leg and as return_* for the inbound leg
+LEG_FIELDS = (
+    "airlines", "stops", "duration_minutes", "layover_cities",
+    "flight_numbers", "departure_time", "arrival_time",
+)
+
+
+def parse_duration(duration: str) -> int:
+    """Parse ISO 8601 duration to minutes without regex. PT12H30M -> 750, P1DT2H -> 1560"""
+    total = 0
+    number = 0
+    for ch in duration:
+        if "0" <= ch <= "9":
+            number = number * 10 + ord(ch) - 48
+        elif ch == "H":
+            total += number * 60
+            number = 0
+        elif ch == "M":
+            total += number
+            number = 0
+        elif ch == "D":
+            total += number * 1440
+            number = 0
+        else:
+            number = 0
+    return total
+
+
+@dataclass(slots=True, frozen=True)
+class Leg:
+    airlines: list[str]
+    stops: int
+    duration_minutes: int
+    layover_cities: list[str]
+    flight_numbers: list[str]
+    departure_time: str
+    arrival_time: str
+
+
+def parse_leg(itinerary: dict) -> Leg:
+    """Parse one Amadeus itinerary, interning carrier, airport and flight codes."""
+    segments = itinerary["segments"]
+    airlines = []
+    flight_numbers = []
+    for seg in segments:
+        carrier = seg["carrierCode"]
+        # Operating carrier, falling back to marketing carrier
+        operating = _intern(seg.get("operating", {}).get("carrierCode") or carrier)
+        if operating not in airlines:
+            airlines.append(operating)
+        flight_numbers.append(_intern(f"{carrier} {seg.get('number', '')}"))
+    return Leg(
+        airlines=airlines,
+        stops=len(segments) - 1,
+        duration_minutes=parse_duration(itinerary["duration"]),
+        layover_cities=[_intern(seg["arrival"]["iataCode"]) for seg in segments[:-1]],
+        flight_numbers=flight_numbers,
+        departure_time=segments[0]["departure"]["at"],
+        arrival_time=segments[-1]["arrival"]["at"],
+    )
+
+
+@dataclass(slots=True, eq=False)
+class Offer(Mapping):
+    """Parsed flight offer. Reads like the offer dicts it replaces; to_dict() for storage."""
+    offer_id: str
+    price: float
+    currency: str
+    departure_date: str
+    return_date: str | None
+    cabin_class: str
+    fare_family: str
+    booking_class: str
+    baggage: str
+    seats_remaining: int
+    outbound: Leg
+    inbound: Leg | None = None
+    drop_pct: float | None = None
+
+    def __getitem__(self, key: str):
+        getter = _GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        try:
+            value = getter(self)
+        except AttributeError:
+            # return_* fields of a one-way offer
+            raise KeyError(key) from None
+        if value is None and key == "drop_pct":
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in _SETTABLE:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        keys = _ROUND_TRIP_KEYS if self.inbound else _ONE_WAY_KEYS
+        yield from keys
+        if self.drop_pct is not None:
+            yield "drop_pct"
+
+    def __len__(self) -> int:
+        keys = _ROUND_TRIP_KEYS if self.inbound else _ONE_WAY_KEYS
+        return len(keys) + (self.drop_pct is not None)
+
+    def copy(self) -> "Offer":
+        """Shallow copy safe to annotate; legs are shared."""
+        return replace(self)
+
+    def to_dict(self) -> dict:
+        """Plain dict with the same keys as the legacy offer dicts."""
+        return {key: self[key] for key in self}
+
+
+# Key order matches the legacy offer dicts
+_ONE_WAY_KEYS = (
+    "offer_id", "price", "currency", "departure_date", "return_date",
+    "airlines", "stops", "cabin_class", "fare_family", "duration_minutes",
+    "layover_cities", "flight_numbers", "departure_time", "arrival_time",
+    "booking_class", "baggage", "seats_remaining",
+)
+_ROUND_TRIP_KEYS = _ONE_WAY_KEYS + tuple(f"return_{field}" for field in LEG_FIELDS)
+_SETTABLE = frozenset(
+    key for key in Offer.__dataclass_fields__ if key not in ("outbound", "inbound")
+)
+_GETTERS = {key: attrgetter(key) for key in _SETTABLE}
+_GETTERS.update({field: attrgetter(f"outbound.{field}") for field in LEG_FIELDS})
+_GETTERS.update({f"return_{field}": attrgetter(f"inbound.{field}") for field in LEG_FIELDS})
+
+
+def summarize_prices(prices: Iterable[float]) -> dict:
+    """Count/min/max/total of a set of prices; totals rather than averages so summaries merge."""
+    count = 0
+    total = 0.0
+    low = high = None
+    for price in prices:
+        count += 1
+        total += price
+        low = price if low is None or price < low else low
+        high = price if high is None or price > high else high
+    return {"count": count, "min_price": low, "max_price": high, "total_price": round(total, 2)}
+
+
+def merge_stats(stats: Iterable[dict]) -> dict:
+    """Combine price summaries from summarize_prices."""
+    merged = {"count": 0, "min_price": None, "max_price": None, "total_price": 0.0}
+    for item in stats:
+        if not item["count"]:
+            continue
+        merged["count"] += item["count"]
+        merged["total_price"] = round(merged["total_price"] + item["total_price"], 2)
+        if merged["min_price"] is None or item["min_price"] < merged["min_price"]:
+            merged["min_price"] = item["min_price"]
+        if merged["max_price"] is None or item["max_price"] > merged["max_price"]:
+            merged["max_price"] = item["max_price"]
+    return merged
+
+
+class OfferList(list):
+    """Offers, cheapest first, plus per-fare-cabin price stats over every offer that passed
+    the filters, including ones dropped by a top-k parse."""
+
+    def __init__(self, offers: Iterable = (), cabin_stats: dict[str, dict] | None = None):
+        super().__init__(offers)
+        self.cabin_stats = cabin_stats if cabin_stats is not None else {}
+
+    @property
+    def stats(self) -> dict:
+        return merge_stats(self.cabin_stats.values())
+
+    @property
+    def truncated(self) -> bool:
+        """Whether offers passing the filters were left unparsed."""
+        return self.stats["count"] > len(self)
@@ -0,0 +1,164 @@
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from price_summaries import scan_summaries
+from tracing import NULL_TRACER, Tracer
+from trip_config import prepare_trip
+
+# Scans the rolling average covers
+ROLLING_WINDOW = 7
+
+
+def price_stats_id(trip_id: str, route: str, cabin_class: str) -> str:
+    return f"{trip_id}__{route}__{cabin_class}"
+
+
+def fold_scan(aggregate: dict | None, median_price: float, count: int, min_price: float,
+              window: int = ROLLING_WINDOW) -> dict:
+    """Add one scan to a price_stats aggregate: ring buffer of recent scan medians plus running stats."""
+    aggregate = dict(aggregate or {"recent_scan_medians": [], "scan_count": 0, "count": 0, "min_price": None})
+    aggregate["recent_scan_medians"] = (list(aggregate["recent_scan_medians"]) + [median_price])[-window:]
+    aggregate["scan_count"] += 1
+    aggregate["count"] += count
+    if aggregate["min_price"] is None or min_price < aggregate["min_price"]:
+        aggregate["min_price"] = min_price
+    return aggregate
+
+
+def offer_stats_rows(trip_id: str, route: str, scanned_at: datetime, offer_stats: dict[str, dict]) -> list[dict]:
+    """offer_stats documents for a scan: per cabin, stats over every offer that passed the
+    filters, including ones a top-k parse left unstored."""
+    return [
+        {
+            "trip_id": trip_id,
+            "route": route,
+            "cabin_class": cabin_class,
+            "scanned_at": scanned_at,
+            "count": stats["count"],
+            "min_price": stats["min_price"],
+            "max_price": stats["max_price"],
+            "avg_price": round(stats["total_price"] / stats["count"], 2),
+        }
+        for cabin_class, stats in offer_stats.items()
+        if stats["count"]
+    ]
+
+
+def merge_write_reports(reports: list[dict]) -> dict:
+    merged = {"written": 0, "failed": 0, "errors": []}
+    for report in reports:
+        merged["written"] += report["written"]
+        merged["failed"] += report["failed"]
+        merged["errors"].extend(report["errors"])
+    return merged
+
+
+class PriceStore(ABC):
+    """Storage for price history, rolling stats and trip config.
+
+    Backends implement _write_scan() and the read, maintenance and trip methods; this
+    class builds each scan's summaries and offer rows and handles background writes:
+    with background_writes, store_prices returns immediately and the scan is written
+    on a worker thread, reads for a trip/route wait for its pending writes first, and
+    flush() waits for everything.
+    """
+
+    def __init__(self, background_writes: bool = False, max_workers: int = 4, tracer: Tracer | None = None):
+        self.background_writes = background_writes
+        self.max_workers = max_workers
+        self.tracer = tracer or NULL_TRACER
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-writes")
+        self._pending: dict[tuple[str, str], list[Future]] = {}
+        self._lock = threading.Lock()
+
+    def store_prices(
+        self,
+        trip_id: str,
+        route: str,
+        prices: list[dict],
+        offer_stats: dict[str, dict] | None = None
+    ) -> dict | Future:
+        """Store a scan's summaries and offer rows, plus offer_stats per cabin when given
+        (for scans whose offers were only partly parsed).
+
+        Returns a write report ({written, failed, errors}), or a Future of one when
+        writing in the background.
+        """
+        scanned_at = datetime.now(timezone.utc)
+        # Build rows now so callers can keep annotating the offers
+        summaries = scan_summaries(trip_id, route, scanned_at, prices)
+        rows = [{"trip_id": trip_id, "scanned_at": scanned_at, "route": route, **price} for price in prices]
+        stats_rows = offer_stats_rows(trip_id, route, scanned_at, offer_stats or {})
+
+        if not self.background_writes:
+            return self._write_scan(summaries, rows, stats_rows)
+        future = self._pool.submit(self._write_scan, summaries, rows, stats_rows)
+        with self._lock:
+            self._pending.setdefault((trip_id, route), []).append(future)
+        return future
+
+    @abstractmethod
+    def _write_scan(self, summaries: list[dict], rows: list[dict], stats_rows: list[dict]) -> dict:
+        """Write a scan's summaries, offer rows and offer_stats, fold it into price_stats
+        and report."""
+
+    def _wait_for_writes(self, trip_id: str, route: str) -> None:
+        """Wait for a trip/route's background writes so reads see them."""
+        with self._lock:
+            futures = self._pending.get((trip_id, route), [])
+        for future in futures:
+            future.result()
+
+    def flush(self) -> dict:
+        """Wait for every background write and report the totals."""
+        with self._lock:
+            futures = [future for futures in self._pending.values() for future in futures]
+            self._pending.clear()
+        return merge_write_reports([future.result() for future in futures])
+
+    @abstractmethod
+    def get_rolling_average(self, trip_id: str, route: str, cabin_class: str) -> float | None:
+        """Average of the median prices of the last ROLLING_WINDOW scans."""
+
+    @abstractmethod
+    def get_pair_history(self, trip_id: str, route: str, cabin_class: str, limit: int = 500) -> dict[tuple[str, str], list[float]]:
+        """Per date pair, the cheapest price seen in each recent scan (or tier bucket), newest first."""
+
+    @abstractmethod
+    def rebuild_price_stats(self, trip_id: str | None = None) -> int:
+        """Regenerate scan summaries from stored offer rows, then price_stats from the
+        summaries. Returns aggregates written."""
+
+    @abstractmethod
+    def compact_history(
+        self,
+        raw_days: int = 30,
+        daily_after_days: int = 30,
+        weekly_after_days: int = 180,
+        now: datetime | None = None
+    ) -> dict:
+        """Delete offer rows and offer_stats older than raw_days and downsample old scan
+        summaries into daily, then weekly, tiers. Returns counts of what was written and deleted."""
+
+    @abstractmethod
+    def get_active_trips(self) -> list[tuple[str, dict]]:
+        """(trip_id, config) of every active trip."""
+
+    @abstractmethod
+    def get_due_trips(self, now: datetime) -> list[tuple[str, dict]]:
+        """(trip_id, config) of active trips whose next_scan_due is at or before now."""
+
+    def save_trip(self, trip_id: str, trip: dict) -> None:
+        """Validate, normalize and create or replace a trip's config, with its next_scan_due.
+        Raises ValueError for an invalid config."""
+        self._put_trip(trip_id, prepare_trip(trip))
+
+    @abstractmethod
+    def _put_trip(self, trip_id: str, trip: dict) -> None:
+        """Create or replace a prepared trip config."""
+
+    @abstractmethod
+    def update_trip(self, trip_id: str, fields: dict) -> None:
+        """Update some fields of an existing trip's config."""
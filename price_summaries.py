@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+# Summary tiers, finest first; older rows are downsampled into the next tier
+TIERS = ("scan", "daily", "weekly")
+# departure_date/return_date of the whole-cabin summary row of a scan
+ROLLUP = ""
+
+
+def percentile(sorted_prices: list[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    position = (len(sorted_prices) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_prices) - 1)
+    return round(sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * (position - lower), 2)
+
+
+def summarize_scan(prices: list[float]) -> dict:
+    ordered = sorted(prices)
+    return {
+        "count": len(ordered),
+        "min_price": ordered[0],
+        "p25_price": percentile(ordered, 0.25),
+        "median_price": percentile(ordered, 0.5),
+    }
+
+
+def _weighted_median(values: list[tuple[float, int]]) -> float:
+    ordered = sorted(values)
+    half = sum(count for _, count in ordered) / 2
+    seen = 0
+    for value, count in ordered:
+        seen += count
+        if seen >= half:
+            return value
+    return ordered[-1][0]
+
+
+def combine_summaries(rows: list[dict]) -> dict:
+    """Merge summaries of one route/cabin/date pair. Percentiles become count-weighted
+    medians of the inputs' percentiles, an approximation good enough for old history."""
+    return {
+        "count": sum(row["count"] for row in rows),
+        "min_price": min(row["min_price"] for row in rows),
+        "p25_price": _weighted_median([(row["p25_price"], row["count"]) for row in rows]),
+        "median_price": _weighted_median([(row["median_price"], row["count"]) for row in rows]),
+    }
+
+
+def summary_id(row: dict, tier: str, bucket: datetime) -> str:
+    """Deterministic doc ID, so rewriting a summary replaces it instead of duplicating it."""
+    pair = f"{row['departure_date']}_{row['return_date']}" if row["departure_date"] else "all"
+    return f"{row['trip_id']}__{row['route']}__{row['cabin_class']}__{pair}__{tier}__{bucket.isoformat()}"
+
+
+def bucket_start(when: datetime, tier: str) -> datetime:
+    """Start of the daily or weekly (Monday) bucket containing when."""
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if tier == "weekly":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def scan_summaries(trip_id: str, route: str, scanned_at: datetime, prices: list[dict]) -> list[dict]:
+    """One summary per cabin and date pair in a scan, plus a whole-cabin rollup per cabin."""
+    groups: dict[tuple[str, str, str], list[float]] = {}
+    for price in prices:
+        cabin_class = price["cabin_class"]
+        groups.setdefault((cabin_class, price["departure_date"], price["return_date"] or ""), []).append(price["price"])
+        groups.setdefault((cabin_class, ROLLUP, ROLLUP), []).append(price["price"])
+
+    return [
+        {
+            "trip_id": trip_id,
+            "route": route,
+            "cabin_class": cabin_class,
+            "departure_date": departure_date,
+            "return_date": return_date,
+            "tier": "scan",
+            "scanned_at": scanned_at,
+            **summarize_scan(group),
+        }
+        for (cabin_class, departure_date, return_date), group in groups.items()
+    ]
+
+
+def downsample(rows: list[tuple[str, dict]], tier: str) -> list[tuple[dict, list[str]]]:
+    """Group (doc_id, summary) rows into tier buckets: [(combined summary, source doc IDs)]."""
+    groups: dict[tuple, list[tuple[str, dict]]] = {}
+    for doc_id, row in rows:
+        key = (
+            row["trip_id"], row["route"], row["cabin_class"],
+            row["departure_date"], row["return_date"], bucket_start(row["scanned_at"], tier),
+        )
+        groups.setdefault(key, []).append((doc_id, row))
+
+    combined = []
+    for key, members in groups.items():
+        trip_id, route, cabin_class, departure_date, return_date, bucket = key
+        summary = {
+            "trip_id": trip_id,
+            "route": route,
+            "cabin_class": cabin_class,
+            "departure_date": departure_date,
+            "return_date": return_date,
+            "tier": tier,
+            "scanned_at": bucket,
+            **combine_summaries([row for _, row in members]),
+        }
+        combined.append((summary, [doc_id for doc_id, _ in members]))
+    return combined
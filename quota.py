@@ -0,0 +1,161 @@
+import calendar
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+from date_planner import leg_dates
+from lazy_imports import lazy_import
+from route_planner import prioritize_routes
+
+firestore = lazy_import("google.cloud.firestore")
+
+
+class QuotaLedger:
+    """Counts outbound Amadeus calls against a monthly allowance stored in Firestore."""
+
+    def __init__(self, firestore_client, monthly_limit: int = 2000, collection: str = "api_quota", now=None):
+        self.db = firestore_client
+        self.monthly_limit = monthly_limit
+        self.collection = collection
+        self._now = now or (lambda: datetime.now(timezone.utc))
+        self._pending: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._used_at_start: int | None = None
+
+    def _month_doc(self):
+        return self.db.collection(self.collection).document(self._now().strftime("%Y-%m"))
+
+    def record(self, endpoint: str) -> None:
+        """Count one outbound call. Written to Firestore on flush()."""
+        with self._lock:
+            self._pending[endpoint] = self._pending.get(endpoint, 0) + 1
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(self._pending.values())
+
+    def _month_total(self) -> int:
+        snapshot = self._month_doc().get()
+        return int(snapshot.to_dict().get("total", 0)) if snapshot.exists else 0
+
+    def used_this_month(self) -> int:
+        """Calls used this calendar month, including unflushed calls from this run."""
+        if self._used_at_start is None:
+            self._used_at_start = self._month_total()
+        return self._used_at_start + self.pending
+
+    def remaining(self) -> int:
+        return max(self.monthly_limit - self.used_this_month(), 0)
+
+    def run_budget(self) -> int:
+        """Calls this run may spend: remaining quota spread over the days left in the month."""
+        today = self._now()
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        days_left = days_in_month - today.day + 1
+        return self.remaining() // days_left
+
+    def flush(self) -> None:
+        """Add this run's counts to the month document in one write."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        total = sum(pending.values())
+        if not total:
+            return
+        self._add_counts(pending, total)
+        if self._used_at_start is not None:
+            self._used_at_start += total
+
+    def _add_counts(self, pending: dict[str, int], total: int) -> None:
+        update = {"total": firestore.Increment(total), "updated_at": self._now()}
+        for endpoint, count in pending.items():
+            update[f"endpoints.{endpoint}"] = firestore.Increment(count)
+        self._month_doc().set(update, merge=True)
+
+
+class SQLiteQuotaLedger(QuotaLedger):
+    """QuotaLedger kept in a local SQLite database, for runs with PRICE_STORE=sqlite.
+
+    One row per month and endpoint; the month's total is their sum.
+    """
+
+    def __init__(self, path: str, monthly_limit: int = 2000, table: str = "api_quota", now=None):
+        super().__init__(None, monthly_limit=monthly_limit, collection=table, now=now)
+        self.path = path
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (month TEXT NOT NULL, endpoint TEXT NOT NULL,"
+                f" count INTEGER NOT NULL, updated_at TEXT NOT NULL, PRIMARY KEY (month, endpoint))"
+            )
+
+    def _month(self) -> str:
+        return self._now().strftime("%Y-%m")
+
+    def _month_total(self) -> int:
+        with closing(sqlite3.connect(self.path)) as conn:
+            row = conn.execute(
+                f"SELECT COALESCE(SUM(count), 0) FROM {self.collection} WHERE month = ?", (self._month(),)
+            ).fetchone()
+        return int(row[0])
+
+    def _add_counts(self, pending: dict[str, int], total: int) -> None:
+        updated_at = self._now().isoformat()
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.executemany(
+                f"INSERT INTO {self.collection} (month, endpoint, count, updated_at) VALUES (?, ?, ?, ?)"
+                f" ON CONFLICT (month, endpoint) DO UPDATE SET count = count + excluded.count,"
+                f" updated_at = excluded.updated_at",
+                [(self._month(), endpoint, count, updated_at) for endpoint, count in pending.items()]
+            )
+
+
+def estimate_calls(trip: dict, max_pairs: int) -> int:
+    """Upper bound on Amadeus calls a trip makes for a given per-route date pair budget."""
+    routes = len(prioritize_routes(trip))
+    if trip.get("date_strategy") == "one_way":
+        # One search per departure and return date, independent of max_pairs
+        departures, returns = leg_dates(
+            trip["departure_date_range"], trip["return_date_range"],
+            trip["min_trip_days"], trip["max_trip_days"]
+        )
+        return routes * len(trip["cabin_classes"]) * (len(departures) + len(returns))
+
+    calls = len(trip["cabin_classes"]) * max_pairs
+    if trip.get("date_strategy") == "calendar":
+        calls += 1
+    return routes * calls
+
+
+def allocate_budget(trips: list[tuple[str, dict]], budget: int, default_max_pairs: int = 5) -> dict[str, int]:
+    """Split a run's call budget into max_pairs per trip, highest priority first.
+
+    Every trip first gets one date pair if the budget allows; trips that don't fit are
+    skipped (0). Remaining budget is handed out in rounds of `priority` pairs per trip.
+    one_way trips cover their whole window, so they are either funded in full (1) or skipped.
+    """
+    ordered = sorted(trips, key=lambda item: item[1].get("priority", 1), reverse=True)
+    allocation = {trip_id: 0 for trip_id, _ in trips}
+
+    for trip_id, trip in ordered:
+        cost = estimate_calls(trip, 1)
+        if cost <= budget:
+            allocation[trip_id] = 1
+            budget -= cost
+
+    growing = True
+    while growing:
+        growing = False
+        for trip_id, trip in ordered:
+            if trip.get("date_strategy") == "one_way":
+                continue
+            wanted = trip.get("max_pairs", default_max_pairs)
+            step = estimate_calls(trip, 2) - estimate_calls(trip, 1)
+            for _ in range(max(int(trip.get("priority", 1)), 1)):
+                if not allocation[trip_id] or allocation[trip_id] >= wanted or step > budget:
+                    break
+                allocation[trip_id] += 1
+                budget -= step
+                growing = True
+
+    return allocation
@@ -0,0 +1,260 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# 429 and transient server errors are worth retrying; other 4xx never succeed on retry
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+
+
+class DeadlineExceeded(Exception):
+    """The run deadline leaves no time for another Amadeus call."""
+
+
+class CircuitOpenError(Exception):
+    """An endpoint's circuit breaker is open, so the call was not attempted."""
+
+    def __init__(self, endpoint: str):
+        super().__init__(f"Circuit open for {endpoint}")
+        self.endpoint = endpoint
+
+
+class Deadline:
+    """Wall-clock budget for a whole run, shared by every call in it."""
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+
+def error_status(exc: Exception) -> tuple[int | None, dict]:
+    """HTTP status and headers from a transport or SDK error, if it carries a response."""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None)
+    if not headers:
+        # SDK responses keep the raw headers on the HTTP response they wrap
+        headers = getattr(getattr(response, "http_response", None), "headers", None)
+    return status, headers or {}
+
+
+def is_retryable(exc: Exception) -> bool:
+    status, _ = error_status(exc)
+    if status:
+        return status in RETRYABLE_STATUSES
+    return isinstance(exc, network_errors())
+
+
+def network_errors() -> tuple:
+    """NETWORK_ERRORS plus the Amadeus SDK's NetworkError and httpx's TransportError
+    once each library is loaded; neither can be raised before then, and importing them
+    here would slow every cold start."""
+    loaded = (
+        getattr(sys.modules.get("amadeus"), "NetworkError", None),
+        getattr(sys.modules.get("httpx"), "TransportError", None),
+    )
+    return NETWORK_ERRORS + tuple(error for error in loaded if error)
+
+
+def retry_after_seconds(headers: dict, now: datetime | None = None) -> float | None:
+    """Parse a Retry-After header given as seconds or an HTTP date."""
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets one trial call through after a cooldown."""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this failure opened the breaker."""
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened_at is not None
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+            return self._opened_at is not None and not was_open
+
+
+class ResilientCaller:
+    """Retries transient API errors with jittered exponential backoff.
+
+    Honors Retry-After, trips a per-endpoint circuit breaker, optionally hedges slow
+    calls with a second request, and never sleeps or starts a call past the deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8,
+        deadline: Deadline | None = None,
+        failure_threshold: int = 5,
+        cooldown: float = 30,
+        hedge_after: float | None = None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        rng: random.Random | None = None
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_after = hedge_after
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._hedge_pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.counters = {
+            "calls": 0, "retries": 0, "failures": 0, "hedges": 0,
+            "hedge_wins": 0, "breaker_opens": 0, "short_circuits": 0, "deadline_stops": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.cooldown, self._clock)
+            return self._breakers[endpoint]
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            breakers = dict(self._breakers)
+        counters["breakers"] = {endpoint: breaker.state for endpoint, breaker in breakers.items()}
+        return counters
+
+    def backoff(self, attempt: int, headers: dict) -> float:
+        """Delay before retry number attempt (1-based): Retry-After if given, else full jitter."""
+        retry_after = retry_after_seconds(headers)
+        if retry_after is not None:
+            return retry_after
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, endpoint: str, fn):
+        """Run fn() for an endpoint with retries, breaker and deadline applied."""
+        breaker = self._breaker(endpoint)
+        for attempt in range(1, self.max_attempts + 1):
+            if self.deadline and self.deadline.remaining() <= 0:
+                self._count("deadline_stops")
+                raise DeadlineExceeded(f"Run deadline reached before calling {endpoint}")
+            if not breaker.allow():
+                self._count("short_circuits")
+                raise CircuitOpenError(endpoint)
+
+            self._count("calls")
+            try:
+                result = self._hedged(fn) if self.hedge_after else fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    # The endpoint answered; the request itself was bad
+                    breaker.record_success()
+                    raise
+                self._count("failures")
+                if breaker.record_failure():
+                    self._count("breaker_opens")
+                    raise
+                if attempt == self.max_attempts:
+                    raise
+                delay = self.backoff(attempt, error_status(e)[1])
+                if self.deadline and delay >= self.deadline.remaining():
+                    self._count("deadline_stops")
+                    raise
+                self._count("retries")
+                self._sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def _hedged(self, fn):
+        """Start a second request if the first is slower than hedge_after; first success wins."""
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+            pool = self._hedge_pool
+        primary = pool.submit(fn)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = pool.submit(fn)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
@@ -0,0 +1,50 @@
+# Routes whose probe search came back empty this many scans in a row sort last
+ROUTE_EMPTY_SCAN_LIMIT = 3
+
+
+def route_name(origin: str, destination: str) -> str:
+    return f"{origin}-{destination}"
+
+
+def expand_routes(trip: dict) -> list[tuple[str, str]]:
+    """Every origin × destination pair of a trip, in config order."""
+    return [
+        (origin, destination)
+        for origin in trip["origins"]
+        for destination in trip["destinations"]
+        if origin != destination
+    ]
+
+
+def prioritize_routes(trip: dict) -> list[tuple[str, str]]:
+    """Routes ordered most promising first and capped at the trip's max_routes.
+
+    Routes that keep coming back empty go last, then cheaper past best prices first;
+    config order breaks ties so unseen routes keep the order they were listed in.
+    """
+    stats = trip.get("route_stats") or {}
+    routes = expand_routes(trip)
+
+    def sort_key(item: tuple[int, tuple[str, str]]):
+        index, (origin, destination) = item
+        route_stat = stats.get(route_name(origin, destination), {})
+        stale = route_stat.get("empty_scans", 0) >= ROUTE_EMPTY_SCAN_LIMIT
+        best_price = route_stat.get("best_price")
+        return (stale, best_price if best_price is not None else float("inf"), index)
+
+    ordered = [route for _, route in sorted(enumerate(routes), key=sort_key)]
+    return ordered[:trip.get("max_routes") or len(ordered)]
+
+
+def update_route_stats(trip: dict, route_results: dict[str, dict[str, list[dict]]]) -> dict:
+    """New route_stats map for a trip after a scan's per-route results."""
+    stats = {route: dict(values) for route, values in (trip.get("route_stats") or {}).items()}
+    for route, cabin_offers in route_results.items():
+        prices = [offer["price"] for offers in cabin_offers.values() for offer in offers]
+        route_stat = stats.setdefault(route, {"empty_scans": 0, "best_price": None})
+        if prices:
+            route_stat["empty_scans"] = 0
+            route_stat["best_price"] = min(prices)
+        else:
+            route_stat["empty_scans"] = route_stat.get("empty_scans", 0) + 1
+    return stats
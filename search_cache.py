@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+def make_cache_key(endpoint: str, params: dict) -> str:
+    """Stable cache key from an endpoint and its normalized search parameters."""
+    normalized = {
+        key: value.strip().upper() if isinstance(value, str) else value
+        for key, value in params.items()
+        if value is not None
+    }
+    raw = json.dumps([endpoint, normalized], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU store; survives between invocations on a warm instance."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[float, object] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, stored_at: float, value: object) -> None:
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskCacheBackend:
+    """One JSON file per entry; file mtime tracks recency for LRU eviction."""
+
+    def __init__(self, directory: str, max_entries: int = 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> tuple[float, object] | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["stored_at"], entry["value"]
+
+    def set(self, key: str, stored_at: float, value: object) -> None:
+        # Write to a temp file and rename so readers never see partial JSON
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": stored_at, "value": value}, f)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+                except OSError:
+                    continue
+            overflow = len(entries) - self.max_entries
+            for _, name in sorted(entries)[:max(overflow, 0)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+class FirestoreCacheBackend:
+    """Shared store across instances. Size is bounded by a Firestore TTL policy on `expires_at`."""
+
+    def __init__(self, firestore_client, collection: str = "search_cache", ttl_seconds: int = 3600):
+        self.db = firestore_client
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> tuple[float, object] | None:
+        snapshot = self.db.collection(self.collection).document(key).get()
+        if not snapshot.exists:
+            return None
+        entry = snapshot.to_dict()
+        # Payload is stored as a JSON string; Firestore can't hold nested arrays
+        return entry["stored_at"], json.loads(entry["payload"])
+
+    def set(self, key: str, stored_at: float, value: object) -> None:
+        self.db.collection(self.collection).document(key).set({
+            "stored_at": stored_at,
+            "expires_at": datetime.fromtimestamp(stored_at + self.ttl_seconds, tz=timezone.utc),
+            "payload": json.dumps(value),
+        })
+
+    def delete(self, key: str) -> None:
+        self.db.collection(self.collection).document(key).delete()
+
+
+class SearchCache:
+    """TTL cache for raw Amadeus responses with hit/miss counters."""
+
+    def __init__(self, backend=None, ttl_seconds: float = 3600, clock=time.time):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """Return a cached value, or None when missing or expired."""
+        entry = self.backend.get(key)
+        if entry is not None and self._clock() - entry[0] > self.ttl_seconds:
+            self.backend.delete(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value) -> None:
+        self.backend.set(key, self._clock(), value)
+
+    def get_or_fetch(self, key: str, fetch):
+        """Return the cached value for key, calling fetch() and caching its result on a miss.
+        A failed cache write never loses the fetched value."""
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            try:
+                self.set(key, value)
+            except Exception as e:
+                # The search is already paid for; only the caching is lost
+                print(f"Search cache write failed: {type(e).__name__}")
+        return value
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+def build_search_cache(
+    backend: str,
+    ttl_seconds: float = 3600,
+    max_entries: int = 256,
+    directory: str = "/tmp/fare-scout-cache",
+    firestore_client=None
+) -> SearchCache | None:
+    """Build a cache from a backend name: memory, disk, firestore or none."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        store = MemoryCacheBackend(max_entries=max_entries)
+    elif backend == "disk":
+        store = DiskCacheBackend(directory, max_entries=max_entries)
+    elif backend == "firestore":
+        store = FirestoreCacheBackend(firestore_client, ttl_seconds=int(ttl_seconds))
+    else:
+        raise ValueError(f"Invalid cache backend: {backend!r} (expected memory, disk, firestore or none)")
+    return SearchCache(store, ttl_seconds=ttl_seconds)
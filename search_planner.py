@@ -0,0 +1,292 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from amadeus_client import AmadeusClient, filter_offers
+from leg_composer import compose_round_trips
+from offers import OfferList, merge_stats, summarize_prices
+from resilience import CircuitOpenError, DeadlineExceeded
+
+
+class SearchKey(NamedTuple):
+    origin: str
+    destination: str
+    departure_date: str
+    return_date: str  # "" for one-way searches
+    cabin_class: str
+    currency: str
+
+
+class SearchPlanner:
+    """Collect searches across all due trips and run each unique one once per run.
+
+    Searches are registered per (trip, route). Registering a route again replaces its
+    search list, and execute() only runs keys it hasn't run yet, so a route can be
+    probed first and widened later in the same run.
+    """
+
+    def __init__(
+        self,
+        amadeus: AmadeusClient,
+        max_workers: int = 5,
+        multi_cabin: bool = False,
+        min_offers_per_cabin: int = 1,
+        one_way_top_k: int = 20,
+        max_results: int = 20,
+        min_results: int = 0,
+        parse_top_k: int = 0
+    ):
+        self.amadeus = amadeus
+        self.max_workers = max_workers
+        # One all-cabin request per date pair instead of one per cabin
+        self.multi_cabin = multi_cabin
+        self.min_offers_per_cabin = min_offers_per_cabin
+        self.one_way_top_k = one_way_top_k
+        # Offers requested per search, and the filtered count below which it's repeated wider
+        self.max_results = max_results
+        self.min_results = min_results
+        # Fully parse only the cheapest offers per search (0 = all)
+        self.parse_top_k = parse_top_k
+        self._trips: dict[str, dict] = {}
+        self._one_way_routes: set[tuple[str, str, str]] = set()
+        self._route_keys: dict[tuple[str, str, str], list[SearchKey]] = {}
+        self._key_trips: dict[SearchKey, list[str]] = {}
+        self._results: dict[SearchKey, list[dict]] = {}
+        # Searches the run deadline or a circuit breaker stopped before they were attempted
+        self._stopped: set[SearchKey] = set()
+
+    def add_trip(
+        self,
+        trip_id: str,
+        trip: dict,
+        origin: str,
+        destination: str,
+        date_pairs: list[tuple[str, str]]
+    ) -> None:
+        """Register every cabin × date pair search a trip needs on one route."""
+        keys = [
+            SearchKey(origin, destination, dep_date, ret_date, cabin_class, trip["currency"])
+            for cabin_class in trip["cabin_classes"]
+            for dep_date, ret_date in date_pairs
+        ]
+        self._register(trip_id, trip, (trip_id, origin, destination), keys)
+
+    def add_one_way_trip(
+        self,
+        trip_id: str,
+        trip: dict,
+        origin: str,
+        destination: str,
+        departure_dates: list[str],
+        return_dates: list[str]
+    ) -> None:
+        """Register one-way leg searches per date; round trips are composed locally."""
+        keys = []
+        for cabin_class in trip["cabin_classes"]:
+            keys.extend(
+                SearchKey(origin, destination, dep_date, "", cabin_class, trip["currency"])
+                for dep_date in departure_dates
+            )
+            keys.extend(
+                SearchKey(destination, origin, ret_date, "", cabin_class, trip["currency"])
+                for ret_date in return_dates
+            )
+        route_id = (trip_id, origin, destination)
+        self._one_way_routes.add(route_id)
+        self._register(trip_id, trip, route_id, keys)
+
+    def _register(self, trip_id: str, trip: dict, route_id: tuple[str, str, str], keys: list[SearchKey]) -> None:
+        self._trips[trip_id] = trip
+        self._route_keys[route_id] = keys
+        for key in keys:
+            trip_ids = self._key_trips.setdefault(key, [])
+            if trip_id not in trip_ids:
+                trip_ids.append(trip_id)
+
+    @property
+    def requested_count(self) -> int:
+        return sum(len(keys) for keys in self._route_keys.values())
+
+    @property
+    def unique_count(self) -> int:
+        return len(self._key_trips)
+
+    def _search_filters(self, keys: list[SearchKey]) -> dict:
+        """Widest airline/stop/price filter that still covers every trip sharing a search."""
+        trip_ids = dict.fromkeys(trip_id for key in keys for trip_id in self._key_trips[key])
+        trips = [self._trips[trip_id] for trip_id in trip_ids]
+        if all(trip["airlines"] for trip in trips):
+            airlines = sorted({code for trip in trips for code in trip["airlines"]})
+        else:
+            airlines = []
+        if all(trip.get("max_price") for trip in trips):
+            max_price = max(trip["max_price"] for trip in trips)
+        else:
+            max_price = None
+        return {
+            "airlines": airlines,
+            "max_stops": max(trip["max_stops"] for trip in trips),
+            "max_price": max_price,
+            "max_results": self.max_results,
+            "min_results": self.min_results,
+            "top_k": self._parse_top_k(keys, trips),
+        }
+
+    def _parse_top_k(self, keys: list[SearchKey], trips: list[dict]) -> int | None:
+        """Top-k parse limit, or None when the cheapest offers might not suit every trip."""
+        if not self.parse_top_k:
+            return None
+        # Trips with different filters would each need their own cheapest k
+        filters = {
+            (tuple(sorted(trip["airlines"])), trip["max_stops"], trip.get("max_price"))
+            for trip in trips
+        }
+        if len(filters) > 1:
+            return None
+        # One-way legs feed round-trip composition, which needs its own top k per leg
+        if any(not key.return_date for key in keys):
+            return max(self.parse_top_k, self.one_way_top_k)
+        return self.parse_top_k
+
+    def _search_groups(self, keys: list[SearchKey]) -> list[list[SearchKey]]:
+        """Group keys that one Amadeus request can answer."""
+        if not self.multi_cabin:
+            return [[key] for key in keys]
+        groups: dict[SearchKey, list[SearchKey]] = {}
+        for key in keys:
+            groups.setdefault(key._replace(cabin_class=""), []).append(key)
+        return list(groups.values())
+
+    def _run_group(self, keys: list[SearchKey]) -> dict[SearchKey, list[dict]]:
+        filters = self._search_filters(keys)
+        first = keys[0]
+        if len(keys) == 1:
+            offers = self.amadeus.get_flight_offers(
+                origin=first.origin,
+                destination=first.destination,
+                departure_date=first.departure_date,
+                return_date=first.return_date or None,
+                cabin_class=first.cabin_class,
+                currency=first.currency,
+                **filters
+            )
+            return {first: offers}
+
+        by_cabin = self.amadeus.get_flight_offers_by_cabin(
+            origin=first.origin,
+            destination=first.destination,
+            departure_date=first.departure_date,
+            return_date=first.return_date or None,
+            cabin_classes=[key.cabin_class for key in keys],
+            currency=first.currency,
+            min_offers_per_cabin=self.min_offers_per_cabin,
+            **filters
+        )
+        return {key: by_cabin[key.cabin_class] for key in keys}
+
+    def execute(self) -> None:
+        """Run all unique searches with bounded concurrency."""
+        keys = [key for key in self._key_trips if key not in self._results]
+        print(f"Search plan: {self.requested_count} requested, {self.unique_count} unique")
+        if not keys:
+            return
+
+        groups = self._search_groups(keys)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as pool:
+            futures = [pool.submit(self._run_group, group) for group in groups]
+            for future, group in zip(futures, groups):
+                try:
+                    self._results.update(future.result())
+                    self._stopped.difference_update(group)
+                except (DeadlineExceeded, CircuitOpenError) as e:
+                    # Not a result: left out so a later execute() may still run them
+                    key = group[0]
+                    print(f"Search stopped {key.departure_date}-{key.return_date}: {type(e).__name__}")
+                    self._stopped.update(group)
+                except Exception as e:
+                    # Log error type only, not full details (security)
+                    key = group[0]
+                    print(f"Error fetching {key.departure_date}-{key.return_date}: {type(e).__name__}")
+                    self._results.update({key: [] for key in group})
+
+    def search_counts(self, trip_id: str) -> tuple[int, int]:
+        """(registered, stopped) searches for a trip across its routes."""
+        keys = {
+            key for (route_trip_id, _, _), keys in self._route_keys.items()
+            if route_trip_id == trip_id for key in keys
+        }
+        return len(keys), len(keys & self._stopped)
+
+    def has_offers(self, trip_id: str, origin: str, destination: str) -> bool:
+        """Whether any search run so far for a trip's route returned offers passing its filters."""
+        trip = self._trips[trip_id]
+        return any(
+            self._trip_offers(trip, key)
+            for key in self._route_keys.get((trip_id, origin, destination), [])
+        )
+
+    def _trip_offers(self, trip: dict, key: SearchKey) -> list[dict]:
+        offers = filter_offers(self._results.get(key, []), trip["airlines"], trip["max_stops"])
+        if trip.get("max_price"):
+            offers = [offer for offer in offers if offer["price"] <= trip["max_price"]]
+        return offers
+
+    def _trip_stats(self, trip: dict, key: SearchKey, offers: list[dict]) -> dict:
+        """Price stats for a trip's share of a search, in the searched cabin."""
+        raw = self._results.get(key, [])
+        if isinstance(raw, OfferList) and raw.truncated and self._only_search_filters(trip, key):
+            # Covers the offers a top-k parse left out, which the trip would all have kept
+            return raw.cabin_stats.get(key.cabin_class) or summarize_prices([])
+        return summarize_prices(offer["price"] for offer in offers)
+
+    def _only_search_filters(self, trip: dict, key: SearchKey) -> bool:
+        """Whether a trip filters on nothing beyond the cabin and the stop limit the
+        search was parsed with, so stats over the whole search apply to it."""
+        return (
+            not trip["airlines"]
+            and not trip.get("max_price")
+            and trip["max_stops"] >= self._search_filters([key])["max_stops"]
+        )
+
+    def results_for(self, trip_id: str, origin: str, destination: str) -> dict[str, OfferList]:
+        """Offers for a trip's route grouped by cabin, filtered by the trip's own airlines/max_stops.
+
+        Each cabin's OfferList carries price stats that also cover offers left unparsed.
+        """
+        trip = self._trips[trip_id]
+        route_id = (trip_id, origin, destination)
+        if route_id in self._one_way_routes:
+            return self._compose_results(route_id)
+
+        results = {cabin_class: OfferList() for cabin_class in trip["cabin_classes"]}
+        stats = {cabin_class: [] for cabin_class in trip["cabin_classes"]}
+        for key in self._route_keys.get(route_id, []):
+            offers = self._trip_offers(trip, key)
+            results[key.cabin_class].extend(offers)
+            stats[key.cabin_class].append(self._trip_stats(trip, key, offers))
+        for cabin_class, offers in results.items():
+            offers.cabin_stats = {cabin_class: merge_stats(stats[cabin_class])}
+        return results
+
+    def _compose_results(self, route_id: tuple[str, str, str]) -> dict[str, OfferList]:
+        """Join a one-way route's filtered legs into its cheapest round trips per cabin."""
+        trip_id, origin, _ = route_id
+        trip = self._trips[trip_id]
+        outbound = {cabin_class: {} for cabin_class in trip["cabin_classes"]}
+        inbound = {cabin_class: {} for cabin_class in trip["cabin_classes"]}
+        for key in self._route_keys[route_id]:
+            legs = self._trip_offers(trip, key)
+            by_date = outbound if key.origin == origin else inbound
+            by_date[key.cabin_class][key.departure_date] = legs
+
+        results = {}
+        for cabin_class in trip["cabin_classes"]:
+            composed = compose_round_trips(
+                outbound[cabin_class],
+                inbound[cabin_class],
+                trip["min_trip_days"],
+                trip["max_trip_days"],
+                top_k=self.one_way_top_k
+            )
+            stats = {cabin_class: summarize_prices(offer["price"] for offer in composed)}
+            results[cabin_class] = OfferList(composed, stats)
+        return results
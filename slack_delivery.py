@@ -0,0 +1,193 @@
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import TokenBucket
+from resilience import ResilientCaller
+from tracing import NULL_TRACER, Tracer
+
+# Slack allows about one message per second per incoming webhook
+SLACK_WEBHOOK_RATE = 1.0
+# Slack truncates message text past 40,000 characters
+SLACK_MAX_MESSAGE_CHARS = 40000
+
+
+class SlackHTTPError(Exception):
+    """Non-200 response from a Slack webhook."""
+
+    def __init__(self, status_code: int, headers: dict[str, str]):
+        super().__init__(f"Slack webhook returned HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+
+
+def webhook_key(webhook_url: str) -> str:
+    """Short stable name for a webhook; the URL itself is a secret and never logged."""
+    return f"slack-{hashlib.sha256(webhook_url.encode('utf-8')).hexdigest()[:8]}"
+
+
+def digest_header(count: int) -> str:
+    return f"📬 *Fare digest: {count} trip{'' if count == 1 else 's'}*"
+
+
+def new_session(pool_size: int = 4) -> requests.Session:
+    """Keep-alive session whose connection pool fits every delivery worker."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+    return session
+
+
+def batch_messages(messages: list[str], max_chars: int = SLACK_MAX_MESSAGE_CHARS) -> list[list[int]]:
+    """Group message indexes, in order, into posts of at most max_chars. A longer
+    message goes alone."""
+    batches: list[list[int]] = []
+    size = 0
+    for i, message in enumerate(messages):
+        # Joined with a newline
+        if batches and size + 1 + len(message) <= max_chars:
+            batches[-1].append(i)
+            size += 1 + len(message)
+        else:
+            batches.append([i])
+            size = len(message)
+    return batches
+
+
+class SlackDelivery:
+    """Queue that posts Slack messages on background threads.
+
+    Each webhook has its own queue and token bucket, drained by one worker at a time,
+    so posts respect Slack's per-webhook rate limit; messages that queue up while a
+    worker waits are joined into one post. Digest messages are held until flush() and
+    then posted as one message per webhook under a header. Posts share a keep-alive session and go
+    through a ResilientCaller, which retries 429 (honoring Retry-After), 5xx and
+    network errors with backoff.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        resilience: ResilientCaller | None = None,
+        rate: float = SLACK_WEBHOOK_RATE,
+        max_chars: int = SLACK_MAX_MESSAGE_CHARS,
+        max_workers: int = 4,
+        timeout: float = 10,
+        tracer: Tracer | None = None
+    ):
+        self.session = session or new_session(max_workers)
+        self.resilience = resilience or ResilientCaller(base_delay=1, max_delay=30)
+        self.rate = rate
+        self.max_chars = max_chars
+        self.timeout = timeout
+        self.tracer = tracer or NULL_TRACER
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slack")
+        self._queues: dict[str, list[tuple[str, Future]]] = {}
+        self._limiters: dict[str, TokenBucket] = {}
+        self._draining: set[str] = set()
+        self._outstanding: list[Future] = []
+        self._digests: dict[str, list[tuple[str, Future]]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"messages": 0, "posts": 0, "delivered": 0, "failed": 0, "digests": 0}
+
+    def enqueue(self, webhook_url: str, message: str, digest: bool = False) -> Future:
+        """Queue a message, or hold it for the webhook's digest; the Future resolves to
+        whether it was delivered."""
+        future: Future = Future()
+        with self._lock:
+            self.counters["messages"] += 1
+            self._outstanding.append(future)
+            if digest:
+                self._digests.setdefault(webhook_url, []).append((message, future))
+                return future
+        self._submit(webhook_url, message, [future])
+        return future
+
+    def _submit(self, webhook_url: str, message: str, futures: list[Future]) -> None:
+        """Add a post to a webhook's queue; its result resolves every future in futures."""
+        future: Future = Future()
+        future.add_done_callback(lambda done: [f.set_result(done.result()) for f in futures])
+        with self._lock:
+            self._queues.setdefault(webhook_url, []).append((message, future))
+            if webhook_url not in self._draining:
+                self._draining.add(webhook_url)
+                self._limiters.setdefault(webhook_url, TokenBucket(rate=self.rate))
+                self._pool.submit(self._drain, webhook_url)
+        return future
+
+    def _drain(self, webhook_url: str) -> None:
+        limiter = self._limiters[webhook_url]
+        while True:
+            with self._lock:
+                if not self._queues.get(webhook_url):
+                    self._draining.discard(webhook_url)
+                    return
+            # Messages queued during the wait join this post
+            limiter.acquire()
+            with self._lock:
+                pending = self._queues.pop(webhook_url)
+            messages = [message for message, _ in pending]
+            for n, batch in enumerate(batch_messages(messages, self.max_chars)):
+                if n:
+                    limiter.acquire()
+                delivered = self._post(webhook_url, "\n".join(messages[i] for i in batch))
+                for i in batch:
+                    pending[i][1].set_result(delivered)
+
+    def _post(self, webhook_url: str, text: str) -> bool:
+        def post():
+            response = self.session.post(
+                webhook_url, json={"text": text, "mrkdwn": True}, timeout=self.timeout
+            )
+            if response.status_code != 200:
+                raise SlackHTTPError(response.status_code, dict(response.headers))
+
+        with self._lock:
+            self.counters["posts"] += 1
+        with self.tracer.span("slack.post", webhook=webhook_key(webhook_url), chars=len(text)) as span:
+            try:
+                self.resilience.call(webhook_key(webhook_url), post)
+            except Exception as e:
+                # Log error type only, not full details (security)
+                print(f"Slack delivery to {webhook_key(webhook_url)} failed: {type(e).__name__}")
+                span["delivered"] = False
+                return False
+            span["delivered"] = True
+            return True
+
+    def _send_digests(self) -> None:
+        with self._lock:
+            digests, self._digests = self._digests, {}
+        for webhook_url, entries in digests.items():
+            header = digest_header(len(entries))
+            messages = [message for message, _ in entries]
+            # Room for the header line on every part
+            for batch in batch_messages(messages, self.max_chars - len(header) - 1):
+                self._count("digests")
+                self._submit(
+                    webhook_url,
+                    "\n".join([header] + [messages[i] for i in batch]),
+                    [entries[i][1] for i in batch]
+                )
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def flush(self) -> dict:
+        """Post held digests, wait for every queued message and report delivery counts."""
+        self._send_digests()
+        with self._lock:
+            outstanding, self._outstanding = self._outstanding, []
+        wait(outstanding)
+        delivered = sum(future.result() for future in outstanding)
+        self._count("delivered", delivered)
+        self._count("failed", len(outstanding) - delivered)
+        with self._lock:
+            return dict(self.counters)
+
+    def close(self) -> None:
+        self.flush()
+        self._pool.shutdown()
@@ -1,13 +1,53 @@
-import requests
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
 from datetime import datetime
 from urllib.parse import urlencode
 
+from slack_delivery import SlackDelivery
+
+
+# Offers shown per cabin in a message
+TOP_OFFERS = 5
+
+_default_delivery: SlackDelivery | None = None
+_default_delivery_lock = threading.Lock()
+
+
+def default_delivery() -> SlackDelivery:
+    """Return the process-wide delivery for notifiers built without one, building it
+    on first use, so its worker pool is created once rather than per notifier."""
+    global _default_delivery
+    with _default_delivery_lock:
+        if _default_delivery is None:
+            _default_delivery = SlackDelivery()
+        return _default_delivery
+
+
+def results_fingerprint(route_results: dict[str, dict[str, list[dict]]], top_k: int = TOP_OFFERS) -> str:
+    """Hash of the offers a message would show: per route and cabin, the top offers'
+    dates, price and flight numbers. Drop percentages are left out, since they move
+    with the rolling average while the offers stay the same."""
+    shown = [
+        [
+            route, cabin, offer["price"], offer.get("departure_date"), offer.get("return_date"),
+            list(offer.get("flight_numbers", [])), list(offer.get("return_flight_numbers", [])),
+        ]
+        for route in sorted(route_results)
+        for cabin in sorted(route_results[route])
+        for offer in route_results[route][cabin][:top_k]
+    ]
+    return hashlib.sha256(json.dumps(shown).encode("utf-8")).hexdigest()[:16]
+
 
 class SlackNotifier:
     CURRENCY_SYMBOLS = {"INR": "₹", "SEK": "kr", "USD": "$", "EUR": "€"}
 
-    def __init__(self, webhook_url: str):
+    def __init__(self, webhook_url: str, delivery: SlackDelivery | None = None):
         self.webhook_url = webhook_url
+        # Share one delivery between notifiers so webhooks are rate limited and batched together
+        self.delivery = delivery or default_delivery()
 
     def format_message(
         self,
@@ -43,7 +83,7 @@ class SlackNotifier:
             cabin_label = "Premium Economy" if cabin == "PREMIUM_ECONOMY" else "Economy"
             lines.append(f"*{cabin_label}*")
 
-            for i, offer in enumerate(offers[:5], 1):
+            for i, offer in enumerate(offers[:TOP_OFFERS], 1):
                 offer_currency = offer.get("currency", currency)
                 offer_symbol = self.CURRENCY_SYMBOLS.get(offer_currency, offer_currency + " ")
                 price_str = f"{offer_symbol}{offer['price']:,.0f}"
@@ -185,11 +225,11 @@ class SlackNotifier:
         }
         return f"{base}?{urlencode(params)}"
 
+    def enqueue(self, message: str, digest: bool = False) -> Future:
+        """Queue message for the Slack webhook, or for its end-of-run digest; resolves
+        to whether it was delivered."""
+        return self.delivery.enqueue(self.webhook_url, message, digest=digest)
+
     def send(self, message: str) -> bool:
-        """Send message to Slack webhook."""
-        response = requests.post(
-            self.webhook_url,
-            json={"text": message, "mrkdwn": True},
-            timeout=10
-        )
-        return response.status_code == 200
+        """Send message to Slack webhook, waiting for delivery."""
+        return self.enqueue(message).result()
@@ -0,0 +1,372 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from price_store import ROLLING_WINDOW, PriceStore, fold_scan, price_stats_id
+from price_summaries import ROLLUP, bucket_start, downsample, scan_summaries, summary_id
+from tracing import Tracer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    trip_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    cabin_class TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    return_date TEXT,
+    scanned_at TEXT NOT NULL,
+    price REAL NOT NULL,
+    offer TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_history_scan ON price_history (trip_id, route, cabin_class, scanned_at);
+CREATE INDEX IF NOT EXISTS price_history_age ON price_history (scanned_at);
+
+CREATE TABLE IF NOT EXISTS scan_summaries (
+    id TEXT PRIMARY KEY,
+    trip_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    cabin_class TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    return_date TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    scanned_at TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min_price REAL NOT NULL,
+    p25_price REAL NOT NULL,
+    median_price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_summaries_scan ON scan_summaries (trip_id, route, cabin_class, scanned_at);
+CREATE INDEX IF NOT EXISTS scan_summaries_tier ON scan_summaries (tier, scanned_at);
+
+CREATE TABLE IF NOT EXISTS price_stats (
+    id TEXT PRIMARY KEY,
+    trip_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    cabin_class TEXT NOT NULL,
+    recent_scan_medians TEXT NOT NULL,
+    scan_count INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    min_price REAL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS offer_stats (
+    id INTEGER PRIMARY KEY,
+    trip_id TEXT NOT NULL,
+    route TEXT NOT NULL,
+    cabin_class TEXT NOT NULL,
+    scanned_at TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    min_price REAL,
+    max_price REAL,
+    avg_price REAL
+);
+CREATE INDEX IF NOT EXISTS offer_stats_scan ON offer_stats (trip_id, route, cabin_class, scanned_at);
+
+CREATE TABLE IF NOT EXISTS trips (
+    trip_id TEXT PRIMARY KEY,
+    active INTEGER NOT NULL,
+    next_scan_due TEXT,
+    config TEXT NOT NULL
+);
+"""
+# Indexes on columns added after a table's first release, created after MIGRATIONS
+INDEXES = """
+CREATE INDEX IF NOT EXISTS trips_due ON trips (active, next_scan_due);
+"""
+# (table, column, type) added to existing databases on open
+MIGRATIONS = (
+    ("trips", "next_scan_due", "TEXT"),
+)
+
+# Columns of scan_summaries after id, in insert order
+SUMMARY_COLUMNS = (
+    "trip_id", "route", "cabin_class", "departure_date", "return_date",
+    "tier", "scanned_at", "count", "min_price", "p25_price", "median_price",
+)
+# Offer row keys stored as columns rather than in the offer JSON
+ROW_COLUMNS = ("trip_id", "route", "scanned_at")
+
+
+def _timestamp(when: datetime) -> str:
+    """Fixed-width UTC ISO timestamp, so text order is time order."""
+    return when.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+class SQLitePriceTracker(PriceStore):
+    """Price history, rolling stats and trip configs in a local SQLite database.
+
+    Same tables and behavior as the Firestore PriceTracker, for offline runs,
+    backfills, benchmarks and self-hosted deployments. The database runs in WAL mode
+    so readers don't block the writer; each scan is written with bulk inserts in one
+    transaction together with its price_stats update.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        background_writes: bool = False,
+        max_workers: int = 4,
+        tracer: Tracer | None = None
+    ):
+        super().__init__(background_writes=background_writes, max_workers=max_workers, tracer=tracer)
+        self.path = path
+        # One connection shared by the write pool; calls are serialized by _db_lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._db_lock = threading.RLock()
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # WAL keeps the database consistent on power loss without syncing every commit
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            for table, column, column_type in MIGRATIONS:
+                columns = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            self._conn.executescript(INDEXES)
+
+    def close(self) -> None:
+        self.flush()
+        self._pool.shutdown()
+        with self._db_lock:
+            self._conn.close()
+
+    def _write_scan(self, summaries: list[dict], rows: list[dict], stats_rows: list[dict]) -> dict:
+        total = len(summaries) + len(rows) + len(stats_rows)
+        try:
+            with self._db_lock, self._conn:
+                self._insert_summaries(summaries)
+                self._conn.executemany(
+                    "INSERT INTO price_history (trip_id, route, cabin_class, departure_date, return_date,"
+                    " scanned_at, price, offer) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            row["trip_id"], row["route"], row["cabin_class"], row["departure_date"],
+                            row["return_date"], _timestamp(row["scanned_at"]), row["price"],
+                            _dumps({key: value for key, value in row.items() if key not in ROW_COLUMNS}),
+                        )
+                        for row in rows
+                    ]
+                )
+                self._conn.executemany(
+                    "INSERT INTO offer_stats (trip_id, route, cabin_class, scanned_at, count, min_price,"
+                    " max_price, avg_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            stats["trip_id"], stats["route"], stats["cabin_class"], _timestamp(stats["scanned_at"]),
+                            stats["count"], stats["min_price"], stats["max_price"], stats["avg_price"],
+                        )
+                        for stats in stats_rows
+                    ]
+                )
+                for summary in summaries:
+                    if summary["departure_date"] == ROLLUP:
+                        self._fold_rollup(summary)
+        except sqlite3.Error as e:
+            # The transaction rolled back, so nothing from this scan was stored
+            print(f"Price write failed for {total} rows: {type(e).__name__}")
+            return {"written": 0, "failed": total, "errors": [type(e).__name__]}
+        return {"written": total, "failed": 0, "errors": []}
+
+    def _insert_summaries(self, summaries: list[dict], tier: str = "scan") -> None:
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO scan_summaries (id, {', '.join(SUMMARY_COLUMNS)})"
+            f" VALUES ({', '.join('?' * (len(SUMMARY_COLUMNS) + 1))})",
+            [
+                (summary_id(summary, tier, summary["scanned_at"]), *(
+                    _timestamp(summary[column]) if column == "scanned_at" else summary[column]
+                    for column in SUMMARY_COLUMNS
+                ))
+                for summary in summaries
+            ]
+        )
+
+    def _fold_rollup(self, rollup: dict) -> None:
+        """Fold a whole-cabin summary into its price_stats row; runs inside the scan's transaction."""
+        stats_id = price_stats_id(rollup["trip_id"], rollup["route"], rollup["cabin_class"])
+        existing = self._conn.execute(
+            "SELECT recent_scan_medians, scan_count, count, min_price FROM price_stats WHERE id = ?",
+            (stats_id,)
+        ).fetchone()
+        aggregate = None
+        if existing:
+            aggregate = dict(existing)
+            aggregate["recent_scan_medians"] = json.loads(aggregate["recent_scan_medians"])
+        aggregate = fold_scan(aggregate, rollup["median_price"], rollup["count"], rollup["min_price"])
+        self._save_aggregate(stats_id, rollup, aggregate)
+
+    def _save_aggregate(self, stats_id: str, rollup: dict, aggregate: dict) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO price_stats (id, trip_id, route, cabin_class, recent_scan_medians,"
+            " scan_count, count, min_price, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                stats_id, rollup["trip_id"], rollup["route"], rollup["cabin_class"],
+                json.dumps(aggregate["recent_scan_medians"]), aggregate["scan_count"],
+                aggregate["count"], aggregate["min_price"], _timestamp(datetime.now(timezone.utc)),
+            )
+        )
+
+    def get_rolling_average(self, trip_id: str, route: str, cabin_class: str) -> float | None:
+        self._wait_for_writes(trip_id, route)
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT recent_scan_medians FROM price_stats WHERE id = ?",
+                (price_stats_id(trip_id, route, cabin_class),)
+            ).fetchone()
+            if row:
+                recent = json.loads(row["recent_scan_medians"])
+            else:
+                # No aggregate yet: read the whole-cabin summaries of recent scans
+                recent = [
+                    summary["median_price"] for summary in self._conn.execute(
+                        "SELECT median_price FROM scan_summaries WHERE trip_id = ? AND route = ?"
+                        " AND cabin_class = ? AND departure_date = ? ORDER BY scanned_at DESC LIMIT ?",
+                        (trip_id, route, cabin_class, ROLLUP, ROLLING_WINDOW)
+                    )
+                ]
+
+        if not recent:
+            return None
+
+        return sum(recent) / len(recent)
+
+    def get_pair_history(self, trip_id: str, route: str, cabin_class: str, limit: int = 500) -> dict[tuple[str, str], list[float]]:
+        self._wait_for_writes(trip_id, route)
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT departure_date, return_date, min_price FROM scan_summaries WHERE trip_id = ?"
+                " AND route = ? AND cabin_class = ? AND departure_date != ? ORDER BY scanned_at DESC LIMIT ?",
+                (trip_id, route, cabin_class, ROLLUP, limit)
+            ).fetchall()
+
+        history: dict[tuple[str, str], list[float]] = {}
+        for row in rows:
+            history.setdefault((row["departure_date"], row["return_date"]), []).append(row["min_price"])
+        return history
+
+    def rebuild_price_stats(self, trip_id: str | None = None) -> int:
+        where, params = ("WHERE trip_id = ?", (trip_id,)) if trip_id else ("", ())
+        with self._db_lock, self._conn:
+            scans: dict[tuple, list[dict]] = {}
+            for row in self._conn.execute(
+                f"SELECT trip_id, route, cabin_class, departure_date, return_date, scanned_at, price"
+                f" FROM price_history {where}", params
+            ):
+                scans.setdefault((row["trip_id"], row["route"], row["scanned_at"]), []).append(dict(row))
+            self._insert_summaries([
+                summary
+                for (scan_trip_id, route, scanned_at), rows in scans.items()
+                for summary in scan_summaries(scan_trip_id, route, datetime.fromisoformat(scanned_at), rows)
+            ])
+
+            rollups: dict[str, list[dict]] = {}
+            for row in self._conn.execute(
+                f"SELECT * FROM scan_summaries WHERE departure_date = ? {where.replace('WHERE', 'AND')}"
+                f" ORDER BY scanned_at", (ROLLUP, *params)
+            ):
+                rollups.setdefault(price_stats_id(row["trip_id"], row["route"], row["cabin_class"]), []).append(dict(row))
+
+            for stats_id, rows in rollups.items():
+                aggregate = None
+                for row in rows:
+                    aggregate = fold_scan(aggregate, row["median_price"], row["count"], row["min_price"])
+                self._save_aggregate(stats_id, rows[0], aggregate)
+        return len(rollups)
+
+    def compact_history(
+        self,
+        raw_days: int = 30,
+        daily_after_days: int = 30,
+        weekly_after_days: int = 180,
+        now: datetime | None = None
+    ) -> dict:
+        now = now or datetime.now(timezone.utc)
+        report = {
+            "raw_deleted": 0, "offer_stats_deleted": 0,
+            "daily_written": 0, "weekly_written": 0, "summaries_deleted": 0,
+        }
+        # Scan summaries stay at least as long as the offer rows they could be rebuilt from
+        cutoffs = {
+            "daily": bucket_start(now - timedelta(days=max(daily_after_days, raw_days)), "daily"),
+            "weekly": bucket_start(now - timedelta(days=weekly_after_days), "weekly"),
+        }
+
+        with self._db_lock, self._conn:
+            raw_cutoff = _timestamp(now - timedelta(days=raw_days))
+            deleted = self._conn.execute("DELETE FROM price_history WHERE scanned_at < ?", (raw_cutoff,))
+            report["raw_deleted"] = deleted.rowcount
+            # offer_stats only cover scans' unstored offers, so they go with the offer rows
+            deleted = self._conn.execute("DELETE FROM offer_stats WHERE scanned_at < ?", (raw_cutoff,))
+            report["offer_stats_deleted"] = deleted.rowcount
+
+            for source_tier, tier in (("scan", "daily"), ("daily", "weekly")):
+                rows = []
+                for row in self._conn.execute(
+                    "SELECT * FROM scan_summaries WHERE tier = ? AND scanned_at < ?",
+                    (source_tier, _timestamp(cutoffs[tier]))
+                ):
+                    row = dict(row)
+                    row["scanned_at"] = datetime.fromisoformat(row["scanned_at"])
+                    rows.append((row.pop("id"), row))
+                groups = downsample(rows, tier)
+                self._insert_summaries([summary for summary, _ in groups], tier)
+                self._conn.executemany(
+                    "DELETE FROM scan_summaries WHERE id = ?",
+                    [(source_id,) for _, source_ids in groups for source_id in source_ids]
+                )
+                report[f"{tier}_written"] = len(groups)
+                report["summaries_deleted"] += len(rows)
+
+        print(f"History compaction: {report}")
+        return report
+
+    def get_active_trips(self) -> list[tuple[str, dict]]:
+        with self._db_lock:
+            rows = self._conn.execute("SELECT trip_id, config FROM trips WHERE active = 1").fetchall()
+        return [(row["trip_id"], json.loads(row["config"])) for row in rows]
+
+    def get_due_trips(self, now: datetime) -> list[tuple[str, dict]]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT trip_id, config FROM trips WHERE active = 1 AND next_scan_due <= ? ORDER BY next_scan_due",
+                (_timestamp(now),)
+            ).fetchall()
+        return [(row["trip_id"], json.loads(row["config"])) for row in rows]
+
+    def _put_trip(self, trip_id: str, trip: dict) -> None:
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trips (trip_id, active, next_scan_due, config) VALUES (?, ?, ?, ?)",
+                (trip_id, *self._trip_columns(trip))
+            )
+
+    @staticmethod
+    def _trip_columns(trip: dict) -> tuple:
+        due = trip.get("next_scan_due")
+        if isinstance(due, str):
+            # Stored configs hold it as an ISO string; only updates pass a datetime
+            due = datetime.fromisoformat(due)
+        return int(bool(trip.get("active"))), _timestamp(due) if due else None, _dumps(trip)
+
+    def update_trip(self, trip_id: str, fields: dict) -> None:
+        with self._db_lock, self._conn:
+            row = self._conn.execute("SELECT config FROM trips WHERE trip_id = ?", (trip_id,)).fetchone()
+            if row is None:
+                raise KeyError(trip_id)
+            trip = {**json.loads(row["config"]), **fields}
+            self._conn.execute(
+                "UPDATE trips SET active = ?, next_scan_due = ?, config = ? WHERE trip_id = ?",
+                (*self._trip_columns(trip), trip_id)
+            )
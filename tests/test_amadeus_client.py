@@ -1,3 +1,7 @@
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 from unittest.mock import MagicMock, patch
 
@@ -234,3 +238,246 @@ def test_parse_baggage_empty():
         )
 
     assert results[0]["baggage"] == ""
+
+
+def test_get_flight_offers_by_cabin_buckets_single_search():
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.return_value.data = [
+        _make_offer(offer_id="1", price="52000", cabin="ECONOMY"),
+        _make_offer(offer_id="2", price="85000", cabin="PREMIUM_ECONOMY"),
+        _make_offer(offer_id="3", price="150000", cabin="BUSINESS"),
+    ]
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret")
+        results = client.get_flight_offers_by_cabin(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_classes=["ECONOMY", "PREMIUM_ECONOMY"], airlines=[], max_stops=2
+        )
+
+    assert list(results) == ["ECONOMY", "PREMIUM_ECONOMY"]
+    assert [o["offer_id"] for o in results["ECONOMY"]] == ["1"]
+    assert [o["offer_id"] for o in results["PREMIUM_ECONOMY"]] == ["2"]
+    call = mock_amadeus.shopping.flight_offers_search.get.call_args
+    assert "travelClass" not in call.kwargs
+    assert mock_amadeus.shopping.flight_offers_search.get.call_count == 1
+
+
+def test_get_flight_offers_by_cabin_falls_back_for_thin_cabins():
+    def search(**params):
+        response = MagicMock()
+        if params.get("travelClass") == "PREMIUM_ECONOMY":
+            response.data = [_make_offer(offer_id="pe", cabin="PREMIUM_ECONOMY")]
+        else:
+            response.data = [_make_offer(offer_id="eco", cabin="ECONOMY")]
+        return response
+
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.side_effect = search
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret")
+        results = client.get_flight_offers_by_cabin(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_classes=["ECONOMY", "PREMIUM_ECONOMY"], airlines=[], max_stops=2
+        )
+
+    assert [o["offer_id"] for o in results["ECONOMY"]] == ["eco"]
+    assert [o["offer_id"] for o in results["PREMIUM_ECONOMY"]] == ["pe"]
+    assert mock_amadeus.shopping.flight_offers_search.get.call_count == 2
+
+
+def test_get_flight_offers_pushes_filters_into_query():
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.return_value.data = [_make_offer()]
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret")
+        client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="ECONOMY", airlines=["QR", "EK"], max_stops=0,
+            max_price=90000.5, max_results=30
+        )
+
+    params = mock_amadeus.shopping.flight_offers_search.get.call_args.kwargs
+    assert params["includedAirlineCodes"] == "EK,QR"
+    assert params["nonStop"] == "true"
+    assert params["maxPrice"] == 90000
+    assert params["max"] == 30
+
+
+def test_get_flight_offers_widens_when_too_few_survive_filter():
+    # Marketed by EK but operated by another carrier, so the local filter drops it
+    codeshare_segments = [
+        {"carrierCode": "EK", "number": "1", "operating": {"carrierCode": "FZ"},
+         "departure": {"iataCode": "HYD", "at": "2026-06-01T14:30:00"},
+         "arrival": {"iataCode": "ARN", "at": "2026-06-01T23:00:00"}},
+    ]
+
+    def search(**params):
+        response = MagicMock()
+        response.data = [
+            _make_offer(offer_id=str(i), outbound_segments=codeshare_segments)
+            for i in range(params["max"])
+        ]
+        if params["max"] >= 40:
+            response.data[-1] = _make_offer(offer_id="ek")
+        return response
+
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.side_effect = search
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret")
+        offers = client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="ECONOMY", airlines=["EK"], max_stops=2,
+            max_results=10, min_results=1
+        )
+
+    assert [o["offer_id"] for o in offers] == ["ek"]
+    calls = mock_amadeus.shopping.flight_offers_search.get.call_args_list
+    assert [c.kwargs["max"] for c in calls] == [10, 20, 40]
+
+
+def test_get_flight_offers_stops_widening_once_run_budget_is_spent():
+    from quota import QuotaLedger
+    # Operated by another carrier, so nothing survives the EK filter and every search is short
+    codeshare_segments = [
+        {"carrierCode": "EK", "number": "1", "operating": {"carrierCode": "FZ"},
+         "departure": {"iataCode": "HYD", "at": "2026-06-01T14:30:00"},
+         "arrival": {"iataCode": "ARN", "at": "2026-06-01T23:00:00"}},
+    ]
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.side_effect = lambda **params: MagicMock(
+        data=[_make_offer(offer_id=str(i), outbound_segments=codeshare_segments) for i in range(params["max"])]
+    )
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret", quota_ledger=QuotaLedger(MagicMock()))
+        client.widen_budget = 2
+        client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="ECONOMY", airlines=["EK"], max_stops=2,
+            max_results=10, min_results=1
+        )
+
+    calls = mock_amadeus.shopping.flight_offers_search.get.call_args_list
+    assert [c.kwargs["max"] for c in calls] == [10, 20]
+
+
+def test_get_flight_offers_top_k_parses_cheapest_per_cabin():
+    import offers as offers_module
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.return_value.data = [
+        _make_offer(offer_id="e1", price="700", cabin="ECONOMY"),
+        _make_offer(offer_id="e2", price="500", cabin="ECONOMY"),
+        _make_offer(offer_id="e3", price="600", cabin="ECONOMY"),
+        _make_offer(offer_id="b1", price="2000", cabin="BUSINESS"),
+    ]
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus), \
+            patch('amadeus_client.parse_leg', wraps=offers_module.parse_leg) as parse_leg:
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret")
+        offers = client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class=None, airlines=[], max_stops=2, top_k=1
+        )
+
+    assert [o["offer_id"] for o in offers] == ["e2", "b1"]
+    # Outbound and return leg of the two kept offers only
+    assert parse_leg.call_count == 4
+    assert offers.truncated
+    assert offers.cabin_stats["ECONOMY"] == {
+        "count": 3, "min_price": 500.0, "max_price": 700.0, "total_price": 1800.0
+    }
+    assert offers.stats["count"] == 4
+
+
+class _HTTPResponse:
+    """Raw HTTP response as the SDK wraps it: status and headers, empty body."""
+
+    def __init__(self, status, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+    def read(self):
+        return b""
+
+
+def _sdk_response(status, headers=None):
+    from amadeus import Response
+    return Response(_HTTPResponse(status, headers), None)._parse(MagicMock())
+
+
+def test_resilient_client_honors_retry_after_on_sdk_errors():
+    from amadeus.client.errors import ClientError
+    from resilience import ResilientCaller
+
+    error = ClientError(_sdk_response(429, {"Retry-After": "60"}))
+    success = MagicMock()
+    success.data = [_make_offer()]
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.side_effect = [error, success]
+    sleeps = []
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret", resilience=ResilientCaller(sleep=sleeps.append))
+        offers = client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="ECONOMY", airlines=[], max_stops=2
+        )
+
+    assert len(offers) == 1
+    assert sleeps == [60.0]
+
+
+def test_resilient_client_retries_sdk_server_errors():
+    from amadeus.client.errors import ServerError
+    from resilience import ResilientCaller
+
+    response = _sdk_response(503)
+    success = MagicMock()
+    success.data = [_make_offer()]
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.side_effect = [ServerError(response), success]
+    quota_ledger = MagicMock()
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient(
+            "key", "secret", quota_ledger=quota_ledger,
+            resilience=ResilientCaller(sleep=lambda seconds: None)
+        )
+        offers = client.get_flight_offers(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="ECONOMY", airlines=[], max_stops=2
+        )
+
+    assert len(offers) == 1
+    # Every attempt counts against the quota
+    assert quota_ledger.record.call_count == 2
+
+
+def test_sdk_transport_cold_start_does_not_load_httpx():
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('httpx' in sys.modules)"],
+        capture_output=True, text=True, timeout=60, cwd=Path(__file__).resolve().parent.parent
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,156 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+
+class StubAmadeus(BaseHTTPRequestHandler):
+    """Minimal local stand-in for the Amadeus token and shopping endpoints."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        form = parse_qs(self.rfile.read(length).decode())
+        state = self.server.state
+        with state["lock"]:
+            state["token_requests"] += 1
+            token = f"token-{state['token_requests']}"
+        assert form["grant_type"] == ["client_credentials"]
+        self._send(200, {"access_token": token, "expires_in": state["expires_in"]})
+
+    def do_GET(self):
+        state = self.server.state
+        with state["lock"]:
+            state["connections"].add(self.client_address)
+            state["queries"].append(parse_qs(urlparse(self.path).query))
+        if self.headers["Authorization"] in state["revoked"]:
+            self._send(401, {"errors": []})
+            return
+        if urlparse(self.path).path == "/v2/shopping/flight-offers":
+            self._send(200, {"data": [{"id": "1"}]})
+        else:
+            self._send(429, {"errors": []}, {"Retry-After": "2"})
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubAmadeus)
+    server.state = {
+        "lock": threading.Lock(), "token_requests": 0, "expires_in": 1799,
+        "connections": set(), "queries": [], "revoked": set(),
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def fresh_process_tokens(monkeypatch):
+    import amadeus_transport
+    monkeypatch.setattr(amadeus_transport, "_process_tokens", amadeus_transport.MemoryTokenStore())
+
+
+def _transport(server, **kwargs):
+    from amadeus_transport import AsyncAmadeusTransport
+    host, port = server.server_address
+    return AsyncAmadeusTransport("key", "secret", base_url=f"http://{host}:{port}", **kwargs)
+
+
+def test_transport_reuses_token_and_pooled_connections(stub_server):
+    from concurrent.futures import ThreadPoolExecutor
+    transport = _transport(stub_server, max_connections=2)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(
+            lambda _: transport.get("flight_offers_search", originLocationCode="HYD", nonStop=False),
+            range(8)
+        ))
+    transport.close()
+
+    assert all(r.data == [{"id": "1"}] for r in responses)
+    assert stub_server.state["token_requests"] == 1
+    assert len(stub_server.state["connections"]) <= 2
+    assert stub_server.state["queries"][0]["nonStop"] == ["false"]
+
+
+def test_transport_shares_token_through_store(stub_server):
+    from amadeus_transport import MemoryTokenStore
+    import amadeus_transport
+    shared = MemoryTokenStore()
+
+    first = _transport(stub_server, token_store=shared)
+    first.get("flight_offers_search")
+    first.close()
+
+    # A new instance has an empty process cache but finds the shared token
+    amadeus_transport._process_tokens = MemoryTokenStore()
+    second = _transport(stub_server, token_store=shared)
+    second.get("flight_offers_search")
+    second.close()
+
+    assert stub_server.state["token_requests"] == 1
+
+
+def test_transport_refreshes_expiring_and_rejected_tokens(stub_server):
+    clock = [1000.0]
+    transport = _transport(stub_server, clock=lambda: clock[0])
+
+    transport.get("flight_offers_search")
+    clock[0] += 1799 - 30  # inside the refresh margin
+    transport.get("flight_offers_search")
+    assert stub_server.state["token_requests"] == 2
+
+    stub_server.state["revoked"].add("Bearer token-2")
+    transport.get("flight_offers_search")
+    transport.close()
+
+    assert stub_server.state["token_requests"] == 3
+
+
+def test_transport_raises_with_status_and_headers(stub_server):
+    from amadeus_transport import AmadeusHTTPError
+    transport = _transport(stub_server)
+
+    with pytest.raises(AmadeusHTTPError) as excinfo:
+        transport.get("flight_dates", origin="HYD")
+    transport.close()
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers["retry-after"] == "2"
+
+
+def test_amadeus_client_parses_offers_from_transport():
+    from unittest.mock import MagicMock
+    from amadeus_client import AmadeusClient
+    from amadeus_transport import TransportResponse
+    from tests.test_amadeus_client import _make_offer
+
+    transport = MagicMock()
+    transport.get.return_value = TransportResponse([_make_offer()], 200, {})
+    client = AmadeusClient("key", "secret", transport=transport)
+
+    results = client.get_flight_offers(
+        origin="HYD", destination="ARN",
+        departure_date="2026-06-01", return_date="2026-07-01",
+        cabin_class="PREMIUM_ECONOMY", airlines=[], max_stops=2
+    )
+
+    assert client.client is None
+    assert results[0]["flight_numbers"] == ["EK 528", "EK 157"]
+    assert transport.get.call_args.args == ("flight_offers_search",)
@@ -0,0 +1,38 @@
+# tests/test_benchmarks.py
+
+
+def test_benchmark_suite_runs_and_compares_with_baseline(tmp_path, capsys):
+    from benchmarks.run_benchmarks import main_cli
+    baseline = tmp_path / "baseline.json"
+    sizes = ["--offers", "5", "--days", "3", "--trips", "2", "--iterations", "2", "--baseline", str(baseline)]
+
+    assert main_cli(sizes + ["--save-baseline"]) == 0
+    # Tiny runs are noisy; only check that every benchmark is compared
+    assert main_cli(sizes + ["--tolerance", "1000"]) == 0
+
+    out = capsys.readouterr().out
+    assert "REGRESSION" not in out
+    for name in ("parse_leg", "parse_offers", "parse_offers_dict", "generate_date_pairs", "format_message", "check_flights"):
+        assert out.count(f"\n{name} ") == 2
+
+
+def test_compare_flags_slower_median_and_higher_peak_memory():
+    from benchmarks.harness import compare
+    baseline = {"results": {"parse_offers": {"p50_ms": 10.0, "peak_kib": 100.0}}}
+    results = [{"name": "parse_offers", "p50_ms": 13.0, "peak_kib": 110.0}, {"name": "new", "p50_ms": 1.0, "peak_kib": 1.0}]
+
+    assert compare(results, baseline, tolerance=0.2) == ["parse_offers p50_ms: 10.0 -> 13.0 (+30%)"]
+
+
+def test_fake_firestore_queries_like_firestore():
+    from benchmarks.fakes import FakeFirestore
+    db = FakeFirestore()
+    trips = db.collection("trips")
+    trips.document("a").set({"active": True, "next_scan_due": 1})
+    trips.document("b").set({"active": True, "next_scan_due": 5})
+    trips.document("c").set({"active": True})
+
+    due = trips.where("active", "==", True).where("next_scan_due", "<=", 3).stream()
+    assert [doc.id for doc in due] == ["a"]
+    ordered = trips.where("active", "==", True).order_by("next_scan_due", direction="DESCENDING").limit(1).stream()
+    assert [doc.id for doc in ordered] == ["b"]
@@ -0,0 +1,104 @@
+from datetime import date
+
+
+def test_generate_date_pairs_respects_trip_length():
+    from date_planner import generate_date_pairs
+    pairs = generate_date_pairs(["2026-06-01", "2026-06-05"], ["2026-06-10", "2026-06-20"], 7, 10, max_pairs=50)
+
+    assert pairs
+    for dep, ret in pairs:
+        assert 7 <= (date.fromisoformat(ret) - date.fromisoformat(dep)).days <= 10
+
+
+def test_generate_date_pairs_samples_evenly():
+    from date_planner import generate_date_pairs
+    pairs = generate_date_pairs(["2026-06-01", "2026-06-30"], ["2026-07-01", "2026-07-30"], 1, 60, max_pairs=5)
+
+    assert len(pairs) == 5
+    assert pairs == sorted(pairs)
+
+
+def test_select_calendar_pairs_picks_cheapest_valid_pairs():
+    from date_planner import select_calendar_pairs
+    calendar = [
+        {"departure_date": "2026-06-01", "return_date": "2026-06-03", "price": 100},  # too short
+        {"departure_date": "2026-06-02", "return_date": "2026-06-12", "price": 300},
+        {"departure_date": "2026-06-03", "return_date": "2026-06-13", "price": 200},
+        {"departure_date": "2026-05-01", "return_date": "2026-06-11", "price": 50},  # outside range
+        {"departure_date": "2026-06-04", "return_date": "2026-06-14", "price": 400},
+    ]
+
+    pairs = select_calendar_pairs(
+        calendar, ["2026-06-01", "2026-06-05"], ["2026-06-10", "2026-06-20"], 7, 10, max_pairs=2
+    )
+
+    assert pairs == [("2026-06-03", "2026-06-13"), ("2026-06-02", "2026-06-12")]
+
+
+def test_select_calendar_pairs_tops_up_from_grid():
+    from date_planner import select_calendar_pairs
+    calendar = [{"departure_date": "2026-06-02", "return_date": "2026-06-12", "price": 300}]
+
+    pairs = select_calendar_pairs(
+        calendar, ["2026-06-01", "2026-06-05"], ["2026-06-10", "2026-06-20"], 7, 10, max_pairs=3
+    )
+
+    assert pairs[0] == ("2026-06-02", "2026-06-12")
+    assert len(pairs) == 3
+    assert len(set(pairs)) == 3
+
+
+def _grid():
+    from date_planner import all_date_pairs
+    return all_date_pairs(["2026-06-01", "2026-06-10"], ["2026-06-15", "2026-06-25"], 7, 14)
+
+
+def test_select_adaptive_pairs_is_deterministic_under_seed():
+    from date_planner import select_adaptive_pairs
+    history = {("2026-06-01", "2026-06-15"): [500, 520]}
+
+    first = select_adaptive_pairs(_grid(), history, max_pairs=4, seed="trip:2026-05-01")
+    second = select_adaptive_pairs(_grid(), history, max_pairs=4, seed="trip:2026-05-01")
+
+    assert first == second
+    assert len(first) == 4
+
+
+def test_select_adaptive_pairs_favors_volatile_and_cheap_pairs():
+    from date_planner import select_adaptive_pairs
+    history = {
+        ("2026-06-01", "2026-06-15"): [500, 500, 500],  # stable, expensive
+        ("2026-06-02", "2026-06-16"): [300, 310, 305],  # cheap
+        ("2026-06-03", "2026-06-17"): [450, 250, 600],  # volatile
+    }
+
+    pairs = select_adaptive_pairs(_grid(), history, max_pairs=3, explore_ratio=0.2, seed=1)
+
+    assert ("2026-06-02", "2026-06-16") in pairs
+    assert ("2026-06-03", "2026-06-17") in pairs
+    assert ("2026-06-01", "2026-06-15") not in pairs
+    # One slot is spent exploring an unsampled pair
+    assert len([p for p in pairs if p not in history]) == 1
+
+
+def test_select_adaptive_pairs_zero_explore_ratio_uses_history_only():
+    from date_planner import select_adaptive_pairs
+    history = {
+        ("2026-06-01", "2026-06-15"): [500, 500, 500],
+        ("2026-06-02", "2026-06-16"): [300, 310, 305],
+        ("2026-06-03", "2026-06-17"): [450, 250, 600],
+    }
+
+    pairs = select_adaptive_pairs(_grid(), history, max_pairs=3, explore_ratio=0, seed=1)
+
+    assert sorted(pairs) == sorted(history)
+
+
+def test_select_adaptive_pairs_explores_without_history():
+    from date_planner import select_adaptive_pairs
+    grid = _grid()
+
+    pairs = select_adaptive_pairs(grid, {}, max_pairs=5, seed=7)
+
+    assert len(pairs) == 5
+    assert set(pairs) <= set(grid)
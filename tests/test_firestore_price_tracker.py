@@ -1,11 +1,31 @@
 # tests/test_price_tracker.py
 import pytest
 from unittest.mock import MagicMock
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+def _no_aggregates(mock_firestore):
+    """No price_stats aggregate documents exist yet."""
+    mock_firestore.collection.return_value.document.return_value.get.return_value.exists = False
+
+
+def _docs(rows):
+    docs = []
+    for i, row in enumerate(rows):
+        doc = MagicMock()
+        doc.id = f"doc-{i}"
+        doc.to_dict.return_value = row
+        docs.append(doc)
+    return docs
+
+
+def _price(price, departure_date="2026-06-01", return_date="2026-07-01", cabin_class="ECONOMY"):
+    return {"price": price, "cabin_class": cabin_class, "departure_date": departure_date, "return_date": return_date}
 
 
 def test_store_prices_writes_to_firestore(mock_firestore):
     from firestore_price_tracker import PriceTracker
+    _no_aggregates(mock_firestore)
     tracker = PriceTracker(mock_firestore)
 
     prices = [
@@ -14,21 +34,84 @@ def test_store_prices_writes_to_firestore(mock_firestore):
          "cabin_class": "PREMIUM_ECONOMY", "fare_family": "Basic", "duration_minutes": 750}
     ]
 
-    tracker.store_prices("test-trip", "HYD-ARN", prices)
+    report = tracker.store_prices("test-trip", "HYD-ARN", prices)
+
+    mock_firestore.collection.assert_any_call("price_history")
+    mock_firestore.collection.assert_any_call("scan_summaries")
+    batch = mock_firestore.batch.return_value
+    written = [call.args[1] for call in batch.set.call_args_list]
+    # Date pair summary, whole-cabin rollup, then the offer row
+    assert [doc.get("departure_date") for doc in written] == ["2026-06-01", "", "2026-06-01"]
+    assert written[0]["median_price"] == 85000
+    assert written[2]["offer_id"] == "1"
+    assert batch.commit.call_count == 1
+    assert report == {"written": 3, "failed": 0, "errors": []}
+
+
+def test_store_prices_writes_offer_stats_in_the_scan_batch(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+    _no_aggregates(mock_firestore)
+    tracker = PriceTracker(mock_firestore)
+    stats = {"count": 3, "min_price": 800, "max_price": 1000, "total_price": 2700}
+
+    report = tracker.store_prices("test-trip", "HYD-ARN", [_price(800)], offer_stats={"ECONOMY": stats})
+
+    batch = mock_firestore.batch.return_value
+    written = [call.args[1] for call in batch.set.call_args_list]
+    assert [doc for doc in written if "avg_price" in doc][0]["count"] == 3
+    assert batch.commit.call_count == 1
+    assert report["written"] == 4
+    mock_firestore.collection.return_value.add.assert_not_called()
+
+
+def test_store_prices_chunks_batches_and_reports_partial_failure(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+
+    _no_aggregates(mock_firestore)
+    batches = [MagicMock(), MagicMock(), MagicMock()]
+    batches[1].commit.side_effect = RuntimeError("unavailable")
+    mock_firestore.batch.side_effect = batches
+    tracker = PriceTracker(mock_firestore)
 
-    mock_firestore.collection.assert_called_with("price_history")
-    assert mock_firestore.collection().add.called
+    prices = [_price(i) for i in range(1100)]
+    report = tracker.store_prices("test-trip", "HYD-ARN", prices)
+
+    # 1100 offer rows plus a pair summary and a rollup
+    assert [batch.set.call_count for batch in batches] == [500, 500, 102]
+    assert report == {"written": 602, "failed": 500, "errors": ["RuntimeError"]}
+
+
+def test_background_writes_finish_before_reads(mock_firestore):
+    import threading
+    from firestore_price_tracker import PriceTracker
+
+    _no_aggregates(mock_firestore)
+    release = threading.Event()
+    mock_firestore.batch.return_value.commit.side_effect = lambda: release.wait(2)
+    mock_firestore.collection().where().where().where().where().order_by().limit().stream.side_effect = (
+        lambda: [] if release.is_set() else pytest.fail("read before pending write committed")
+    )
+    tracker = PriceTracker(mock_firestore, background_writes=True)
+
+    future = tracker.store_prices("test-trip", "HYD-ARN", [_price(1)])
+    assert not future.done()
+    threading.Timer(0.05, release.set).start()
+
+    assert tracker.get_rolling_average("test-trip", "HYD-ARN", "ECONOMY") is None
+    assert tracker.flush() == {"written": 3, "failed": 0, "errors": []}
 
 
 def test_get_rolling_average_calculates_from_last_7_scans(mock_firestore):
-    # Mock query results - 7 price observations
+    # Mock query results - whole-cabin summaries of 7 scans
     mock_docs = []
     for i, price in enumerate([80000, 82000, 85000, 83000, 81000, 84000, 86000]):
         doc = MagicMock()
-        doc.to_dict.return_value = {"price": price}
+        doc.to_dict.return_value = {"median_price": price}
         mock_docs.append(doc)
 
-    mock_firestore.collection().where().where().where().order_by().limit().stream.return_value = mock_docs
+    mock_firestore.collection().where().where().where().where().order_by().limit().stream.return_value = mock_docs
+    # No aggregate yet: falls back to the scan summaries query
+    _no_aggregates(mock_firestore)
 
     from firestore_price_tracker import PriceTracker
     tracker = PriceTracker(mock_firestore)
@@ -36,3 +119,143 @@ def test_get_rolling_average_calculates_from_last_7_scans(mock_firestore):
     avg = tracker.get_rolling_average("test-trip", "HYD-ARN", "PREMIUM_ECONOMY")
 
     assert avg == 83000  # (80000+82000+85000+83000+81000+84000+86000) / 7
+
+
+def test_get_rolling_average_without_index_returns_none(mock_firestore):
+    query = mock_firestore.collection().where().where().where().where().order_by().limit()
+    query.stream.side_effect = RuntimeError("FailedPrecondition: the query requires an index")
+    _no_aggregates(mock_firestore)
+
+    from firestore_price_tracker import PriceTracker
+    tracker = PriceTracker(mock_firestore)
+
+    assert tracker.get_rolling_average("test-trip", "HYD-ARN", "FIRST") is None
+
+
+def test_get_pair_history_reads_cheapest_per_scan_from_summaries(mock_firestore):
+    rows = [
+        {"departure_date": "2026-06-01", "return_date": "2026-07-01", "min_price": 800},
+        {"departure_date": "", "return_date": "", "min_price": 700},
+        {"departure_date": "2026-06-03", "return_date": "2026-07-02", "min_price": 700},
+        {"departure_date": "2026-06-01", "return_date": "2026-07-01", "min_price": 850},
+    ]
+    mock_firestore.collection().where().where().where().order_by().limit().stream.return_value = _docs(rows)
+
+    from firestore_price_tracker import PriceTracker
+    tracker = PriceTracker(mock_firestore)
+
+    history = tracker.get_pair_history("test-trip", "HYD-ARN", "ECONOMY")
+
+    assert history == {
+        ("2026-06-01", "2026-07-01"): [800, 850],
+        ("2026-06-03", "2026-07-02"): [700],
+    }
+
+
+def test_fold_scan_keeps_ring_buffer_of_scan_medians():
+    from firestore_price_tracker import fold_scan
+
+    aggregate = None
+    for median in [500, 400, 300, 200, 600]:
+        aggregate = fold_scan(aggregate, median, count=10, min_price=median - 50, window=4)
+
+    assert aggregate == {"recent_scan_medians": [400, 300, 200, 600], "scan_count": 5, "count": 50, "min_price": 150}
+
+
+def test_rolling_average_is_one_aggregate_read(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+    snapshot = mock_firestore.collection.return_value.document.return_value.get.return_value
+    snapshot.exists = True
+    snapshot.to_dict.return_value = {"recent_scan_medians": [800, 900, 1000]}
+    tracker = PriceTracker(mock_firestore)
+
+    assert tracker.get_rolling_average("test-trip", "HYD-ARN", "ECONOMY") == 900
+    mock_firestore.collection.return_value.document.assert_called_with("test-trip__HYD-ARN__ECONOMY")
+    assert not mock_firestore.collection.return_value.where.called
+
+
+def test_store_prices_folds_scan_median_into_aggregate(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+    snapshot = mock_firestore.collection.return_value.document.return_value.get.return_value
+    snapshot.exists = True
+    snapshot.to_dict.return_value = {"recent_scan_medians": [1000], "scan_count": 1, "count": 4, "min_price": 950}
+    tracker = PriceTracker(mock_firestore)
+
+    # A scan with many offers counts once, at its median
+    tracker.store_prices("test-trip", "HYD-ARN", [_price(p) for p in [800, 900, 900, 900, 5000]])
+
+    written = mock_firestore.transaction.return_value.set.call_args.args[1]
+    assert written["recent_scan_medians"] == [1000, 900]
+    assert written["scan_count"] == 2
+    assert written["count"] == 9
+    assert written["min_price"] == 800
+    assert written["cabin_class"] == "ECONOMY"
+
+
+def test_rebuild_price_stats_regenerates_from_summaries(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+    first = datetime(2026, 5, 1, tzinfo=timezone.utc)
+    second = datetime(2026, 5, 2, tzinfo=timezone.utc)
+    raw = [
+        {"trip_id": "t", "route": "HYD-ARN", "scanned_at": second, **_price(700)},
+        {"trip_id": "t", "route": "HYD-ARN", "scanned_at": second, **_price(900)},
+    ]
+    rollups = [
+        {"trip_id": "t", "route": "HYD-ARN", "cabin_class": "ECONOMY", "scanned_at": second,
+         "median_price": 800, "count": 2, "min_price": 700},
+        {"trip_id": "t", "route": "HYD-ARN", "cabin_class": "ECONOMY", "scanned_at": first,
+         "median_price": 1000, "count": 3, "min_price": 950},
+        {"trip_id": "t", "route": "HYD-ARN", "cabin_class": "BUSINESS", "scanned_at": first,
+         "median_price": 3000, "count": 1, "min_price": 3000},
+    ]
+    mock_firestore.collection.return_value.where.return_value.stream.return_value = _docs(raw)
+    mock_firestore.collection.return_value.where.return_value.where.return_value.stream.return_value = _docs(rollups)
+    tracker = PriceTracker(mock_firestore)
+
+    assert tracker.rebuild_price_stats("t") == 2
+
+    written = [call.args[1] for call in mock_firestore.batch().set.call_args_list]
+    # Scan summaries rebuilt from the raw rows still in price_history
+    assert {doc.get("departure_date") for doc in written if "median_price" in doc} == {"2026-06-01", ""}
+    aggregates = {doc["cabin_class"]: doc for doc in written if "recent_scan_medians" in doc}
+    assert aggregates["ECONOMY"]["recent_scan_medians"] == [1000, 800]
+    assert aggregates["BUSINESS"]["scan_count"] == 1
+
+
+def test_compact_history_downsamples_tiers_and_drops_old_rows(mock_firestore):
+    from firestore_price_tracker import PriceTracker
+    now = datetime(2026, 9, 1, tzinfo=timezone.utc)
+    base = {"trip_id": "t", "route": "HYD-ARN", "cabin_class": "ECONOMY",
+            "departure_date": "2026-10-01", "return_date": "2026-10-20"}
+    old_scans = [
+        {**base, "tier": "scan", "scanned_at": datetime(2026, 7, 1, 8, tzinfo=timezone.utc),
+         "count": 3, "min_price": 500, "p25_price": 550, "median_price": 600},
+        {**base, "tier": "scan", "scanned_at": datetime(2026, 7, 1, 20, tzinfo=timezone.utc),
+         "count": 1, "min_price": 450, "p25_price": 450, "median_price": 450},
+    ]
+
+    tier_rows = {"scan": _docs(old_scans), "daily": []}
+
+    def where(field, op, value):
+        query = MagicMock()
+        if field == "tier":
+            query.where.return_value.stream.return_value = tier_rows[value]
+        else:
+            # Offer rows older than raw_days
+            query.stream.return_value = _docs([{}, {}])
+        return query
+
+    mock_firestore.collection.return_value.where.side_effect = where
+    tracker = PriceTracker(mock_firestore)
+
+    report = tracker.compact_history(raw_days=30, daily_after_days=30, weekly_after_days=180, now=now)
+
+    # Offer rows and offer_stats older than raw_days
+    assert report == {"raw_deleted": 2, "offer_stats_deleted": 2, "daily_written": 1,
+                      "weekly_written": 0, "summaries_deleted": 2}
+    batch = mock_firestore.batch.return_value
+    daily = batch.set.call_args.args[1]
+    assert daily["tier"] == "daily"
+    assert daily["scanned_at"] == datetime(2026, 7, 1, tzinfo=timezone.utc)
+    assert (daily["count"], daily["min_price"], daily["median_price"]) == (4, 450, 600)
+    assert batch.delete.call_count == 6
@@ -0,0 +1,24 @@
+# tests/test_lazy_imports.py
+import sys
+
+import pytest
+
+
+def test_module_is_executed_on_first_attribute_access(tmp_path, monkeypatch):
+    from lazy_imports import lazy_import
+    (tmp_path / "lazy_probe.py").write_text("import sys\nsys.lazy_probe_loaded = True\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_probe", raising=False)
+
+    module = lazy_import("lazy_probe")
+    assert not hasattr(sys, "lazy_probe_loaded")
+    assert module.VALUE == 42
+    assert sys.lazy_probe_loaded
+    assert lazy_import("lazy_probe") is module
+    del sys.lazy_probe_loaded
+
+
+def test_missing_module_raises():
+    from lazy_imports import lazy_import
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("no_such_module_here")
@@ -0,0 +1,65 @@
+def _leg(offer_id, date, price, airlines=("EK",), stops=1):
+    return {
+        "offer_id": offer_id, "price": price, "currency": "INR",
+        "departure_date": date, "return_date": None,
+        "airlines": list(airlines), "stops": stops, "cabin_class": "ECONOMY",
+        "fare_family": "Light", "duration_minutes": 600, "layover_cities": ["DXB"],
+        "flight_numbers": ["EK 1", "EK 2"], "departure_time": f"{date}T10:00:00",
+        "arrival_time": f"{date}T20:00:00", "seats_remaining": 4,
+    }
+
+
+def test_compose_round_trips_returns_cheapest_valid_combinations():
+    from leg_composer import compose_round_trips
+    outbound = {
+        "2026-06-01": [_leg("o1", "2026-06-01", 400), _leg("o2", "2026-06-01", 300)],
+        "2026-06-02": [_leg("o3", "2026-06-02", 100)],
+    }
+    inbound = {
+        "2026-06-05": [_leg("i1", "2026-06-05", 50)],  # too short for 2026-06-01
+        "2026-06-10": [_leg("i2", "2026-06-10", 200)],
+        "2026-06-20": [_leg("i3", "2026-06-20", 10)],  # too long
+    }
+
+    results = compose_round_trips(outbound, inbound, min_days=5, max_days=10, top_k=3)
+
+    assert [r["offer_id"] for r in results] == ["o3+i2", "o2+i2", "o1+i2"]
+    assert [r["price"] for r in results] == [300, 500, 600]
+
+
+def test_compose_round_trips_builds_return_fields():
+    from leg_composer import compose_round_trips
+    outbound = {"2026-06-01": [_leg("o1", "2026-06-01", 400)]}
+    inbound = {"2026-06-08": [dict(_leg("i1", "2026-06-08", 300), seats_remaining=2, airlines=["LH"])]}
+
+    [offer] = compose_round_trips(outbound, inbound, min_days=5, max_days=10)
+
+    assert offer["departure_date"] == "2026-06-01"
+    assert offer["return_date"] == "2026-06-08"
+    assert offer["airlines"] == ["EK"]
+    assert offer["return_airlines"] == ["LH"]
+    assert offer["return_departure_time"] == "2026-06-08T10:00:00"
+    assert offer["seats_remaining"] == 2
+    assert offer["composed"] is True
+
+
+def test_compose_round_trips_matches_brute_force():
+    import itertools
+    from datetime import date
+    from leg_composer import compose_round_trips
+
+    outbound = {f"2026-06-0{d}": [_leg(f"o{d}{n}", f"2026-06-0{d}", (d * 37 + n * 53) % 400 + 100)
+                                   for n in range(4)] for d in range(1, 6)}
+    inbound = {f"2026-06-1{d}": [_leg(f"i{d}{n}", f"2026-06-1{d}", (d * 29 + n * 71) % 300 + 100)
+                                  for n in range(4)] for d in range(0, 6)}
+
+    expected = sorted(
+        o["price"] + i["price"]
+        for (od, outs), (idate, ins) in itertools.product(outbound.items(), inbound.items())
+        if 7 <= (date.fromisoformat(idate) - date.fromisoformat(od)).days <= 12
+        for o in outs for i in ins
+    )[:10]
+
+    results = compose_round_trips(outbound, inbound, min_days=7, max_days=12, top_k=10)
+
+    assert [r["price"] for r in results] == expected
@@ -4,6 +4,16 @@ from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
 
+@pytest.fixture(autouse=True)
+def fresh_instance(monkeypatch):
+    """Each test starts as a cold instance, without clients or secrets from earlier tests."""
+    import main
+    for name in ("_firestore_client", "_secret_client", "_amadeus_sdk"):
+        monkeypatch.setattr(main, name, None)
+    monkeypatch.setattr(main, "_secret_cache", {})
+    monkeypatch.setattr(main, "_invocations", 0)
+
+
 def test_check_flights_processes_active_trips(sample_trip_config):
     # Add scan_window to config (not in original fixture)
     sample_trip_config["scan_window"] = {
@@ -12,10 +22,6 @@ def test_check_flights_processes_active_trips(sample_trip_config):
     }
 
     mock_firestore = MagicMock()
-    mock_trip_doc = MagicMock()
-    mock_trip_doc.to_dict.return_value = sample_trip_config
-    mock_trip_doc.id = "test-trip"
-    mock_firestore.collection().where().stream.return_value = [mock_trip_doc]
 
     mock_amadeus_client = MagicMock()
     mock_amadeus_client.get_cheapest_dates.return_value = [
@@ -29,17 +35,336 @@ def test_check_flights_processes_active_trips(sample_trip_config):
 
     mock_notifier = MagicMock()
     mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [("test-trip", sample_trip_config)]
     mock_tracker.get_rolling_average.return_value = 95000
 
     with patch('main.firestore.Client', return_value=mock_firestore), \
          patch('main.AmadeusClient', return_value=mock_amadeus_client), \
          patch('main.SlackNotifier', return_value=mock_notifier), \
          patch('main.PriceTracker', return_value=mock_tracker), \
-         patch('main.get_secret', side_effect=["key", "secret", "webhook"]):
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
 
         from main import check_flights
         request = MagicMock()
         response = check_flights(request)
 
     assert response == "OK"
-    assert mock_notifier.send.called
+    assert mock_notifier.enqueue.called
+
+
+def test_check_flights_skips_unchanged_notifications(sample_trip_config):
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+    trips = [
+        ("same-trip", dict(sample_trip_config, last_notification_fingerprint="abc")),
+        ("new-trip", dict(sample_trip_config, last_notification_fingerprint="old")),
+    ]
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.return_value = [
+        {"offer_id": "1", "price": 85000, "airlines": ["EK"], "stops": 1,
+         "cabin_class": "ECONOMY", "fare_family": "Basic"}
+    ]
+    mock_notifier = MagicMock()
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = trips
+    mock_tracker.get_rolling_average.return_value = None
+
+    with patch('main.firestore.Client', return_value=MagicMock()), \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client), \
+         patch('main.SlackNotifier', return_value=mock_notifier), \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.results_fingerprint', return_value="abc"), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        from main import check_flights
+        check_flights(MagicMock())
+
+    # Only the trip whose offers changed is posted
+    assert mock_notifier.enqueue.call_count == 1
+
+
+def test_check_flights_isolates_failed_trips(sample_trip_config):
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+
+    mock_firestore = MagicMock()
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.return_value = [
+        {"offer_id": "1", "price": 85000, "airlines": ["EK"], "stops": 1,
+         "cabin_class": "ECONOMY", "fare_family": "Basic"}
+    ]
+
+    def store_prices(trip_id, route, offers, offer_stats=None):
+        if trip_id == "bad-trip":
+            raise RuntimeError("write failed")
+
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [
+        (trip_id, dict(sample_trip_config)) for trip_id in ["good-trip", "bad-trip"]
+    ]
+    mock_tracker.store_prices.side_effect = store_prices
+    mock_tracker.get_rolling_average.return_value = None
+
+    with patch('main.firestore.Client', return_value=mock_firestore), \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client), \
+         patch('main.SlackNotifier', return_value=MagicMock()), \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        from main import check_flights
+        response = check_flights(MagicMock())
+
+    assert response == "OK"
+    updated = [c.args[0] for c in mock_tracker.update_trip.call_args_list]
+    assert "good-trip" in updated
+    assert "bad-trip" not in updated
+
+
+def test_check_flights_skips_hand_edited_invalid_trips(sample_trip_config):
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+    missing_origins = dict(sample_trip_config)
+    del missing_origins["origins"]
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.return_value = []
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [
+        ("missing-origins", missing_origins),
+        ("no-cabins", dict(sample_trip_config, cabin_classes=None)),
+        ("good-trip", dict(sample_trip_config, origins=["hyd"])),
+    ]
+    mock_tracker.get_rolling_average.return_value = None
+
+    with patch('main.firestore.Client', return_value=MagicMock()), \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client), \
+         patch('main.SlackNotifier', return_value=MagicMock()), \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        from main import check_flights
+        assert check_flights(MagicMock()) == "OK"
+
+    updates = {c.args[0]: c.args[1] for c in mock_tracker.update_trip.call_args_list}
+    assert updates["missing-origins"] == {"next_scan_due": None}
+    assert updates["no-cabins"] == {"next_scan_due": None}
+    assert "last_scanned" in updates["good-trip"]
+    # The normalized config is the one scanned
+    assert mock_amadeus_client.get_flight_offers.call_args.kwargs["origin"] == "HYD"
+
+
+def test_plan_date_pairs_uses_calendar_strategy(sample_trip_config):
+    from main import plan_date_pairs
+    trip = dict(sample_trip_config, date_strategy="calendar", max_pairs=1)
+
+    amadeus = MagicMock()
+    amadeus.get_cheapest_dates.return_value = [
+        {"departure_date": "2026-06-05", "return_date": "2026-07-03", "price": 70000},
+        {"departure_date": "2026-06-01", "return_date": "2026-07-01", "price": 85000},
+    ]
+
+    assert plan_date_pairs(amadeus, MagicMock(), "test-trip", trip, "HYD", "ARN") == [("2026-06-05", "2026-07-03")]
+    assert amadeus.get_cheapest_dates.call_args.kwargs["duration_range"] == (25, 30)
+
+
+def test_plan_date_pairs_falls_back_to_sampling(sample_trip_config):
+    from main import plan_date_pairs
+    trip = dict(sample_trip_config, date_strategy="calendar")
+
+    amadeus = MagicMock()
+    amadeus.get_cheapest_dates.side_effect = RuntimeError("no calendar for route")
+
+    pairs = plan_date_pairs(amadeus, MagicMock(), "test-trip", trip, "HYD", "ARN")
+
+    assert len(pairs) == 5
+
+
+def test_plan_date_pairs_adaptive_strategy_reads_history(sample_trip_config):
+    from main import plan_date_pairs
+    trip = dict(sample_trip_config, date_strategy="adaptive", max_pairs=3)
+
+    tracker = MagicMock()
+    tracker.get_pair_history.return_value = {("2026-06-01", "2026-06-28"): [80000, 90000]}
+
+    pairs = plan_date_pairs(MagicMock(), tracker, "test-trip", trip, "HYD", "ARN")
+
+    tracker.get_pair_history.assert_called_once_with("test-trip", "HYD-ARN", "ECONOMY")
+    assert ("2026-06-01", "2026-06-28") in pairs
+    assert len(pairs) == 3
+
+
+def test_plan_date_pairs_adaptive_strategy_falls_back_to_sampling(sample_trip_config):
+    from main import plan_date_pairs
+    trip = dict(sample_trip_config, date_strategy="adaptive")
+
+    tracker = MagicMock()
+    tracker.get_pair_history.side_effect = RuntimeError("missing index")
+
+    pairs = plan_date_pairs(MagicMock(), tracker, "test-trip", trip, "HYD", "ARN")
+
+    assert len(pairs) == 5
+
+
+def test_check_flights_cuts_short_routes_without_offers(sample_trip_config):
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+    sample_trip_config["origins"] = ["HYD", "BLR"]
+
+    mock_firestore = MagicMock()
+
+    def search(**kwargs):
+        if kwargs["origin"] == "BLR":
+            return []
+        return [{"offer_id": "1", "price": 85000, "airlines": ["EK"], "stops": 1,
+                 "cabin_class": kwargs["cabin_class"], "fare_family": "Basic"}]
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.side_effect = search
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [("test-trip", sample_trip_config)]
+    mock_tracker.get_rolling_average.return_value = None
+
+    with patch('main.firestore.Client', return_value=mock_firestore), \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client), \
+         patch('main.SlackNotifier', return_value=MagicMock()), \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        from main import check_flights
+        check_flights(MagicMock())
+
+    origins = [c.kwargs["origin"] for c in mock_amadeus_client.get_flight_offers.call_args_list]
+    # HYD: 5 pairs × 2 cabins; BLR: 1 probe pair × 2 cabins
+    assert origins.count("HYD") == 10
+    assert origins.count("BLR") == 2
+    routes = {c.args[1] for c in mock_tracker.store_prices.call_args_list}
+    assert routes == {"HYD-ARN"}
+    update = mock_tracker.update_trip.call_args.args[1]
+    assert update["next_scan_due"] > update["last_scanned"]
+    assert update["route_stats"]["BLR-ARN"]["empty_scans"] == 1
+
+
+def test_check_flights_leaves_trips_with_stopped_searches_due(sample_trip_config):
+    from resilience import DeadlineExceeded
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+
+    def search(**kwargs):
+        if kwargs["origin"] == "BLR":
+            raise DeadlineExceeded("run deadline")
+        return [{"offer_id": "1", "price": 85000, "airlines": ["EK"], "stops": 1,
+                 "cabin_class": kwargs["cabin_class"], "fare_family": "Basic"}]
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.side_effect = search
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [
+        ("scanned-trip", sample_trip_config),
+        ("stopped-trip", dict(sample_trip_config, origins=["BLR"])),
+    ]
+    mock_tracker.get_rolling_average.return_value = None
+
+    with patch('main.firestore.Client', return_value=MagicMock()), \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client), \
+         patch('main.SlackNotifier', return_value=MagicMock()), \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        from main import check_flights
+        check_flights(MagicMock())
+
+    updated = [c.args[0] for c in mock_tracker.update_trip.call_args_list if "last_scanned" in c.args[1]]
+    assert updated == ["scanned-trip"]
+
+
+def test_slack_posts_outlive_the_amadeus_deadline(sample_trip_config, monkeypatch):
+    import main
+    sample_trip_config["scan_window"] = {"start": "2026-01-01", "end": "2026-12-31"}
+    monkeypatch.setattr(main, "RUN_DEADLINE_SECONDS", 0)
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = [("test-trip", sample_trip_config)]
+
+    with patch('main.firestore.Client', return_value=MagicMock()), \
+         patch('main.AmadeusClient', return_value=MagicMock()), \
+         patch('main.SlackDelivery') as mock_delivery, \
+         patch('main.PriceTracker', return_value=mock_tracker), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        main.check_flights(MagicMock())
+
+    deadline = mock_delivery.call_args.kwargs["resilience"].deadline
+    assert deadline.remaining() > main.SLACK_DEADLINE_SECONDS - 60
+
+
+def test_score_route_stores_offer_stats_only_for_truncated_offers(sample_trip_config):
+    from main import score_route
+    from offers import OfferList, summarize_prices
+    offer = {"offer_id": "1", "price": 800, "cabin_class": "ECONOMY"}
+    truncated_stats = summarize_prices([800, 900, 1000])
+    cabin_offers = {
+        "ECONOMY": OfferList([dict(offer)], {"ECONOMY": truncated_stats}),
+        "PREMIUM_ECONOMY": OfferList([dict(offer, cabin_class="PREMIUM_ECONOMY")],
+                                     {"PREMIUM_ECONOMY": summarize_prices([800])}),
+    }
+    tracker = MagicMock()
+    tracker.get_rolling_average.return_value = None
+
+    score_route("test-trip", sample_trip_config, "HYD-ARN", cabin_offers, tracker)
+
+    offer_stats = [c.kwargs["offer_stats"] for c in tracker.store_prices.call_args_list]
+    assert offer_stats == [{"ECONOMY": truncated_stats}, None]
+
+
+def test_check_flights_with_sqlite_store_never_builds_firestore_client(sample_trip_config, tmp_path, monkeypatch):
+    import main
+    from sqlite_price_tracker import SQLitePriceTracker
+    path = str(tmp_path / "prices.db")
+    monkeypatch.setattr(main, "PRICE_STORE", "sqlite")
+    monkeypatch.setattr(main, "SQLITE_DB_PATH", path)
+    monkeypatch.setattr(main, "_search_cache", None)
+    store = SQLitePriceTracker(path)
+    store.save_trip("test-trip", dict(sample_trip_config, scan_window={"start": "2026-01-01", "end": "2999-12-31"}))
+    store.close()
+
+    mock_amadeus_client = MagicMock()
+    mock_amadeus_client.get_flight_offers.return_value = []
+
+    with patch('main.firestore.Client') as mock_client, \
+         patch('main.AmadeusClient', return_value=mock_amadeus_client) as mock_amadeus, \
+         patch('main.SlackNotifier', return_value=MagicMock()), \
+         patch('main.get_secrets', return_value=["key", "secret", "webhook"]):
+
+        assert main.check_flights(MagicMock()) == "OK"
+
+    mock_client.assert_not_called()
+    assert mock_amadeus_client.get_flight_offers.called
+    assert type(mock_amadeus.call_args.kwargs["quota_ledger"]).__name__ == "SQLiteQuotaLedger"
+
+
+def test_get_secrets_fetches_in_parallel_and_reuses_within_ttl(monkeypatch):
+    import main
+    fetched = []
+    monkeypatch.setattr(main, "get_secret_client", MagicMock())
+    monkeypatch.setattr(main, "get_secret", lambda project, secret_id: fetched.append(secret_id) or secret_id.upper())
+    clock = [1000.0]
+    monkeypatch.setattr(main.time, "monotonic", lambda: clock[0])
+
+    assert main.get_secrets("p", ["a", "b", "c"]) == ["A", "B", "C"]
+    assert main.get_secrets("p", ["c", "a"]) == ["C", "A"]
+    assert sorted(fetched) == ["a", "b", "c"]
+
+    clock[0] += main.SECRET_CACHE_TTL_SECONDS
+    main.get_secrets("p", ["a"])
+    assert len(fetched) == 4
+
+
+def test_check_flights_reuses_firestore_client_across_invocations(capsys):
+    mock_tracker = MagicMock()
+    mock_tracker.get_due_trips.return_value = []
+
+    with patch('main.firestore.Client') as firestore_client, \
+         patch('main.PriceTracker', return_value=mock_tracker):
+        from main import check_flights
+        check_flights(MagicMock())
+        check_flights(MagicMock())
+
+    assert firestore_client.call_count == 1
+    startup = [line for line in capsys.readouterr().out.splitlines() if line.startswith("Startup:")]
+    assert "'cold': True" in startup[0] and "'cold': False" in startup[1]
@@ -0,0 +1,66 @@
+def _itinerary(duration="PT12H30M"):
+    return {
+        "duration": duration,
+        "segments": [
+            {"carrierCode": "EK", "number": "528", "operating": {"carrierCode": "FZ"},
+             "departure": {"iataCode": "HYD", "at": "2026-06-01T14:30:00"},
+             "arrival": {"iataCode": "DXB", "at": "2026-06-01T17:00:00"}},
+            {"carrierCode": "EK", "number": "157",
+             "departure": {"iataCode": "DXB", "at": "2026-06-01T21:00:00"},
+             "arrival": {"iataCode": "ARN", "at": "2026-06-02T03:00:00"}},
+        ],
+    }
+
+
+def _offer(inbound=True):
+    from offers import Offer, parse_leg
+    return Offer(
+        offer_id="1", price=850.0, currency="EUR",
+        departure_date="2026-06-01", return_date="2026-07-01" if inbound else None,
+        cabin_class="ECONOMY", fare_family="BASIC", booking_class="R",
+        baggage="23kg", seats_remaining=3,
+        outbound=parse_leg(_itinerary()),
+        inbound=parse_leg(_itinerary("PT13H")) if inbound else None,
+    )
+
+
+def test_parse_duration():
+    from offers import parse_duration
+    assert parse_duration("PT12H30M") == 750
+    assert parse_duration("PT45M") == 45
+    assert parse_duration("PT2H") == 120
+    assert parse_duration("P1DT2H5M") == 1565
+
+
+def test_parse_leg_interns_codes():
+    import sys
+    from offers import parse_leg
+    leg = parse_leg(_itinerary())
+    assert leg.airlines == ["FZ", "EK"]
+    assert leg.stops == 1
+    assert leg.layover_cities == ["DXB"]
+    assert leg.flight_numbers == ["EK 528", "EK 157"]
+    assert leg.flight_numbers[0] is sys.intern("EK 528")
+
+
+def test_offer_reads_like_legacy_dict():
+    offer = _offer()
+    assert offer["airlines"] == ["FZ", "EK"]
+    assert offer["return_duration_minutes"] == 780
+    assert offer.get("drop_pct") is None
+    assert "drop_pct" not in offer
+
+    one_way = _offer(inbound=False)
+    assert one_way.get("return_airlines") is None
+    assert "return_stops" not in one_way.to_dict()
+
+
+def test_offer_copy_is_independently_annotatable():
+    offer = _offer()
+    copy = offer.copy()
+    copy["drop_pct"] = 12.5
+
+    assert copy.to_dict()["drop_pct"] == 12.5
+    assert "drop_pct" not in offer
+    assert dict(copy) == copy.to_dict()
+    assert list(copy.to_dict())[:5] == ["offer_id", "price", "currency", "departure_date", "return_date"]
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+
+def test_summarize_scan_percentiles():
+    from price_summaries import summarize_scan
+    assert summarize_scan([400, 100, 300, 200, 500]) == {
+        "count": 5, "min_price": 100, "p25_price": 200, "median_price": 300,
+    }
+    assert summarize_scan([250])["p25_price"] == 250
+
+
+def test_scan_summaries_per_pair_plus_rollup():
+    from price_summaries import scan_summaries
+    scanned_at = datetime(2026, 6, 1, tzinfo=timezone.utc)
+    prices = [
+        {"price": 500, "cabin_class": "ECONOMY", "departure_date": "2026-07-01", "return_date": "2026-07-20"},
+        {"price": 700, "cabin_class": "ECONOMY", "departure_date": "2026-07-01", "return_date": "2026-07-20"},
+        {"price": 600, "cabin_class": "ECONOMY", "departure_date": "2026-07-03", "return_date": "2026-07-22"},
+    ]
+
+    summaries = scan_summaries("t", "HYD-ARN", scanned_at, prices)
+
+    by_pair = {(s["departure_date"], s["return_date"]): s for s in summaries}
+    assert by_pair[("2026-07-01", "2026-07-20")]["median_price"] == 600
+    assert by_pair[("", "")]["count"] == 3
+    assert all(s["tier"] == "scan" for s in summaries)
+
+
+def test_downsample_groups_by_weekly_bucket():
+    from price_summaries import downsample
+    row = {"trip_id": "t", "route": "HYD-ARN", "cabin_class": "ECONOMY",
+           "departure_date": "", "return_date": "", "count": 2,
+           "min_price": 500, "p25_price": 520, "median_price": 600}
+    rows = [
+        ("a", {**row, "scanned_at": datetime(2026, 6, 1, tzinfo=timezone.utc)}),  # Monday
+        ("b", {**row, "scanned_at": datetime(2026, 6, 7, tzinfo=timezone.utc), "min_price": 400}),  # Sunday
+        ("c", {**row, "scanned_at": datetime(2026, 6, 8, tzinfo=timezone.utc)}),  # next Monday
+    ]
+
+    groups = downsample(rows, "weekly")
+
+    assert [(summary["scanned_at"].day, sources) for summary, sources in groups] == [(1, ["a", "b"]), (8, ["c"])]
+    assert groups[0][0]["min_price"] == 400
+    assert groups[0][0]["count"] == 4
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+
+def _trip(cabins=1, priority=1, max_pairs=5, **extra):
+    return {"origins": ["HYD"], "destinations": ["ARN"],
+            "cabin_classes": ["ECONOMY", "PREMIUM_ECONOMY", "BUSINESS"][:cabins],
+            "priority": priority, "max_pairs": max_pairs, **extra}
+
+
+def _ledger(used, now=datetime(2026, 6, 21, tzinfo=timezone.utc), limit=2000):
+    from quota import QuotaLedger
+    db = MagicMock()
+    snapshot = MagicMock(exists=True)
+    snapshot.to_dict.return_value = {"total": used}
+    db.collection().document().get.return_value = snapshot
+    return db, QuotaLedger(db, monthly_limit=limit, now=lambda: now)
+
+
+def test_ledger_spreads_remaining_quota_over_days_left():
+    db, ledger = _ledger(used=1000)
+
+    # 1000 calls left, 10 days left in June including today
+    assert ledger.remaining() == 1000
+    assert ledger.run_budget() == 100
+
+
+def test_ledger_counts_calls_and_flushes_once():
+    db, ledger = _ledger(used=10)
+
+    ledger.record("flight_offers_search")
+    ledger.record("flight_offers_search")
+    ledger.record("flight_dates")
+
+    assert ledger.used_this_month() == 13
+    ledger.flush()
+
+    db.collection().document.assert_called_with("2026-06")
+    update = db.collection().document().set.call_args.args[0]
+    assert set(update) == {"total", "updated_at", "endpoints.flight_offers_search", "endpoints.flight_dates"}
+    assert ledger.pending == 0
+    assert ledger.used_this_month() == 13
+
+
+def test_sqlite_ledger_accumulates_calls_per_month(tmp_path):
+    from quota import SQLiteQuotaLedger
+    path = str(tmp_path / "quota.db")
+    june = datetime(2026, 6, 21, tzinfo=timezone.utc)
+
+    ledger = SQLiteQuotaLedger(path, monthly_limit=2000, now=lambda: june)
+    ledger.record("flight_offers_search")
+    ledger.record("flight_dates")
+    ledger.flush()
+    ledger.record("flight_offers_search")
+    ledger.flush()
+
+    assert SQLiteQuotaLedger(path, now=lambda: june).used_this_month() == 3
+    assert SQLiteQuotaLedger(path, now=lambda: datetime(2026, 7, 1, tzinfo=timezone.utc)).used_this_month() == 0
+    # 1997 calls left, 10 days left in June including today
+    assert SQLiteQuotaLedger(path, monthly_limit=2000, now=lambda: june).run_budget() == 199
+
+
+def test_allocate_budget_gives_full_pairs_when_affordable():
+    from quota import allocate_budget
+    trips = [("a", _trip(cabins=2)), ("b", _trip(cabins=1, date_strategy="calendar"))]
+
+    assert allocate_budget(trips, budget=100) == {"a": 5, "b": 5}
+
+
+def test_allocate_budget_shrinks_pairs_by_priority():
+    from quota import allocate_budget
+    trips = [("low", _trip(priority=1)), ("high", _trip(priority=2))]
+
+    # 2 calls for the first pair each, then rounds of 2 (high) + 1 (low)
+    assert allocate_budget(trips, budget=5) == {"low": 2, "high": 3}
+
+
+def test_allocate_budget_skips_lowest_priority_when_exhausted():
+    from quota import allocate_budget
+    trips = [("low", _trip(cabins=2, priority=1)), ("high", _trip(cabins=2, priority=3))]
+
+    assert allocate_budget(trips, budget=3) == {"low": 0, "high": 1}
+
+
+def test_one_way_trips_are_funded_in_full_or_skipped():
+    from quota import allocate_budget, estimate_calls
+    trip = _trip(cabins=1, date_strategy="one_way",
+                 departure_date_range=["2026-06-01", "2026-06-03"],
+                 return_date_range=["2026-06-10", "2026-06-12"],
+                 min_trip_days=7, max_trip_days=11)
+
+    assert estimate_calls(trip, 5) == 6
+    assert allocate_budget([("a", trip)], budget=6) == {"a": 1}
+    assert allocate_budget([("a", trip)], budget=5) == {"a": 0}
@@ -0,0 +1,44 @@
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_allows_burst_then_spaces_calls():
+    from rate_limiter import TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(0.1)
+    assert waits[3] == pytest.approx(0.1)
+
+
+def test_token_bucket_refills_over_time():
+    from rate_limiter import TokenBucket
+    clock = FakeClock()
+    bucket = TokenBucket(rate=5, capacity=1, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    clock.now += 1.0
+
+    assert bucket.acquire() == 0
+    assert clock.sleeps == []
+
+
+def test_token_bucket_rejects_invalid_rate():
+    from rate_limiter import TokenBucket
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from amadeus_transport import AmadeusHTTPError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _flaky(*errors, result="ok"):
+    """fn that raises each error in turn, then returns result."""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+
+def test_retries_transient_errors_honoring_retry_after():
+    from resilience import ResilientCaller
+    clock = FakeClock()
+    caller = ResilientCaller(clock=clock, sleep=clock.sleep)
+    fn = _flaky(AmadeusHTTPError(429, {"retry-after": "3"}), AmadeusHTTPError(503, {}))
+
+    assert caller.call("flight_offers_search", fn) == "ok"
+    assert len(fn.calls) == 3
+    # Retry-After wait, then a jittered backoff of at most base_delay * 2
+    assert 3 <= clock.now <= 4
+    assert caller.stats["retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    from resilience import ResilientCaller
+    clock = FakeClock()
+    caller = ResilientCaller(clock=clock, sleep=clock.sleep)
+    fn = _flaky(AmadeusHTTPError(400, {}))
+
+    with pytest.raises(AmadeusHTTPError):
+        caller.call("flight_offers_search", fn)
+    assert len(fn.calls) == 1
+
+
+def test_breaker_opens_then_allows_trial_after_cooldown():
+    from resilience import CircuitOpenError, ResilientCaller
+    clock = FakeClock()
+    caller = ResilientCaller(max_attempts=1, failure_threshold=2, cooldown=30, clock=clock, sleep=clock.sleep)
+    failing = _flaky(*[AmadeusHTTPError(500, {})] * 2)
+
+    for _ in range(2):
+        with pytest.raises(AmadeusHTTPError):
+            caller.call("flight_offers_search", failing)
+    with pytest.raises(CircuitOpenError):
+        caller.call("flight_offers_search", failing)
+    assert caller.stats["breakers"] == {"flight_offers_search": "open"}
+    # Other endpoints have their own breaker
+    assert caller.call("flight_dates", lambda: "dates") == "dates"
+
+    clock.now += 30
+    assert caller.call("flight_offers_search", failing) == "ok"
+    assert caller.stats["breakers"]["flight_offers_search"] == "closed"
+    assert caller.stats["breaker_opens"] == 1
+    assert caller.stats["short_circuits"] == 1
+
+
+def test_deadline_stops_retries_that_would_overrun():
+    from resilience import Deadline, DeadlineExceeded, ResilientCaller
+    clock = FakeClock()
+    caller = ResilientCaller(deadline=Deadline(10, clock=clock), clock=clock, sleep=clock.sleep)
+    fn = _flaky(AmadeusHTTPError(429, {"Retry-After": "60"}))
+
+    with pytest.raises(AmadeusHTTPError):
+        caller.call("flight_offers_search", fn)
+    assert clock.now == 0
+
+    clock.now = 10
+    with pytest.raises(DeadlineExceeded):
+        caller.call("flight_offers_search", lambda: "late")
+    assert caller.stats["deadline_stops"] == 2
+
+
+def test_slow_call_is_hedged_and_fastest_wins():
+    from resilience import ResilientCaller
+    caller = ResilientCaller(hedge_after=0.05)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return "slow"
+        return "fast"
+
+    try:
+        assert caller.call("flight_offers_search", fn) == "fast"
+    finally:
+        release.set()
+        caller.close()
+    assert caller.stats["hedges"] == 1
+    assert caller.stats["hedge_wins"] == 1
+
+
+def test_retry_after_http_date():
+    from resilience import retry_after_seconds
+    now = datetime(2026, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert retry_after_seconds({"Retry-After": "Mon, 01 Jun 2026 12:00:05 GMT"}, now) == 5
+    assert retry_after_seconds({}, now) is None
+
+
+def test_httpx_transport_errors_are_retryable():
+    import httpx
+    from resilience import is_retryable
+
+    assert is_retryable(httpx.ConnectError("connection refused"))
@@ -0,0 +1,38 @@
+def test_expand_routes_covers_every_origin_destination_pair():
+    from route_planner import expand_routes
+    trip = {"origins": ["LAX", "SFO"], "destinations": ["NRT", "HND"]}
+
+    assert expand_routes(trip) == [("LAX", "NRT"), ("LAX", "HND"), ("SFO", "NRT"), ("SFO", "HND")]
+
+
+def test_prioritize_routes_orders_by_history_and_caps():
+    from route_planner import prioritize_routes
+    trip = {
+        "origins": ["LAX", "SFO"],
+        "destinations": ["NRT", "HND"],
+        "max_routes": 3,
+        "route_stats": {
+            "LAX-NRT": {"empty_scans": 3, "best_price": None},
+            "SFO-NRT": {"empty_scans": 0, "best_price": 900},
+            "SFO-HND": {"empty_scans": 0, "best_price": 700},
+        },
+    }
+
+    # Known cheap routes first, unseen next, repeatedly empty routes last (and capped off)
+    assert prioritize_routes(trip) == [("SFO", "HND"), ("SFO", "NRT"), ("LAX", "HND")]
+
+
+def test_update_route_stats_tracks_best_price_and_empty_scans():
+    from route_planner import update_route_stats
+    trip = {"route_stats": {"LAX-NRT": {"empty_scans": 1, "best_price": None}}}
+
+    stats = update_route_stats(trip, {
+        "LAX-NRT": {"ECONOMY": []},
+        "SFO-NRT": {"ECONOMY": [{"price": 900}], "BUSINESS": [{"price": 3000}]},
+    })
+
+    assert stats == {
+        "LAX-NRT": {"empty_scans": 2, "best_price": None},
+        "SFO-NRT": {"empty_scans": 0, "best_price": 900},
+    }
+    assert trip["route_stats"]["LAX-NRT"]["empty_scans"] == 1
@@ -0,0 +1,111 @@
+from unittest.mock import MagicMock, patch
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_cache_key_normalizes_params():
+    from search_cache import make_cache_key
+    a = make_cache_key("flight_offers_search", {"originLocationCode": "hyd", "max": 20, "x": None})
+    b = make_cache_key("flight_offers_search", {"max": 20, "originLocationCode": "HYD "})
+    c = make_cache_key("flight_dates", {"max": 20, "originLocationCode": "HYD"})
+
+    assert a == b
+    assert a != c
+
+
+def test_search_cache_expires_after_ttl():
+    from search_cache import SearchCache
+    clock = FakeClock()
+    cache = SearchCache(ttl_seconds=60, clock=clock)
+
+    cache.set("k", [{"id": "1"}])
+    assert cache.get("k") == [{"id": "1"}]
+
+    clock.now += 61
+    assert cache.get("k") is None
+    assert cache.stats == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_failed_cache_write_still_returns_fetched_value():
+    from search_cache import SearchCache
+    backend = MagicMock()
+    backend.get.return_value = None
+    backend.set.side_effect = RuntimeError("document too large")
+    cache = SearchCache(backend=backend)
+
+    assert cache.get_or_fetch("k", lambda: [{"id": "1"}]) == [{"id": "1"}]
+    assert backend.set.called
+
+
+def test_memory_backend_evicts_least_recently_used():
+    from search_cache import MemoryCacheBackend
+    backend = MemoryCacheBackend(max_entries=2)
+
+    backend.set("a", 0, 1)
+    backend.set("b", 0, 2)
+    backend.get("a")
+    backend.set("c", 0, 3)
+
+    assert backend.get("b") is None
+    assert backend.get("a") == (0, 1)
+    assert backend.get("c") == (0, 3)
+
+
+def test_disk_backend_round_trip_and_eviction(tmp_path):
+    import os
+    from search_cache import DiskCacheBackend
+    backend = DiskCacheBackend(str(tmp_path), max_entries=2)
+
+    backend.set("a", 1.0, [{"id": "1"}])
+    os.utime(tmp_path / "a.json", (1, 1))
+    backend.set("b", 2.0, [])
+    backend.set("c", 3.0, [{"id": "3"}])
+
+    assert backend.get("a") is None
+    assert backend.get("c") == (3.0, [{"id": "3"}])
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_firestore_backend_stores_json_payload():
+    from search_cache import FirestoreCacheBackend
+    db = MagicMock()
+    backend = FirestoreCacheBackend(db, ttl_seconds=60)
+
+    backend.set("k", 1000.0, [{"id": "1"}])
+    written = db.collection().document().set.call_args.args[0]
+    assert written["payload"] == '[{"id": "1"}]'
+
+    snapshot = MagicMock(exists=True)
+    snapshot.to_dict.return_value = written
+    db.collection().document().get.return_value = snapshot
+    assert backend.get("k") == (1000.0, [{"id": "1"}])
+
+
+def test_cached_search_goes_through_parse_pipeline():
+    from tests.test_amadeus_client import _make_offer
+    from search_cache import SearchCache
+
+    mock_amadeus = MagicMock()
+    mock_amadeus.shopping.flight_offers_search.get.return_value.data = [_make_offer()]
+
+    with patch('amadeus_client.Client', return_value=mock_amadeus):
+        from amadeus_client import AmadeusClient
+        client = AmadeusClient("key", "secret", cache=SearchCache())
+        kwargs = dict(
+            origin="HYD", destination="ARN",
+            departure_date="2026-06-01", return_date="2026-07-01",
+            cabin_class="PREMIUM_ECONOMY", airlines=[], max_stops=2
+        )
+        first = client.get_flight_offers(**kwargs)
+        second = client.get_flight_offers(**kwargs)
+
+    assert first == second
+    assert second[0]["flight_numbers"] == ["EK 528", "EK 157"]
+    assert mock_amadeus.shopping.flight_offers_search.get.call_count == 1
+    assert client.cache.stats["hits"] == 1
@@ -0,0 +1,290 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+
+def _offer(price, airlines=("EK",), stops=1, **extra):
+    return {"price": price, "airlines": list(airlines), "stops": stops, **extra}
+
+
+def test_planner_merges_results_per_cabin(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    def fake_search(**kwargs):
+        return [_offer(1000, cabin_class=kwargs["cabin_class"],
+                       departure_date=kwargs["departure_date"])]
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.side_effect = fake_search
+    date_pairs = [("2026-06-01", "2026-07-01"), ("2026-06-03", "2026-07-02")]
+
+    planner = SearchPlanner(amadeus, max_workers=4)
+    planner.add_trip("test-trip", sample_trip_config, "HYD", "ARN", date_pairs)
+    planner.execute()
+    results = planner.results_for("test-trip", "HYD", "ARN")
+
+    assert list(results) == ["ECONOMY", "PREMIUM_ECONOMY"]
+    assert [o["departure_date"] for o in results["ECONOMY"]] == ["2026-06-01", "2026-06-03"]
+    assert all(o["cabin_class"] == "PREMIUM_ECONOMY" for o in results["PREMIUM_ECONOMY"])
+    assert amadeus.get_flight_offers.call_count == 4
+
+
+def test_planner_isolates_failed_searches(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    def flaky_search(**kwargs):
+        if kwargs["departure_date"] == "2026-06-03":
+            raise RuntimeError("boom")
+        return [_offer(1000)]
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.side_effect = flaky_search
+    date_pairs = [("2026-06-01", "2026-07-01"), ("2026-06-03", "2026-07-02")]
+
+    planner = SearchPlanner(amadeus)
+    planner.add_trip("test-trip", sample_trip_config, "HYD", "ARN", date_pairs)
+    planner.execute()
+    results = planner.results_for("test-trip", "HYD", "ARN")
+
+    assert len(results["ECONOMY"]) == 1
+    assert len(results["PREMIUM_ECONOMY"]) == 1
+
+
+def test_planner_counts_searches_stopped_by_deadline_or_breaker(sample_trip_config):
+    from resilience import CircuitOpenError, DeadlineExceeded
+    from search_planner import SearchPlanner
+
+    def search(**kwargs):
+        if kwargs["departure_date"] == "2026-06-03":
+            raise DeadlineExceeded("run deadline")
+        if kwargs["departure_date"] == "2026-06-05":
+            raise CircuitOpenError("flight_offers_search")
+        return [_offer(1000)]
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.side_effect = search
+    date_pairs = [("2026-06-01", "2026-07-01"), ("2026-06-03", "2026-07-02"), ("2026-06-05", "2026-07-03")]
+
+    planner = SearchPlanner(amadeus)
+    planner.add_trip("test-trip", sample_trip_config, "HYD", "ARN", date_pairs)
+    planner.execute()
+
+    assert planner.search_counts("test-trip") == (6, 4)
+    assert len(planner.results_for("test-trip", "HYD", "ARN")["ECONOMY"]) == 1
+
+    # Stopped searches are retried by a later execute()
+    amadeus.get_flight_offers.side_effect = lambda **kwargs: [_offer(900)]
+    planner.execute()
+    assert planner.search_counts("test-trip") == (6, 0)
+
+
+def test_planner_respects_max_in_flight(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def slow_search(**kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return []
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.side_effect = slow_search
+    date_pairs = [(f"2026-06-0{d}", "2026-07-01") for d in range(1, 6)]
+
+    planner = SearchPlanner(amadeus, max_workers=2)
+    planner.add_trip("test-trip", sample_trip_config, "HYD", "ARN", date_pairs)
+    planner.execute()
+
+    assert peak == 2
+    assert amadeus.get_flight_offers.call_count == 10
+
+
+def test_planner_coalesces_identical_searches_across_trips(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.return_value = [
+        _offer(900, airlines=["AI"]),
+        _offer(1000, airlines=["EK"]),
+        _offer(1100, airlines=["EK"], stops=2),
+    ]
+
+    strict_trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], airlines=["EK"], max_stops=1)
+    open_trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], airlines=[], max_stops=2)
+    pairs = [("2026-06-01", "2026-07-01")]
+
+    planner = SearchPlanner(amadeus)
+    planner.add_trip("strict", strict_trip, "HYD", "ARN", pairs)
+    planner.add_trip("open", open_trip, "HYD", "ARN", pairs + [("2026-06-03", "2026-07-02")])
+    planner.execute()
+
+    assert planner.requested_count == 3
+    assert planner.unique_count == 2
+    assert amadeus.get_flight_offers.call_count == 2
+    # Shared search is widened to cover both trips
+    shared_call = amadeus.get_flight_offers.call_args_list[0].kwargs
+    assert shared_call["airlines"] == []
+    assert shared_call["max_stops"] == 2
+
+    assert [o["price"] for o in planner.results_for("strict", "HYD", "ARN")["ECONOMY"]] == [1000]
+    assert [o["price"] for o in planner.results_for("open", "HYD", "ARN")["ECONOMY"]] == [900, 1000, 1100, 900, 1000, 1100]
+
+
+def test_planner_pushes_widest_price_cap_and_filters_locally(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.return_value = [_offer(900), _offer(1100), _offer(1400)]
+
+    cheap_trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], max_price=1000)
+    roomy_trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], max_price=1200)
+    pairs = [("2026-06-01", "2026-07-01")]
+
+    planner = SearchPlanner(amadeus, max_results=50, min_results=5)
+    planner.add_trip("cheap", cheap_trip, "HYD", "ARN", pairs)
+    planner.add_trip("roomy", roomy_trip, "HYD", "ARN", pairs)
+    planner.execute()
+
+    call = amadeus.get_flight_offers.call_args.kwargs
+    assert call["max_price"] == 1200
+    assert call["max_results"] == 50
+    assert call["min_results"] == 5
+    assert [o["price"] for o in planner.results_for("cheap", "HYD", "ARN")["ECONOMY"]] == [900]
+    assert [o["price"] for o in planner.results_for("roomy", "HYD", "ARN")["ECONOMY"]] == [900, 1100]
+
+
+def test_planner_top_k_only_for_searches_with_identical_filters(sample_trip_config):
+    from offers import OfferList, summarize_prices
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.return_value = OfferList(
+        [_offer(900)], {"ECONOMY": summarize_prices([900, 1000, 1100])}
+    )
+
+    trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], airlines=[])
+    strict_trip = dict(trip, max_stops=0)
+
+    planner = SearchPlanner(amadeus, parse_top_k=5)
+    planner.add_trip("a", trip, "HYD", "ARN", [("2026-06-01", "2026-07-01")])
+    planner.add_trip("b", trip, "HYD", "ARN", [("2026-06-01", "2026-07-01")])
+    planner.add_trip("c", strict_trip, "HYD", "ARN", [("2026-06-03", "2026-07-03")])
+    planner.add_trip("d", trip, "HYD", "ARN", [("2026-06-03", "2026-07-03")])
+    planner.execute()
+
+    top_k = {
+        call.kwargs["departure_date"]: call.kwargs["top_k"]
+        for call in amadeus.get_flight_offers.call_args_list
+    }
+    assert top_k == {"2026-06-01": 5, "2026-06-03": None}
+
+    results = planner.results_for("a", "HYD", "ARN")["ECONOMY"]
+    assert isinstance(results, OfferList)
+    # Stats for the top-k search cover the unparsed offers too
+    assert results.stats["count"] == 3
+
+
+def test_planner_truncated_stats_only_for_trips_without_extra_filters(sample_trip_config):
+    from offers import OfferList, summarize_prices
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.return_value = OfferList(
+        [_offer(900, airlines=("EK",)), _offer(950, airlines=("QR",))],
+        {"ECONOMY": summarize_prices([900, 950, 1000, 1100])}
+    )
+    pairs = [("2026-06-01", "2026-07-01")]
+    trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], airlines=[])
+
+    planner = SearchPlanner(amadeus, parse_top_k=2)
+    planner.add_trip("open", trip, "HYD", "ARN", pairs)
+    planner.add_trip("ek-only", dict(trip, airlines=["EK"]), "HYD", "ARN", pairs[:1] + [("2026-06-03", "2026-07-03")])
+    planner.add_trip("capped", dict(trip, max_price=920), "HYD", "ARN", [("2026-06-05", "2026-07-05")])
+    planner.execute()
+
+    assert planner.results_for("open", "HYD", "ARN")["ECONOMY"].stats["count"] == 4
+    # Stats never include offers the trip's own filters would drop
+    assert planner.results_for("ek-only", "HYD", "ARN")["ECONOMY"].stats["count"] == 2
+    capped = planner.results_for("capped", "HYD", "ARN")["ECONOMY"].stats
+    assert (capped["count"], capped["max_price"]) == (1, 900)
+
+
+def test_planner_results_are_independent_copies(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.return_value = [_offer(1000)]
+    trip = dict(sample_trip_config, cabin_classes=["ECONOMY"])
+    pairs = [("2026-06-01", "2026-07-01")]
+
+    planner = SearchPlanner(amadeus)
+    planner.add_trip("a", trip, "HYD", "ARN", pairs)
+    planner.add_trip("b", trip, "HYD", "ARN", pairs)
+    planner.execute()
+
+    planner.results_for("a", "HYD", "ARN")["ECONOMY"][0]["drop_pct"] = 15
+
+    assert "drop_pct" not in planner.results_for("b", "HYD", "ARN")["ECONOMY"][0]
+
+
+def test_planner_multi_cabin_mode_makes_one_call_per_date_pair(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers_by_cabin.return_value = {
+        "ECONOMY": [_offer(500)],
+        "PREMIUM_ECONOMY": [_offer(900)],
+    }
+    date_pairs = [("2026-06-01", "2026-07-01"), ("2026-06-03", "2026-07-02")]
+
+    planner = SearchPlanner(amadeus, multi_cabin=True, min_offers_per_cabin=2)
+    planner.add_trip("test-trip", sample_trip_config, "HYD", "ARN", date_pairs)
+    planner.execute()
+    results = planner.results_for("test-trip", "HYD", "ARN")
+
+    assert amadeus.get_flight_offers_by_cabin.call_count == 2
+    assert not amadeus.get_flight_offers.called
+    call = amadeus.get_flight_offers_by_cabin.call_args.kwargs
+    assert call["cabin_classes"] == ["ECONOMY", "PREMIUM_ECONOMY"]
+    assert call["min_offers_per_cabin"] == 2
+    assert [o["price"] for o in results["ECONOMY"]] == [500, 500]
+    assert [o["price"] for o in results["PREMIUM_ECONOMY"]] == [900, 900]
+
+
+def test_planner_one_way_trip_composes_filtered_legs(sample_trip_config):
+    from search_planner import SearchPlanner
+
+    leg_fields = {"duration_minutes": 600, "layover_cities": ["DXB"], "flight_numbers": ["EK 1"],
+                  "departure_time": "T10:00", "arrival_time": "T20:00"}
+
+    def search(**kwargs):
+        assert kwargs["return_date"] is None
+        price = 100 if kwargs["origin"] == "HYD" else 200
+        return [
+            _offer(price, airlines=["EK"], offer_id=f"{kwargs['origin']}-{kwargs['departure_date']}",
+                   departure_date=kwargs["departure_date"], **leg_fields),
+            _offer(1, airlines=["AI"], offer_id="blocked",
+                   departure_date=kwargs["departure_date"], **leg_fields),
+        ]
+
+    amadeus = MagicMock()
+    amadeus.get_flight_offers.side_effect = search
+    trip = dict(sample_trip_config, cabin_classes=["ECONOMY"], min_trip_days=5, max_trip_days=6)
+
+    planner = SearchPlanner(amadeus, one_way_top_k=5)
+    planner.add_one_way_trip("test-trip", trip, "HYD", "ARN", ["2026-06-01", "2026-06-02"], ["2026-06-07"])
+    planner.execute()
+    results = planner.results_for("test-trip", "HYD", "ARN")
+
+    assert amadeus.get_flight_offers.call_count == 3
+    offers = results["ECONOMY"]
+    assert [o["offer_id"] for o in offers] == ["HYD-2026-06-01+ARN-2026-06-07", "HYD-2026-06-02+ARN-2026-06-07"]
+    assert all(o["price"] == 300 for o in offers)
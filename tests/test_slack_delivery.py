@@ -0,0 +1,108 @@
+import threading
+from unittest.mock import MagicMock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _response(status_code, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def _delivery(session, **kwargs):
+    from resilience import ResilientCaller
+    from slack_delivery import SlackDelivery
+    clock = FakeClock()
+    resilience = ResilientCaller(clock=clock, sleep=clock.sleep)
+    return SlackDelivery(session=session, resilience=resilience, **kwargs), clock
+
+
+def test_batch_messages_respects_size_limit():
+    from slack_delivery import batch_messages
+
+    assert batch_messages(["aaaa", "bbbb", "cc", "d" * 20, "e"], max_chars=10) == [[0, 1], [2], [3], [4]]
+
+
+def test_retries_rate_limited_post_honoring_retry_after():
+    session = MagicMock()
+    session.post.side_effect = [_response(429, {"Retry-After": "2"}), _response(200)]
+    delivery, clock = _delivery(session)
+
+    assert delivery.enqueue("https://hooks.slack.com/a", "hello").result(timeout=5) is True
+    assert session.post.call_count == 2
+    assert clock.now == 2
+    assert delivery.flush() == {"messages": 1, "posts": 1, "delivered": 1, "failed": 0, "digests": 0}
+    delivery.close()
+
+
+def test_messages_queued_during_a_post_are_combined_per_webhook():
+    started, release = threading.Event(), threading.Event()
+    posted = []
+
+    def post(url, json, timeout):
+        posted.append((url, json["text"]))
+        started.set()
+        release.wait(5)
+        return _response(200)
+
+    session = MagicMock()
+    session.post.side_effect = post
+    delivery, _ = _delivery(session, rate=1000)
+
+    first = delivery.enqueue("https://hooks.slack.com/a", "trip 1")
+    started.wait(5)
+    delivery.enqueue("https://hooks.slack.com/a", "trip 2")
+    delivery.enqueue("https://hooks.slack.com/a", "trip 3")
+    release.set()
+    stats = delivery.flush()
+
+    assert first.result() is True
+    assert posted == [("https://hooks.slack.com/a", "trip 1"), ("https://hooks.slack.com/a", "trip 2\ntrip 3")]
+    assert stats == {"messages": 3, "posts": 2, "delivered": 3, "failed": 0, "digests": 0}
+    delivery.close()
+
+
+def test_invalid_webhook_fails_without_retry(capsys):
+    session = MagicMock()
+    session.post.return_value = _response(404)
+    delivery, _ = _delivery(session)
+
+    assert delivery.enqueue("https://hooks.slack.com/secret-path", "hello").result(timeout=5) is False
+    assert session.post.call_count == 1
+    # The webhook URL is a secret
+    assert "secret-path" not in capsys.readouterr().out
+    delivery.close()
+
+
+def test_digest_messages_post_once_per_webhook_on_flush():
+    session = MagicMock()
+    session.post.return_value = _response(200)
+    delivery, _ = _delivery(session)
+
+    futures = [
+        delivery.enqueue("https://hooks.slack.com/a", "trip 1", digest=True),
+        delivery.enqueue("https://hooks.slack.com/b", "trip 2", digest=True),
+        delivery.enqueue("https://hooks.slack.com/a", "trip 3", digest=True),
+    ]
+    assert not session.post.called
+    stats = delivery.flush()
+
+    assert all(future.result() for future in futures)
+    posts = {call.args[0]: call.kwargs["json"]["text"] for call in session.post.call_args_list}
+    assert posts == {
+        "https://hooks.slack.com/a": "📬 *Fare digest: 2 trips*\ntrip 1\ntrip 3",
+        "https://hooks.slack.com/b": "📬 *Fare digest: 1 trip*\ntrip 2",
+    }
+    assert stats["digests"] == 2
+    delivery.close()
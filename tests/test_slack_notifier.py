@@ -150,3 +150,29 @@ def test_format_message_missing_optional_fields():
     assert "↩" not in message
     assert "🧳" not in message
     assert "[" not in message  # No seats bracket
+
+
+def test_results_fingerprint_tracks_shown_offers_not_drops():
+    from slack_notifier import results_fingerprint
+
+    def results(**overrides):
+        return {"HYD-ARN": {"ECONOMY": [_make_offer(**overrides)] + [_make_offer(price=99000 + i) for i in range(5)]}}
+
+    base = results_fingerprint(results())
+
+    assert results_fingerprint(results(drop_pct=15)) == base
+    assert results_fingerprint(results(price=84000)) != base
+    assert results_fingerprint(results(flight_numbers=["EK 526", "EK 157"])) != base
+    # The sixth offer isn't shown, so it doesn't count
+    changed_tail = results()
+    changed_tail["HYD-ARN"]["ECONOMY"][-1]["price"] = 1
+    assert results_fingerprint(changed_tail) == base
+
+
+def test_notifiers_without_delivery_share_one():
+    from slack_notifier import SlackNotifier, default_delivery
+
+    first = SlackNotifier("https://hooks.slack.com/a")
+    second = SlackNotifier("https://hooks.slack.com/b")
+
+    assert first.delivery is second.delivery is default_delivery()
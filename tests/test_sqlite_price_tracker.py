@@ -0,0 +1,114 @@
+# tests/test_sqlite_price_tracker.py
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def _price(price, departure_date="2026-06-01", return_date="2026-07-01", cabin_class="ECONOMY"):
+    return {"offer_id": str(price), "price": price, "cabin_class": cabin_class, "airlines": ["EK"],
+            "departure_date": departure_date, "return_date": return_date}
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    from sqlite_price_tracker import SQLitePriceTracker
+    tracker = SQLitePriceTracker(str(tmp_path / "prices.db"))
+    yield tracker
+    tracker.close()
+
+
+def test_store_prices_updates_rolling_average_and_pair_history(tracker):
+    report = tracker.store_prices("t", "HYD-ARN", [_price(800), _price(900), _price(1000, "2026-06-03")])
+    tracker.store_prices("t", "HYD-ARN", [_price(700)])
+
+    # Two date pair summaries and a rollup, plus three offer rows
+    assert report == {"written": 6, "failed": 0, "errors": []}
+    # Mean of the two scan medians: 900 and 700
+    assert tracker.get_rolling_average("t", "HYD-ARN", "ECONOMY") == 800
+    assert tracker.get_rolling_average("t", "HYD-ARN", "BUSINESS") is None
+    assert tracker.get_pair_history("t", "HYD-ARN", "ECONOMY") == {
+        ("2026-06-01", "2026-07-01"): [700, 800],
+        ("2026-06-03", "2026-07-01"): [1000],
+    }
+
+
+def test_database_uses_wal_and_indexed_reads(tracker):
+    assert tracker._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(row["detail"] for row in tracker._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT min_price FROM scan_summaries WHERE trip_id = 't' AND route = 'HYD-ARN'"
+        " AND cabin_class = 'ECONOMY' ORDER BY scanned_at DESC LIMIT 10"
+    ))
+    assert "scan_summaries_scan" in plan
+
+
+def test_rebuild_price_stats_from_offer_rows(tracker):
+    tracker.store_prices("t", "HYD-ARN", [_price(800), _price(1000)])
+    with tracker._conn:
+        tracker._conn.execute("DELETE FROM price_stats")
+        tracker._conn.execute("DELETE FROM scan_summaries")
+
+    assert tracker.rebuild_price_stats("t") == 1
+    assert tracker.get_rolling_average("t", "HYD-ARN", "ECONOMY") == 900
+
+
+def test_compact_history_downsamples_and_drops_old_rows(tracker):
+    now = datetime.now(timezone.utc)
+    tracker.store_prices("t", "HYD-ARN", [_price(800)])
+    old = (now - timedelta(days=60)).isoformat(timespec="microseconds")
+    with tracker._conn:
+        tracker._conn.execute("UPDATE price_history SET scanned_at = ?", (old,))
+        tracker._conn.execute("UPDATE scan_summaries SET scanned_at = ?", (old,))
+
+    report = tracker.compact_history(raw_days=30, daily_after_days=30, weekly_after_days=180, now=now)
+
+    assert report == {"raw_deleted": 1, "offer_stats_deleted": 0, "daily_written": 2,
+                      "weekly_written": 0, "summaries_deleted": 2}
+    tiers = [row["tier"] for row in tracker._conn.execute("SELECT tier FROM scan_summaries")]
+    assert tiers == ["daily", "daily"]
+    assert tracker.get_pair_history("t", "HYD-ARN", "ECONOMY") == {("2026-06-01", "2026-07-01"): [800]}
+
+
+def test_offer_stats_are_written_with_the_scan_and_compacted(tracker):
+    stats = {"count": 3, "min_price": 800, "max_price": 1000, "total_price": 2700}
+    report = tracker.store_prices("t", "HYD-ARN", [_price(800)], offer_stats={"ECONOMY": stats})
+
+    # Pair summary, rollup, offer row and offer_stats row
+    assert report == {"written": 4, "failed": 0, "errors": []}
+    row = tracker._conn.execute("SELECT count, min_price, max_price, avg_price FROM offer_stats").fetchone()
+    assert tuple(row) == (3, 800, 1000, 900)
+
+    now = datetime.now(timezone.utc)
+    report = tracker.compact_history(raw_days=30, now=now + timedelta(days=31))
+    assert report["offer_stats_deleted"] == 1
+    assert tracker._conn.execute("SELECT COUNT(*) FROM offer_stats").fetchone()[0] == 0
+
+
+def test_due_trips_query_uses_next_scan_due(tracker, sample_trip_config):
+    trip = dict(sample_trip_config, scan_window={"start": "2026-01-01", "end": "2026-12-31"})
+    tracker.save_trip("due-trip", dict(trip, origins=["hyd "]))
+    tracker.save_trip("paused-trip", dict(trip, active=False))
+    tracker.save_trip("scanned-trip", dict(trip, last_scanned="2026-05-01T08:00:00+00:00", scan_frequency_days=7))
+    now = datetime(2026, 5, 3, 8, tzinfo=timezone.utc)
+
+    due = tracker.get_due_trips(now)
+
+    assert [trip_id for trip_id, _ in due] == ["due-trip"]
+    assert due[0][1]["origins"] == ["HYD"]
+    assert due[0][1]["next_scan_due"] == "2026-01-01T00:00:00+00:00"
+    assert [trip_id for trip_id, _ in tracker.get_due_trips(now + timedelta(days=5))] == ["due-trip", "scanned-trip"]
+
+    tracker.update_trip("due-trip", {"next_scan_due": datetime(2026, 5, 4, tzinfo=timezone.utc)})
+    assert [trip_id for trip_id, _ in tracker.get_due_trips(now)] == []
+    with pytest.raises(KeyError):
+        tracker.update_trip("missing-trip", {"active": False})
+
+
+def test_update_trip_keeps_stored_next_scan_due(tracker, sample_trip_config):
+    trip = dict(sample_trip_config, scan_window={"start": "2026-01-01", "end": "2026-12-31"})
+    tracker.save_trip("t", trip)
+
+    tracker.update_trip("t", {"x": 1})
+
+    due = tracker.get_due_trips(datetime(2026, 5, 3, tzinfo=timezone.utc))
+    assert [(trip_id, config["x"]) for trip_id, config in due] == [("t", 1)]
+    assert due[0][1]["next_scan_due"] == "2026-01-01T00:00:00+00:00"
@@ -0,0 +1,128 @@
+# tests/test_tracing.py
+import json
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _logged(capsys) -> list[dict]:
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_spans_are_logged_and_aggregated(capsys):
+    from tracing import Tracer
+    clock = FakeClock()
+    tracer = Tracer(run_id="run-1", clock=clock)
+
+    with tracer.span("amadeus.flight_offers_search", cached=False) as span:
+        clock.now += 0.25
+        span["attempts"] = 2
+    with pytest.raises(ValueError):
+        with tracer.span("amadeus.flight_offers_search"):
+            clock.now += 0.5
+            raise ValueError("bad")
+    tracer.count("api_calls", 3)
+    summary = tracer.emit_summary()
+
+    spans = _logged(capsys)
+    assert spans[0] == {
+        "severity": "INFO", "message": "span amadeus.flight_offers_search", "span": "amadeus.flight_offers_search",
+        "duration_ms": 250.0, "cached": False, "attempts": 2, "run_id": "run-1",
+    }
+    assert spans[1]["error"] == "ValueError"
+    assert spans[2]["message"] == "run summary"
+    assert summary["counters"] == {"api_calls": 3}
+    assert summary["spans"]["amadeus.flight_offers_search"] == {
+        "count": 2, "total_ms": 750.0, "max_ms": 500.0, "errors": 1
+    }
+    assert tracer.durations() == {"amadeus.flight_offers_search_ms": 750}
+
+
+def test_amadeus_fetch_span_records_cache_hits_and_attempts(capsys):
+    from unittest.mock import MagicMock
+    from amadeus_client import AmadeusClient
+    from search_cache import SearchCache
+    from tracing import Tracer
+    tracer = Tracer()
+    transport = MagicMock()
+    transport.get.return_value.data = [{"id": "1"}]
+    client = AmadeusClient("key", "secret", cache=SearchCache(), transport=transport, tracer=tracer)
+
+    client._fetch("flight_offers_search", originLocationCode="HYD")
+    client._fetch("flight_offers_search", originLocationCode="HYD")
+
+    spans = _logged(capsys)
+    assert [(span["cached"], span.get("attempts")) for span in spans] == [(False, 1), (True, None)]
+    assert tracer.summary()["counters"] == {"api_calls": 1}
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 12), reason="one profiler per interpreter on 3.12+")
+def test_run_profiler_includes_worker_threads():
+    from tracing import RunProfiler
+
+    def worker_busy_loop():
+        return sum(range(10000))
+
+    with RunProfiler() as profiler:
+        thread = threading.Thread(target=worker_busy_loop)
+        thread.start()
+        thread.join()
+
+    assert "worker_busy_loop" in profiler.report()
+
+
+PROFILED_POOL = """
+from concurrent.futures import ThreadPoolExecutor
+from tracing import RunProfiler
+
+def main_thread_work(n):
+    return sum(range(n))
+
+with RunProfiler() as profiler:
+    pool = ThreadPoolExecutor(max_workers=3)
+    futures = [pool.submit(sum, range(10000)) for _ in range(6)]
+    results = [future.result(timeout=10) for future in futures]
+    pool.shutdown(wait=False)
+    main_thread_work(10000)
+assert "main_thread_work" in profiler.report(), profiler.report()
+print(len(results))
+"""
+
+
+def _profile_pool(python: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [python, "-c", PROFILED_POOL], capture_output=True, text=True, timeout=60,
+        cwd=Path(__file__).resolve().parent.parent
+    )
+
+
+def test_run_profiler_with_thread_pool():
+    result = _profile_pool(sys.executable)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "6"
+    assert "Traceback" not in result.stderr
+
+
+def test_run_profiler_with_thread_pool_on_deployed_runtime():
+    # deploy.sh deploys --runtime=python312; point DEPLOYED_PYTHON at a 3.12 interpreter
+    python = os.environ.get("DEPLOYED_PYTHON", "python3.12")
+    try:
+        subprocess.run([python, "-c", "pass"], check=True, capture_output=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        pytest.skip(f"{python} not available")
+    result = _profile_pool(python)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "6"
+    assert "Traceback" not in result.stderr
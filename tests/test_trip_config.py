@@ -0,0 +1,49 @@
+# tests/test_trip_config.py
+from datetime import datetime, timezone
+
+import pytest
+
+
+def _trip(sample_trip_config, **fields):
+    return dict(sample_trip_config, scan_window={"start": "2026-05-01", "end": "2026-05-31"}, **fields)
+
+
+def test_next_scan_due_follows_frequency_and_scan_window(sample_trip_config):
+    from trip_config import next_scan_due
+    now = datetime(2026, 5, 10, 8, tzinfo=timezone.utc)
+
+    # Never scanned: due from the day the window opens
+    assert next_scan_due(_trip(sample_trip_config), now) == datetime(2026, 5, 1, tzinfo=timezone.utc)
+    scanned = _trip(sample_trip_config, last_scanned=datetime(2026, 5, 10, 8, tzinfo=timezone.utc), scan_frequency_days=3)
+    assert next_scan_due(scanned, now) == datetime(2026, 5, 13, tzinfo=timezone.utc)
+    # Next scan would fall after the window closes
+    late = _trip(sample_trip_config, last_scanned="2026-05-30T08:00:00+00:00", scan_frequency_days=3)
+    assert next_scan_due(late, now) is None
+    assert next_scan_due(_trip(sample_trip_config), datetime(2026, 6, 1, tzinfo=timezone.utc)) is None
+
+
+def test_prepare_trip_normalizes_codes_and_dates(sample_trip_config):
+    from trip_config import prepare_trip
+    trip = _trip(
+        sample_trip_config, airlines=["lh", "LH ", "ek"], currency="inr", min_trip_days="25",
+        departure_date_range=["2026-05-25T00:00:00", "2026-06-07"]
+    )
+
+    prepared = prepare_trip(trip, now=datetime(2026, 5, 10, tzinfo=timezone.utc))
+
+    assert prepared["airlines"] == ["LH", "EK"]
+    assert prepared["currency"] == "INR"
+    assert prepared["min_trip_days"] == 25
+    assert prepared["departure_date_range"] == ["2026-05-25", "2026-06-07"]
+    assert prepared["next_scan_due"] == datetime(2026, 5, 1, tzinfo=timezone.utc)
+
+
+def test_normalize_trip_rejects_invalid_configs(sample_trip_config):
+    from trip_config import normalize_trip
+    trip = _trip(sample_trip_config)
+    del trip["currency"]
+
+    with pytest.raises(ValueError, match="currency"):
+        normalize_trip(trip)
+    with pytest.raises(ValueError, match="min_trip_days"):
+        normalize_trip(_trip(sample_trip_config, min_trip_days=40))
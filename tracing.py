@@ -0,0 +1,146 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+class Tracer:
+    """Span timings and counters for one run, logged as JSON lines.
+
+    Cloud Logging parses each printed JSON object into a structured entry, so spans can
+    be filtered by name or run_id and their durations charted.
+    """
+
+    def __init__(self, run_id: str | None = None, log_spans: bool = True, clock=time.perf_counter):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.log_spans = log_spans
+        self._clock = clock
+        self._started = clock()
+        self._spans: dict[str, dict] = {}
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the block; the yielded dict takes annotations that are logged with it."""
+        started = self._clock()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            ms = (self._clock() - started) * 1000
+            with self._lock:
+                totals = self._spans.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+                totals["count"] += 1
+                totals["total_ms"] += ms
+                totals["max_ms"] = max(totals["max_ms"], ms)
+                totals["errors"] += error is not None
+            if self.log_spans:
+                if error:
+                    attrs["error"] = error
+                self._log(f"span {name}", span=name, duration_ms=round(ms, 1), **attrs)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def durations(self) -> dict[str, int]:
+        """Total milliseconds per span name so far, keyed "<name>_ms"."""
+        with self._lock:
+            return {f"{name}_ms": round(totals["total_ms"]) for name, totals in self._spans.items()}
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "duration_ms": round((self._clock() - self._started) * 1000),
+                "counters": dict(sorted(self._counters.items())),
+                "spans": {
+                    name: dict(totals, total_ms=round(totals["total_ms"], 1), max_ms=round(totals["max_ms"], 1))
+                    for name, totals in sorted(self._spans.items())
+                },
+            }
+
+    def emit_summary(self) -> dict:
+        summary = self.summary()
+        self._log("run summary", **summary)
+        return summary
+
+    def _log(self, message: str, **fields) -> None:
+        fields.setdefault("run_id", self.run_id)
+        print(json.dumps({"severity": "INFO", "message": message, **fields}, default=str))
+
+
+class NullTracer(Tracer):
+    """Tracer that records nothing, for components used without one."""
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        yield attrs
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+
+NULL_TRACER = NullTracer(run_id="none", log_spans=False)
+
+# Python 3.12+ allows one active profiler per interpreter, so threads can't each have one
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class RunProfiler:
+    """cProfile of a whole run.
+
+    Before Python 3.12, threads started while it is active get their own profiles and
+    the report merges them. On 3.12+ only the thread that entered it is profiled; time
+    spent waiting on worker threads shows up as waits. Profiling roughly doubles the
+    cost of Python calls, so it is meant for one-off diagnostic runs.
+    """
+
+    def __init__(self):
+        self._profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _profile_thread(self, *args) -> None:
+        # First profiler event in a new thread: swap the hook for a real profile
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active; never let that kill the thread
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def __enter__(self) -> "RunProfiler":
+        if PER_THREAD_PROFILES:
+            threading.setprofile(self._profile_thread)
+        self._profile_thread()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if PER_THREAD_PROFILES:
+            threading.setprofile(None)
+        if self._profiles:
+            self._profiles[0].disable()
+
+    def report(self, limit: int = 30, sort: str = "cumulative") -> str:
+        """The top functions across every profiled thread, as pstats text."""
+        stream = io.StringIO()
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return "No profile: another profiler was already active\n"
+        if not PER_THREAD_PROFILES:
+            stream.write(f"Profiled the request thread only (Python {sys.version_info.major}.{sys.version_info.minor})\n")
+        pstats.Stats(*profiles, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
@@ -0,0 +1,70 @@
+from datetime import date, datetime, time, timedelta, timezone
+
+REQUIRED_TRIP_FIELDS = [
+    "origins", "destinations", "airlines", "cabin_classes",
+    "departure_date_range", "return_date_range", "min_trip_days",
+    "max_trip_days", "scan_window", "scan_frequency_days",
+    "alert_on_rolling_avg_drop_pct", "currency"
+]
+# Code lists compared against Amadeus responses, stored uppercase without duplicates
+CODE_LIST_FIELDS = ("origins", "destinations", "airlines", "cabin_classes")
+INT_FIELDS = ("min_trip_days", "max_trip_days", "scan_frequency_days")
+NOTIFICATION_MODES = ("each", "digest")
+
+
+def _day(value) -> date:
+    """Date of a datetime, Firestore timestamp or ISO string."""
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+def normalize_trip(trip: dict) -> dict:
+    """Validated copy of a trip config with codes uppercased and dates as ISO strings.
+
+    Raises ValueError naming the first problem found.
+    """
+    missing = [field for field in REQUIRED_TRIP_FIELDS if field not in trip]
+    if missing:
+        raise ValueError(f"missing required fields: {', '.join(missing)}")
+
+    trip = dict(trip)
+    for field in CODE_LIST_FIELDS:
+        trip[field] = list(dict.fromkeys(code.strip().upper() for code in trip[field]))
+    trip["currency"] = trip["currency"].strip().upper()
+    for field in INT_FIELDS:
+        trip[field] = int(trip[field])
+    for field in ("departure_date_range", "return_date_range"):
+        trip[field] = [_day(value).isoformat() for value in trip[field]]
+    trip["scan_window"] = {key: _day(trip["scan_window"][key]).isoformat() for key in ("start", "end")}
+
+    if trip["min_trip_days"] > trip["max_trip_days"]:
+        raise ValueError("min_trip_days is greater than max_trip_days")
+    if trip["scan_frequency_days"] < 0:
+        raise ValueError("scan_frequency_days is negative")
+    if trip["scan_window"]["start"] > trip["scan_window"]["end"]:
+        raise ValueError("scan_window starts after it ends")
+    if trip.get("notification_mode", "each") not in NOTIFICATION_MODES:
+        raise ValueError(f"notification_mode must be one of {', '.join(NOTIFICATION_MODES)}")
+    return trip
+
+
+def next_scan_due(trip: dict, now: datetime | None = None) -> datetime | None:
+    """Start of the UTC day the trip is next due: scan_frequency_days after its last
+    scan, and not before the scan window opens. None once the window has closed."""
+    now = now or datetime.now(timezone.utc)
+    due = _day(trip["scan_window"]["start"])
+    if trip.get("last_scanned"):
+        due = max(due, _day(trip["last_scanned"]) + timedelta(days=trip["scan_frequency_days"]))
+    if max(due, now.date()) > _day(trip["scan_window"]["end"]):
+        return None
+    return datetime.combine(due, time.min, tzinfo=timezone.utc)
+
+
+def prepare_trip(trip: dict, now: datetime | None = None) -> dict:
+    """Normalized trip config with next_scan_due set, as stored."""
+    trip = normalize_trip(trip)
+    trip["next_scan_due"] = next_scan_due(trip, now)
+    return trip